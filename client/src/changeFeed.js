@@ -0,0 +1,96 @@
+import { useEffect, useRef } from 'react';
+
+// Applies one change (from the feed, or built from a save's response) to a list of
+// projects or tasks. Applying the same change twice is harmless, so a save's response
+// and its feed event can both be applied.
+export const applyChange = (items, change, { entity, belongs = () => true, prepend = false }) => {
+  if (change.entity !== entity) {
+    return items;
+  }
+
+  const index = items.findIndex((item) => item.id === change.id);
+  if (change.op === 'delete') {
+    return index === -1 ? items : items.filter((item) => item.id !== change.id);
+  }
+
+  if (index === -1) {
+    // Updates only carry the fields that changed, so only a create can add an item
+    if (change.op !== 'create' || !belongs(change.data)) {
+      return items;
+    }
+    return prepend ? [change.data, ...items] : [...items, change.data];
+  }
+
+  // An older change arriving after a newer save's response
+  if (change.data.updated_at < items[index].updated_at) {
+    return items;
+  }
+  const item = { ...items[index], ...change.data };
+  if (!belongs(item)) {
+    return items.filter((current) => current.id !== change.id);
+  }
+  return items.map((current) => (current.id === change.id ? item : current));
+};
+
+// How often lists are reloaded while the feed is unavailable (e.g. the server is at its
+// stream limit and answered 503), and the feed retried
+const POLL_INTERVAL_MS = 30000;
+
+// Subscribes to the user's project/task changes. onSync runs once the feed is
+// connected and again if the server says changes were missed; load lists there, so
+// nothing committed between the load and the subscription is lost. onChange runs for
+// every change after that. The browser reconnects on its own, resuming where it left off.
+// If the server refuses the stream, onSync runs every POLL_INTERVAL_MS instead until a
+// retry connects.
+export const useChangeFeed = ({ onChange, onSync }, deps = []) => {
+  const handlers = useRef();
+  handlers.current = { onChange, onSync };
+
+  useEffect(() => {
+    let source = null;
+    let pollTimer = null;
+    let synced = false;
+    const sync = () => {
+      synced = true;
+      handlers.current.onSync();
+    };
+
+    const connect = () => {
+      source = new EventSource('/api/changes/stream', { withCredentials: true });
+      source.addEventListener('reset', sync);
+      source.addEventListener('ready', () => {
+        if (pollTimer) {
+          // Back from polling: reload once so nothing between the last poll and now is lost
+          clearTimeout(pollTimer);
+          pollTimer = null;
+          sync();
+        } else if (!synced) {
+          sync();
+        }
+      });
+      source.addEventListener('change', (event) => handlers.current.onChange(JSON.parse(event.data)));
+      source.onerror = () => {
+        // Feed unavailable: load the page anyway; it just won't update live until it reconnects
+        if (!synced) {
+          sync();
+        }
+        // A refused stream (e.g. 503) is closed for good rather than retried by the browser
+        if (source.readyState === EventSource.CLOSED && !pollTimer) {
+          pollTimer = setTimeout(poll, POLL_INTERVAL_MS);
+        }
+      };
+    };
+
+    const poll = () => {
+      handlers.current.onSync();
+      pollTimer = setTimeout(poll, POLL_INTERVAL_MS);
+      connect();
+    };
+
+    connect();
+    return () => {
+      clearTimeout(pollTimer);
+      source.close();
+    };
+  }, deps); // eslint-disable-line react-hooks/exhaustive-deps
+};
@@ -1,5 +1,6 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState } from 'react';
 import { useParams, useNavigate } from 'react-router-dom';
+import { applyChange, useChangeFeed } from '../changeFeed';
 
 const ProjectDetail = () => {
   const { id } = useParams();
@@ -19,11 +20,32 @@ const ProjectDetail = () => {
   const [error, setError] = useState('');
   const [aiLoading, setAiLoading] = useState(false);
 
-  useEffect(() => {
-    fetchProject();
-    fetchTasks();
+  // The project and its tasks are loaded once the change feed is connected, then kept
+  // current from the feed instead of being refetched after every save
+  useChangeFeed({
+    onSync: () => {
+      fetchProject();
+      fetchTasks();
+    },
+    onChange: (change) => {
+      if (change.entity === 'project' && String(change.id) === id) {
+        if (change.op === 'delete') {
+          navigate('/projects');
+        } else {
+          setProject((current) => ({ ...current, ...change.data }));
+        }
+      }
+      applyTaskChange(change);
+    }
   }, [id]);
 
+  const applyTaskChange = (change) => {
+    setTasks((current) => applyChange(current, change, {
+      entity: 'task',
+      belongs: (task) => String(task.project_id) === id
+    }));
+  };
+
   const fetchProject = async () => {
     try {
       const response = await fetch(`/api/projects/${id}`, {
@@ -93,6 +115,28 @@ const ProjectDetail = () => {
     setError('');
   };
 
+  // Description jobs are queued on the server; the text streams in as it's generated
+  const streamDescription = (job) => new Promise((resolve, reject) => {
+    const source = new EventSource(`/api/ai/jobs/${job.id}/stream`, { withCredentials: true });
+    let text = '';
+    source.addEventListener('delta', (event) => {
+      text += JSON.parse(event.data).text;
+      setFormData((current) => ({ ...current, description: text }));
+    });
+    source.addEventListener('done', (event) => {
+      source.close();
+      resolve(JSON.parse(event.data).description);
+    });
+    source.addEventListener('failed', (event) => {
+      source.close();
+      reject(new Error(JSON.parse(event.data).error));
+    });
+    source.onerror = () => {
+      source.close();
+      reject(new Error('Lost connection while generating the description'));
+    };
+  });
+
   const generateDescription = async () => {
     if (!formData.title) {
       setError('Please enter a task title first');
@@ -103,7 +147,7 @@ const ProjectDetail = () => {
     setError('');
 
     try {
-      const response = await fetch('/api/ai/generate-task-description', {
+      const response = await fetch('/api/ai/jobs', {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
         credentials: 'include',
@@ -111,14 +155,15 @@ const ProjectDetail = () => {
       });
 
       if (response.ok) {
-        const data = await response.json();
-        setFormData({ ...formData, description: data.description });
+        const job = await response.json();
+        const description = job.status === 'done' ? job.description : await streamDescription(job);
+        setFormData((current) => ({ ...current, description }));
       } else {
         const errorData = await response.json();
         setError(errorData.error || 'AI generation is not available');
       }
     } catch (err) {
-      setError('Failed to generate description');
+      setError(err.message || 'Failed to generate description');
     } finally {
       setAiLoading(false);
     }
@@ -146,8 +191,9 @@ const ProjectDetail = () => {
         throw new Error(errorData.error || 'Failed to save task');
       }
 
+      const task = await response.json();
+      applyTaskChange({ entity: 'task', id: task.id, op: currentTask ? 'update' : 'create', data: task });
       closeModal();
-      fetchTasks();
     } catch (err) {
       setError(err.message);
     }
@@ -165,7 +211,7 @@ const ProjectDetail = () => {
       });
 
       if (response.ok) {
-        fetchTasks();
+        applyTaskChange({ entity: 'task', id: taskId, op: 'delete', data: null });
       }
     } catch (error) {
       console.error('Failed to delete task:', error);
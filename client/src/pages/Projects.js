@@ -1,5 +1,6 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState } from 'react';
 import { Link } from 'react-router-dom';
+import { applyChange, useChangeFeed } from '../changeFeed';
 
 const Projects = () => {
   const [projects, setProjects] = useState([]);
@@ -15,9 +16,13 @@ const Projects = () => {
   const [page, setPage] = useState(1);
   const [totalPages, setTotalPages] = useState(1);
 
-  useEffect(() => {
-    fetchProjects();
-  }, [page]);
+  // Pages are loaded once the change feed is connected, then kept current from it
+  useChangeFeed({ onSync: () => fetchProjects(), onChange: (change) => applyProjectChange(change) }, [page]);
+
+  const applyProjectChange = (change) => {
+    // The list is newest first, so new projects only show up on the first page
+    setProjects((current) => applyChange(current, change, { entity: 'project', prepend: page === 1 }));
+  };
 
   const fetchProjects = async () => {
     try {
@@ -81,8 +86,9 @@ const Projects = () => {
         throw new Error(errorData.error || 'Failed to save project');
       }
 
+      const project = await response.json();
+      applyProjectChange({ entity: 'project', id: project.id, op: currentProject ? 'update' : 'create', data: project });
       closeModal();
-      fetchProjects();
     } catch (err) {
       setError(err.message);
     }
@@ -100,7 +106,7 @@ const Projects = () => {
       });
 
       if (response.ok) {
-        fetchProjects();
+        applyProjectChange({ entity: 'project', id, op: 'delete', data: null });
       }
     } catch (error) {
       console.error('Failed to delete project:', error);
@@ -0,0 +1,249 @@
+import atexit
+import hashlib
+import json
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from werkzeug.local import LocalProxy
+from cache import LRUCache, RedisCache
+
+SYSTEM_PROMPT = 'You are a helpful assistant that generates detailed task descriptions for project management.'
+USER_PROMPT = 'Generate a detailed description for this task: {title}. Keep it under 200 words.'
+# Bump when the prompts change so cached descriptions written for the old ones aren't served
+PROMPT_VERSION = 1
+MAX_TOKENS = 200
+
+# Partial descriptions are written to the job store at most this often while streaming
+FLUSH_INTERVAL = 0.1
+
+
+class AIUnavailable(Exception):
+    """No API key configured; the caller should answer 503"""
+
+
+class TooManyJobs(Exception):
+    """The user already has AI_MAX_JOBS_PER_USER jobs in flight; the caller should answer 429"""
+
+
+class QueueFull(Exception):
+    """AI_MAX_PENDING jobs are queued or running in this process; the caller should answer 503"""
+
+
+def normalize_title(title):
+    """Case and whitespace don't change the description we'd generate"""
+    return ' '.join((title or '').lower().split())
+
+
+def cache_key(model, title):
+    """Content address of a description: the normalized title, the model and the prompt version"""
+    content = json.dumps([PROMPT_VERSION, model, normalize_title(title)])
+    return 'ai:description:' + hashlib.sha256(content.encode()).hexdigest()
+
+
+def public_job(job):
+    return {name: job[name] for name in ('id', 'status', 'title', 'description', 'error', 'cached')}
+
+
+def server_sent_event(event, data):
+    return f'event: {event}\ndata: {json.dumps(data)}\n\n'
+
+
+def create_store(config):
+    backend = config['AI_STORE_BACKEND']
+    if backend == 'lru':
+        return LRUCache(config['AI_STORE_MAX_ENTRIES'])
+    if backend == 'redis':
+        import redis
+        return RedisCache(redis.Redis.from_url(config['CACHE_REDIS_URL']))
+    raise ValueError(f"Unknown AI_STORE_BACKEND '{backend}' (expected 'lru' or 'redis')")
+
+
+class DescriptionJobs:
+    """Generates AI task descriptions as background jobs, off the request threads.
+
+    A submitted title is answered from the cache when an identical one (after
+    normalize_title) was generated before; otherwise a job is queued on a small
+    thread pool that streams the completion into the job store, where it can be
+    polled or streamed. One OpenAI client, and so one HTTP connection pool, serves
+    every job. A user may have AI_MAX_JOBS_PER_USER jobs in flight and the process
+    AI_MAX_PENDING; each job gets AI_TIMEOUT seconds end to end. Create one per
+    app; code serving a request uses `ai_jobs`.
+    """
+
+    def __init__(self, app=None):
+        self._executor = None
+        self._client = None
+        self._lock = threading.Lock()
+        self._active = {}
+        self._finished = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        config = app.config
+        self.api_key = config['OPENAI_API_KEY']
+        self.base_url = config['OPENAI_BASE_URL']
+        self.model = config['AI_MODEL']
+        self.workers = config['AI_WORKERS']
+        self.timeout = config['AI_TIMEOUT']
+        self.per_user = config['AI_MAX_JOBS_PER_USER']
+        self.job_ttl = config['AI_JOB_TTL']
+        self.cache_ttl = config['AI_CACHE_TTL']
+        self._slots = threading.BoundedSemaphore(config['AI_MAX_PENDING'])
+        self.store = create_store(config)
+        app.extensions['ai_jobs'] = self
+
+    @property
+    def enabled(self):
+        return bool(self.api_key)
+
+    def client(self):
+        # Created on first use and shared by every job, so connections to the API are kept alive
+        with self._lock:
+            if self._client is None:
+                import httpx
+                from openai import OpenAI
+                # No retries: a retry would run past the job's deadline
+                self._client = OpenAI(
+                    api_key=self.api_key,
+                    base_url=self.base_url,
+                    max_retries=0,
+                    http_client=httpx.Client(limits=httpx.Limits(
+                        max_connections=self.workers, max_keepalive_connections=self.workers
+                    )),
+                )
+            return self._client
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix='ai-jobs')
+                atexit.register(self._executor.shutdown, cancel_futures=True)
+            return self._executor
+
+    def _save(self, job):
+        self.store.set(f"ai:job:{job['id']}", job, self.job_ttl)
+
+    def get(self, job_id, user_id):
+        """The job as last written by its worker, or None if it doesn't exist or isn't this user's"""
+        job = self.store.get(f'ai:job:{job_id}')
+        if job is None or job['user_id'] != user_id:
+            return None
+        return job
+
+    def submit(self, user_id, title):
+        """Queue a description for `title`; the returned job is already done on a cache hit"""
+        if not self.enabled:
+            raise AIUnavailable('OpenAI API key not configured')
+        if not normalize_title(title):
+            raise ValueError('Task title is required')
+
+        job = {
+            'id': uuid.uuid4().hex, 'user_id': user_id, 'title': title, 'status': 'queued',
+            'description': '', 'error': None, 'cached': False, 'key': cache_key(self.model, title),
+        }
+        cached = self.store.get(job['key'])
+        if cached is not None:
+            job.update(status='done', description=cached, cached=True)
+            self._save(job)
+            return job
+
+        with self._lock:
+            if self._active.get(user_id, 0) >= self.per_user:
+                raise TooManyJobs(f'At most {self.per_user} AI descriptions can be generated at once')
+            if not self._slots.acquire(blocking=False):
+                raise QueueFull('Too many AI descriptions in progress')
+            self._active[user_id] = self._active.get(user_id, 0) + 1
+            self._finished[job['id']] = threading.Event()
+
+        self._save(job)
+        try:
+            self._pool().submit(self._run, job)
+        except Exception:
+            self._release(job).set()
+            raise
+        return job
+
+    def wait(self, job_id, timeout):
+        """Block until a job submitted by this process finishes (or `timeout` passes)"""
+        finished = self._finished.get(job_id)
+        return finished.wait(timeout) if finished is not None else True
+
+    def events(self, job, poll_interval=FLUSH_INTERVAL):
+        """Server-sent events for a job: 'delta' as the description grows, then 'done' or 'failed'.
+
+        Reads the job store, so any process can stream a job. The final event carries
+        the whole job; deltas before it are a preview of the same text.
+        """
+        sent = 0
+        give_up = time.monotonic() + self.timeout + 5
+        while True:
+            if job['status'] in ('done', 'failed'):
+                yield server_sent_event(job['status'], public_job(job))
+                return
+            if len(job['description']) > sent:
+                yield server_sent_event('delta', {'text': job['description'][sent:]})
+                sent = len(job['description'])
+            if time.monotonic() > give_up:
+                yield server_sent_event('failed', dict(public_job(job), status='failed', error='AI generation timed out'))
+                return
+            time.sleep(poll_interval)
+            job = self.store.get(f"ai:job:{job['id']}") or dict(job, status='failed', error='Job expired')
+
+    def _release(self, job):
+        """Free the job's slots; returns the event to set once its final state is saved"""
+        with self._lock:
+            self._active[job['user_id']] -= 1
+            if not self._active[job['user_id']]:
+                del self._active[job['user_id']]
+            self._slots.release()
+            return self._finished.pop(job['id'])
+
+    def _run(self, job):
+        from openai import APITimeoutError
+
+        deadline = time.monotonic() + self.timeout
+        try:
+            job['status'] = 'running'
+            self._save(job)
+            stream = self.client().chat.completions.create(
+                model=self.model,
+                messages=[
+                    {'role': 'system', 'content': SYSTEM_PROMPT},
+                    {'role': 'user', 'content': USER_PROMPT.format(title=job['title'])},
+                ],
+                max_tokens=MAX_TOKENS,
+                stream=True,
+                # Time left once the job waited in the queue; also bounds the wait between chunks
+                timeout=max(deadline - time.monotonic(), 0.1),
+            )
+            flushed = time.monotonic()
+            try:
+                for chunk in stream:
+                    if time.monotonic() > deadline:
+                        raise TimeoutError
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        job['description'] += chunk.choices[0].delta.content
+                        if time.monotonic() - flushed >= FLUSH_INTERVAL:
+                            self._save(job)
+                            flushed = time.monotonic()
+            finally:
+                stream.response.close()
+
+            job.update(status='done', description=job['description'].strip())
+            self.store.set(job['key'], job['description'], self.cache_ttl)
+        except (TimeoutError, APITimeoutError):
+            job.update(status='failed', error=f'AI generation timed out after {self.timeout:g}s')
+        except Exception as e:
+            job.update(status='failed', error=f'AI generation failed: {e}')
+        finally:
+            # Slots first: a client that sees the job finish may submit its next one right away
+            finished = self._release(job)
+            self._save(job)
+            finished.set()
+
+
+# The current app's job runner, so each app uses its own key, model, limits and store
+ai_jobs = LocalProxy(lambda: current_app.extensions['ai_jobs'])
@@ -1,24 +1,95 @@
-from flask import Flask, request, session, jsonify
-from flask_bcrypt import Bcrypt
+from flask import Blueprint, Flask, Response, current_app, request, session, jsonify, stream_with_context
 from flask_migrate import Migrate
 from flask_cors import CORS
-from config import Config
+from config import engine_options, get_config
 from models import db, User, Project, Task
+from stats import dashboard_stats, record_task_inserts, stats_cli
+from explain import indexes_cli
+from serializers import user_serializer, project_serializer, task_serializer
+from loading import eager_options
+from sqlalchemy import insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import contains_eager
+from queries import TaskQuery, project_list_query, task_list_query
+from pagination import keyset_paginate, page_limit, parse_flag
+from passwords import PasswordHasher, HasherBusy, password_hasher
+from ai import AIUnavailable, DescriptionJobs, QueueFull, TooManyJobs, ai_jobs, public_job
+import auth
+import sessions
+from sessions import regenerate_session
+from auth import current_user, current_user_id, login_required, project_owner_required, task_owner_required
+import querycount
+import metrics
+import slowlog
+import startup
+import sqlite_tuning
+import replicas
+from replicas import replica_reads
+from sqlite_tuning import read_mostly
+import cache
+from cache import cached_response
+from etag import conditional_get
+from export import FORMATS, export_stream
+from task_fields import build_task, apply_task_changes, insert_values
+from importer import detect_format, import_tasks
+import search
+from search import search_cli
+import feed
+from feed import change_events, lock_change_log, record_creates
+from sync import sync
+from querycount import query_budget
+from collections import Counter
 from datetime import datetime
 import os
 
-app = Flask(__name__)
-app.config.from_object(Config)
+api = Blueprint('api', __name__)
+
+# Created once and bound to each app in create_app(); the password hasher and AI jobs
+# keep per-app state, so create_app() makes one of each per app instead
+migrate = Migrate()
+
+
+def create_app(config_class=None):
+    """Build the Flask app. The config defaults to the APP_ENV profile (see config.py)."""
+    app = Flask(__name__)
+    app.config.from_object(config_class or get_config())
+    if not app.config.get('SQLALCHEMY_ENGINE_OPTIONS'):
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
+    
+    # Initialize extensions (metrics first: its after_request hook runs last)
+    metrics.init_app(app)
+    db.init_app(app)
+    sqlite_tuning.init_app(app)
+    replicas.init_app(app)
+    migrate.init_app(app, db, include_object=search.include_object)
+    PasswordHasher(app)
+    DescriptionJobs(app)
+    feed.init_app(app)
+    CORS(app, supports_credentials=True, origins=app.config['CORS_ORIGINS'])
+    app.cli.add_command(stats_cli)
+    app.cli.add_command(indexes_cli)
+    app.cli.add_command(search_cli)
+    sessions.init_app(app)
+    auth.init_app(app)
+    querycount.init_app(app)
+    slowlog.init_app(app)
+    cache.init_app(app)
+    
+    app.register_blueprint(api)
+    startup.init_app(app)
+    return app
 
-# Initialize extensions
-db.init_app(app)
-migrate = Migrate(app, db)
-bcrypt = Bcrypt(app)
-CORS(app, supports_credentials=True, origins=['http://localhost:3000'])
 
 # ============== AUTHENTICATION ROUTES ==============
 
-@app.route('/api/signup', methods=['POST'])
+def server_busy():
+    response = jsonify({'error': 'Server is busy, please try again shortly'})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
+
+@api.route('/api/signup', methods=['POST'])
+@query_budget(5)
 def signup():
     try:
         data = request.get_json()
@@ -27,35 +98,42 @@ def signup():
         if not data.get('username') or not data.get('email') or not data.get('password'):
             return jsonify({'error': 'Username, email, and password are required'}), 400
         
+        # Validates the fields; not added to the session until the checks pass
+        user = User(
+            username=data['username'],
+            email=data['email']
+        )
+        # Hash before the first query: the write transaction (and on SQLite the
+        # writer queue) is then held for a few queries, not for a bcrypt run
+        user._password_hash = password_hasher.hash(data['password'])
+        
         # Check if user exists
         if User.query.filter_by(username=data['username']).first():
             return jsonify({'error': 'Username already exists'}), 400
         if User.query.filter_by(email=data['email']).first():
             return jsonify({'error': 'Email already exists'}), 400
         
-        # Create new user
-        user = User(
-            username=data['username'],
-            email=data['email']
-        )
-        user._password_hash = bcrypt.generate_password_hash(data['password']).decode('utf-8')
-        
         db.session.add(user)
         db.session.commit()
         
         # Log user in
+        regenerate_session(session)
         session['user_id'] = user.id
         
-        return jsonify(user.to_dict()), 201
+        return jsonify(user_serializer.dump(user)), 201
         
     except ValueError as e:
         return jsonify({'error': str(e)}), 400
+    except HasherBusy:
+        return server_busy()
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': 'An error occurred during signup'}), 500
 
 
-@app.route('/api/login', methods=['POST'])
+@api.route('/api/login', methods=['POST'])
+@query_budget(2)
+@read_mostly
 def login():
     try:
         data = request.get_json()
@@ -65,55 +143,96 @@ def login():
         
         user = User.query.filter_by(username=data['username']).first()
         
-        if not user or not bcrypt.check_password_hash(user._password_hash, data['password']):
+        if not user or not password_hasher.check(user._password_hash, data['password']):
             return jsonify({'error': 'Invalid username or password'}), 401
         
-        session['user_id'] = user.id
-        return jsonify(user.to_dict()), 200
+        # Serialize before a rehash commit expires the user
+        user_data = user_serializer.dump(user)
+        
+        # Upgrade hashes made with an old BCRYPT_LOG_ROUNDS while we have the plain password
+        if password_hasher.needs_rehash(user._password_hash):
+            try:
+                user._password_hash = password_hasher.hash(data['password'])
+                db.session.commit()
+            except SQLAlchemyError:
+                # e.g. SQLite refusing the write to a stale read snapshot; retried next login
+                db.session.rollback()
         
+        regenerate_session(session)
+        session['user_id'] = user_data['id']
+        auth.remember_user(user_data)
+        return jsonify(user_data), 200
+        
+    except HasherBusy:
+        return server_busy()
     except Exception as e:
+        db.session.rollback()
         return jsonify({'error': 'An error occurred during login'}), 500
 
 
-@app.route('/api/logout', methods=['POST'])
+@api.route('/api/logout', methods=['POST'])
+@query_budget(0)
 def logout():
-    session.pop('user_id', None)
+    # Emptying the session revokes it in the server-side store
+    session.clear()
     return jsonify({'message': 'Logged out successfully'}), 200
 
 
-@app.route('/api/check-session', methods=['GET'])
+@api.route('/api/check-session', methods=['GET'])
+@query_budget(1)
+@replica_reads
 def check_session():
-    user_id = session.get('user_id')
-    if user_id:
-        user = User.query.get(user_id)
-        if user:
-            return jsonify(user.to_dict()), 200
+    user_data = current_user()
+    if user_data:
+        return jsonify(user_data), 200
     return jsonify({'error': 'Not authenticated'}), 401
 
 
 # ============== PROJECT ROUTES ==============
 
-@app.route('/api/projects', methods=['GET', 'POST'])
+@api.route('/api/projects', methods=['GET', 'POST'])
+@query_budget(4)
+@replica_reads
+@login_required
+@conditional_get
+@cached_response
 def projects():
-    user_id = session.get('user_id')
-    if not user_id:
-        return jsonify({'error': 'Authentication required'}), 401
+    user_id = current_user_id()
     
     if request.method == 'GET':
         # Pagination
         page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', app.config['ITEMS_PER_PAGE'], type=int)
+        per_page = request.args.get('per_page', current_app.config['ITEMS_PER_PAGE'], type=int)
         status = request.args.get('status')
         
-        query = Project.query.filter_by(user_id=user_id)
+        try:
+            include = project_serializer.parse_include(request.args.get('include'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        if status:
-            query = query.filter_by(status=status)
+        query = project_list_query(user_id, status)
+        query = query.options(*eager_options('projects', Project, include))
+        
+        # Opt-in keyset pagination: ?cursor=<token>&limit=N (empty cursor for the first page)
+        if 'cursor' in request.args:
+            try:
+                keyset = keyset_paginate(
+                    query, Project.updated_at, Project.id,
+                    request.args['cursor'], page_limit(),
+                    with_total=parse_flag(request.args.get('total'))
+                )
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            
+            return jsonify({
+                'projects': project_serializer.dump_many(keyset.items, include),
+                **keyset.meta()
+            }), 200
         
         query = query.order_by(Project.updated_at.desc())
         pagination = query.paginate(page=page, per_page=per_page, error_out=False)
         
-        projects_data = [project.to_dict() for project in pagination.items]
+        projects_data = project_serializer.dump_many(pagination.items, include)
         
         return jsonify({
             'projects': projects_data,
@@ -136,7 +255,7 @@ def projects():
             db.session.add(project)
             db.session.commit()
             
-            return jsonify(project.to_dict()), 201
+            return jsonify(project_serializer.dump(project)), 201
             
         except ValueError as e:
             return jsonify({'error': str(e)}), 400
@@ -145,13 +264,23 @@ def projects():
             return jsonify({'error': 'An error occurred while creating the project'}), 500
 
 
-@app.route('/api/projects/<int:id>', methods=['GET', 'PATCH', 'DELETE'])
+@api.route('/api/projects/<int:id>', methods=['GET', 'PATCH', 'DELETE'])
+@query_budget(6)
+@login_required
+@conditional_get
+@cached_response
 def project_by_id(id):
-    user_id = session.get('user_id')
-    if not user_id:
-        return jsonify({'error': 'Authentication required'}), 401
+    user_id = current_user_id()
     
-    project = Project.query.get(id)
+    include = ()
+    if request.method == 'GET':
+        try:
+            include = project_serializer.parse_include(request.args.get('include'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+    
+    project = Project.query.options(*eager_options('project_by_id', Project, include)) \
+        .filter_by(id=id).first()
     
     if not project:
         return jsonify({'error': 'Project not found'}), 404
@@ -161,7 +290,7 @@ def project_by_id(id):
         return jsonify({'error': 'Unauthorized access'}), 403
     
     if request.method == 'GET':
-        return jsonify(project.to_dict()), 200
+        return jsonify(project_serializer.dump(project, include)), 200
     
     elif request.method == 'PATCH':
         try:
@@ -177,7 +306,7 @@ def project_by_id(id):
             project.updated_at = datetime.utcnow()
             db.session.commit()
             
-            return jsonify(project.to_dict()), 200
+            return jsonify(project_serializer.dump(project)), 200
             
         except ValueError as e:
             return jsonify({'error': str(e)}), 400
@@ -197,35 +326,41 @@ def project_by_id(id):
 
 # ============== TASK ROUTES ==============
 
-@app.route('/api/projects/<int:project_id>/tasks', methods=['GET', 'POST'])
+@api.route('/api/projects/<int:project_id>/tasks', methods=['GET', 'POST'])
+@query_budget(5)
+@replica_reads
+@project_owner_required()
+@conditional_get
+@cached_response
 def tasks(project_id):
-    user_id = session.get('user_id')
-    if not user_id:
-        return jsonify({'error': 'Authentication required'}), 401
-    
-    project = Project.query.get(project_id)
-    if not project:
-        return jsonify({'error': 'Project not found'}), 404
-    
-    # Authorization check
-    if project.user_id != user_id:
-        return jsonify({'error': 'Unauthorized access'}), 403
-    
     if request.method == 'GET':
         # Pagination
         page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', app.config['ITEMS_PER_PAGE'], type=int)
+        per_page = request.args.get('per_page', current_app.config['ITEMS_PER_PAGE'], type=int)
         status = request.args.get('status')
         
-        query = Task.query.filter_by(project_id=project_id)
+        query = task_list_query(project_id, status)
         
-        if status:
-            query = query.filter_by(status=status)
+        # Opt-in keyset pagination: ?cursor=<token>&limit=N (empty cursor for the first page)
+        if 'cursor' in request.args:
+            try:
+                keyset = keyset_paginate(
+                    query, Task.created_at, Task.id,
+                    request.args['cursor'], page_limit(),
+                    with_total=parse_flag(request.args.get('total'))
+                )
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            
+            return jsonify({
+                'tasks': task_serializer.dump_many(keyset.items),
+                **keyset.meta()
+            }), 200
         
         query = query.order_by(Task.created_at.desc())
         pagination = query.paginate(page=page, per_page=per_page, error_out=False)
         
-        tasks_data = [task.to_dict() for task in pagination.items]
+        tasks_data = task_serializer.dump_many(pagination.items)
         
         return jsonify({
             'tasks': tasks_data,
@@ -237,22 +372,12 @@ def tasks(project_id):
     elif request.method == 'POST':
         try:
             data = request.get_json()
-            
-            task = Task(
-                title=data.get('title'),
-                description=data.get('description', ''),
-                status=data.get('status', 'todo'),
-                priority=data.get('priority', 'medium'),
-                project_id=project_id
-            )
-            
-            if data.get('due_date'):
-                task.due_date = datetime.fromisoformat(data['due_date'].replace('Z', '+00:00'))
+            task = build_task(data, project_id)
             
             db.session.add(task)
             db.session.commit()
             
-            return jsonify(task.to_dict()), 201
+            return jsonify(task_serializer.dump(task)), 201
             
         except ValueError as e:
             return jsonify({'error': str(e)}), 400
@@ -261,46 +386,61 @@ def tasks(project_id):
             return jsonify({'error': 'An error occurred while creating the task'}), 500
 
 
-@app.route('/api/tasks/<int:id>', methods=['GET', 'PATCH', 'DELETE'])
+# Cross-project task queries, e.g. high priority tasks due this week:
+# ?priority=high&due_after=2026-10-19&due_before=2026-10-26
+@api.route('/api/tasks', methods=['GET'])
+@query_budget(3)
+@replica_reads
+@login_required
+@conditional_get
+@cached_response
+def task_query():
+    try:
+        query = TaskQuery.from_args(current_user_id(), request.args)
+        keyset = query.page(
+            request.args.get('cursor'), page_limit(),
+            with_total=parse_flag(request.args.get('total'))
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({
+        'tasks': task_serializer.dump_many(keyset.items),
+        **keyset.meta()
+    }), 200
+
+
+@api.route('/api/tasks/<int:id>', methods=['GET', 'PATCH', 'DELETE'])
+@query_budget(6)
+@task_owner_required()
+@conditional_get
 def task_by_id(id):
-    user_id = session.get('user_id')
-    if not user_id:
-        return jsonify({'error': 'Authentication required'}), 401
+    # Ownership is already checked; writes still load the project so the
+    # dashboard counters can find the task's owner without another query
+    include = ('project',)
+    if request.method == 'GET':
+        try:
+            include = task_serializer.parse_include(request.args.get('include'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
     
-    task = Task.query.get(id)
+    task = Task.query.options(*eager_options('task_by_id', Task, include)) \
+        .filter_by(id=id).first()
     
     if not task:
         return jsonify({'error': 'Task not found'}), 404
     
-    # Authorization check via project
-    if task.project.user_id != user_id:
-        return jsonify({'error': 'Unauthorized access'}), 403
-    
     if request.method == 'GET':
-        return jsonify(task.to_dict()), 200
+        return jsonify(task_serializer.dump(task, include)), 200
     
     elif request.method == 'PATCH':
         try:
             data = request.get_json()
+            apply_task_changes(task, data)
             
-            if 'title' in data:
-                task.title = data['title']
-            if 'description' in data:
-                task.description = data['description']
-            if 'status' in data:
-                task.status = data['status']
-            if 'priority' in data:
-                task.priority = data['priority']
-            if 'due_date' in data:
-                if data['due_date']:
-                    task.due_date = datetime.fromisoformat(data['due_date'].replace('Z', '+00:00'))
-                else:
-                    task.due_date = None
-            
-            task.updated_at = datetime.utcnow()
             db.session.commit()
             
-            return jsonify(task.to_dict()), 200
+            return jsonify(task_serializer.dump(task)), 200
             
         except ValueError as e:
             return jsonify({'error': str(e)}), 400
@@ -318,87 +458,379 @@ def task_by_id(id):
             return jsonify({'error': 'An error occurred while deleting the task'}), 500
 
 
+# ============== BULK TASK ROUTES ==============
+
+def bulk_items(data, key):
+    """The list of items in a bulk request body, or an error message"""
+    items = (data or {}).get(key)
+    if not isinstance(items, list) or not items:
+        return None, f"'{key}' must be a non-empty list"
+    if len(items) > current_app.config['BULK_MAX_ITEMS']:
+        return None, f"At most {current_app.config['BULK_MAX_ITEMS']} items per request"
+    return items, None
+
+
+def bulk_failure(results):
+    failed = sum(1 for result in results if result['status'] == 'error')
+    # Valid items were not applied either
+    for result in results:
+        if result['status'] != 'error':
+            result['status'] = 'ok'
+    return jsonify({
+        'error': f'{failed} of {len(results)} items failed; nothing was saved',
+        'results': results
+    }), 400
+
+
+def owned_tasks(user_id, ids):
+    """The user's tasks among `ids`, keyed by id, in a single query"""
+    tasks = Task.query.join(Project, Task.project_id == Project.id) \
+        .filter(Project.user_id == user_id, Task.id.in_(ids)) \
+        .options(contains_eager(Task.project)) \
+        .all()
+    return {task.id: task for task in tasks}
+
+
+@api.route('/api/projects/<int:project_id>/tasks/bulk', methods=['POST'])
+@query_budget(5)
+@project_owner_required()
+def tasks_bulk_create(project_id):
+    items, error = bulk_items(request.get_json(silent=True), 'tasks')
+    if error:
+        return jsonify({'error': error}), 400
+    
+    # Validate every item before writing anything
+    rows, results = [], []
+    for index, data in enumerate(items):
+        try:
+            if not isinstance(data, dict):
+                raise ValueError('Each task must be an object')
+            rows.append(insert_values(build_task(data, project_id)))
+            results.append({'index': index, 'status': 'ok'})
+        except ValueError as e:
+            results.append({'index': index, 'status': 'error', 'error': str(e)})
+    
+    if len(rows) != len(items):
+        return bulk_failure(results)
+    
+    try:
+        # One multi-row INSERT ... RETURNING in one transaction, like the importer's chunks;
+        # it skips the flush hooks, so the change log and counters are written explicitly
+        lock_change_log(db.session)
+        new_tasks = db.session.scalars(insert(Task).returning(Task), rows).all()
+        record_creates(db.session, new_tasks)
+        record_task_inserts(db.session, current_user_id(), Counter(row['status'] for row in rows))
+        # Read the new ids before commit expires the objects
+        for result, task in zip(results, new_tasks):
+            result.update(status='created', id=task.id)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'An error occurred while creating the tasks'}), 500
+    
+    return jsonify({'results': results, 'created': len(new_tasks)}), 201
+
+
+@api.route('/api/tasks/bulk', methods=['PATCH', 'DELETE'])
+@query_budget(5)
+@login_required
+def tasks_bulk():
+    user_id = current_user_id()
+    
+    data = request.get_json(silent=True)
+    
+    if request.method == 'PATCH':
+        items, error = bulk_items(data, 'tasks')
+        if error:
+            return jsonify({'error': error}), 400
+        
+        ids = [item.get('id') for item in items if isinstance(item, dict) and isinstance(item.get('id'), int)]
+        tasks_by_id = owned_tasks(user_id, ids)
+        
+        results = []
+        for index, item in enumerate(items):
+            task_id = item.get('id') if isinstance(item, dict) else None
+            task = tasks_by_id.get(task_id) if isinstance(task_id, int) else None
+            if task is None:
+                results.append({'index': index, 'status': 'error', 'error': 'Task not found'})
+                continue
+            try:
+                apply_task_changes(task, item)
+                results.append({'index': index, 'id': task.id, 'status': 'updated'})
+            except ValueError as e:
+                results.append({'index': index, 'id': task.id, 'status': 'error', 'error': str(e)})
+        
+        if any(result['status'] == 'error' for result in results):
+            db.session.rollback()
+            return bulk_failure(results)
+        
+        try:
+            # Rows with the same changed columns are flushed as one executemany UPDATE
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'error': 'An error occurred while updating the tasks'}), 500
+        
+        return jsonify({'results': results, 'updated': len(results)}), 200
+    
+    elif request.method == 'DELETE':
+        ids, error = bulk_items(data, 'ids')
+        if error:
+            return jsonify({'error': error}), 400
+        if not all(isinstance(task_id, int) for task_id in ids):
+            return jsonify({'error': "'ids' must be a list of task ids"}), 400
+        
+        tasks_by_id = owned_tasks(user_id, ids)
+        
+        results = []
+        for index, task_id in enumerate(ids):
+            if task_id in tasks_by_id:
+                results.append({'index': index, 'id': task_id, 'status': 'deleted'})
+            else:
+                results.append({'index': index, 'id': task_id, 'status': 'error', 'error': 'Task not found'})
+        
+        if any(result['status'] == 'error' for result in results):
+            return bulk_failure(results)
+        
+        try:
+            for task in tasks_by_id.values():
+                db.session.delete(task)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'error': 'An error occurred while deleting the tasks'}), 500
+        
+        return jsonify({'results': results, 'deleted': len(results)}), 200
+
+
+# Accepts a multipart upload in the 'file' field or the raw CSV/NDJSON as the request body.
+# Valid rows are saved in chunks even if others fail; see the per-row errors in the report.
+# Read-mostly: on SQLite each chunk takes the writer queue for its own INSERT only, not
+# for as long as the client takes to upload the file.
+@api.route('/api/projects/<int:project_id>/tasks/import', methods=['POST'])
+@read_mostly
+@project_owner_required()
+def tasks_import(project_id):
+    user_id = current_user_id()
+    # End the ownership check's transaction before reading the body, so no snapshot or
+    # lock is held while a slow upload streams in
+    db.session.rollback()
+    
+    upload = request.files.get('file')
+    try:
+        if upload is not None:
+            import_format = detect_format(request.args.get('format'), upload.filename, upload.mimetype)
+            stream = upload.stream
+        else:
+            import_format = detect_format(request.args.get('format'), mimetype=request.mimetype)
+            stream = request.stream
+        report = import_tasks(
+            stream, project_id, user_id, import_format,
+            chunk_size=current_app.config['IMPORT_CHUNK_SIZE'],
+            max_errors=current_app.config['IMPORT_MAX_ERRORS']
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify(report.to_dict()), 200
+
+
 # ============== DASHBOARD ROUTE ==============
 
-@app.route('/api/dashboard', methods=['GET'])
+@api.route('/api/dashboard', methods=['GET'])
+@query_budget(6)
+@replica_reads
+@login_required
+@conditional_get
+@cached_response
 def dashboard():
-    user_id = session.get('user_id')
-    if not user_id:
-        return jsonify({'error': 'Authentication required'}), 401
-    
-    # Get user's projects
-    projects = Project.query.filter_by(user_id=user_id).all()
+    user_id = current_user_id()
     
-    # Calculate statistics
-    total_projects = len(projects)
-    active_projects = len([p for p in projects if p.status == 'active'])
-    completed_projects = len([p for p in projects if p.status == 'completed'])
+    return jsonify(dashboard_stats(user_id)), 200
+
+
+# ============== SEARCH ROUTE ==============
+
+@api.route('/api/search', methods=['GET'])
+@query_budget(1)
+@replica_reads
+@login_required
+def search_items():
+    """Ranked full-text search: ?q=words&type=tasks|projects&status=&priority=&cursor=&limit="""
+    kind = request.args.get('type', 'tasks')
+    try:
+        items, next_cursor = search.search(
+            kind, request.args.get('q'), current_user_id(), request.args,
+            request.args.get('cursor'), page_limit(), current_app.config['SEARCH_RANK_WINDOW']
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    # Get all tasks for the user
-    all_tasks = []
-    for project in projects:
-        all_tasks.extend(project.tasks)
+    serializer = task_serializer if kind == 'tasks' else project_serializer
+    return jsonify({
+        kind: serializer.dump_many(items),
+        'next_cursor': next_cursor,
+        'has_more': next_cursor is not None
+    }), 200
+
+
+# ============== EXPORT ROUTE ==============
+
+# Not cached and without a query budget: the body is produced after the view returns
+@api.route('/api/export', methods=['GET'])
+@login_required
+def export_data():
+    user_id = current_user_id()
     
-    total_tasks = len(all_tasks)
-    todo_tasks = len([t for t in all_tasks if t.status == 'todo'])
-    in_progress_tasks = len([t for t in all_tasks if t.status == 'in_progress'])
-    completed_tasks = len([t for t in all_tasks if t.status == 'completed'])
+    export_format = request.args.get('format', 'ndjson')
+    try:
+        chunks = export_stream(
+            user_id,
+            format=export_format,
+            resource=request.args.get('resource', 'all' if export_format == 'ndjson' else 'tasks'),
+            yield_per=current_app.config['EXPORT_YIELD_PER']
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    # Get recent tasks
-    recent_tasks = sorted(all_tasks, key=lambda x: x.created_at, reverse=True)[:5]
+    response = Response(stream_with_context(chunks), mimetype=FORMATS[export_format])
+    response.headers['Content-Disposition'] = f'attachment; filename=tricab-export.{export_format}'
+    return response
+
+
+# ============== SYNC ROUTE ==============
+
+# Primary only: on a lagging replica a token from the primary would look unknown and force a full copy
+@api.route('/api/sync', methods=['GET'])
+@query_budget(5)
+@login_required
+@conditional_get
+@cached_response
+def sync_changes():
+    """Projects and tasks changed since ?since=<token>, plus tombstones: ?since=&limit="""
+    limit = request.args.get('limit', current_app.config['SYNC_PAGE_SIZE'], type=int)
+    try:
+        page = sync(current_user_id(), request.args.get('since'),
+                    max(1, min(limit, current_app.config['SYNC_PAGE_SIZE'])))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
     return jsonify({
-        'projects': {
-            'total': total_projects,
-            'active': active_projects,
-            'completed': completed_projects
-        },
-        'tasks': {
-            'total': total_tasks,
-            'todo': todo_tasks,
-            'in_progress': in_progress_tasks,
-            'completed': completed_tasks
-        },
-        'recent_tasks': [task.to_dict() for task in recent_tasks]
+        'projects': project_serializer.dump_many(page.projects),
+        'tasks': task_serializer.dump_many(page.tasks),
+        **page.meta()
     }), 200
 
 
-# ============== AI INTEGRATION (OPTIONAL) ==============
+# ============== CHANGE FEED ROUTE ==============
 
-@app.route('/api/ai/generate-task-description', methods=['POST'])
-def generate_task_description():
-    user_id = session.get('user_id')
-    if not user_id:
-        return jsonify({'error': 'Authentication required'}), 401
+# Server-sent events with the user's project/task changes as they are committed; resumes
+# after ?since=<seq> or the Last-Event-ID a reconnecting EventSource sends. Like the
+# export, no query budget: the body is produced after the view returns. Each stream holds
+# a request thread, so at most CHANGE_FEED_MAX_STREAMS run per process; past that the
+# client gets a 503 and falls back to polling.
+@api.route('/api/changes/stream', methods=['GET'])
+@login_required
+def change_stream():
+    since = request.args.get('since') or request.headers.get('Last-Event-ID')
+    if since is not None:
+        try:
+            since = int(since)
+        except ValueError:
+            return jsonify({'error': 'since must be a change sequence number'}), 400
     
-    if not app.config.get('OPENAI_API_KEY'):
-        return jsonify({'error': 'OpenAI API key not configured'}), 503
+    slots = current_app.extensions['change_stream_slots']
+    if not slots.acquire(blocking=False):
+        response = jsonify({'error': 'Too many open change streams, poll for changes instead'})
+        response.headers['Retry-After'] = '30'
+        return response, 503
     
+    response = Response(stream_with_context(change_events(current_user_id(), since)), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    # Runs when the stream ends or the client goes away, and if it's never started
+    response.call_on_close(slots.release)
+    return response
+
+
+# ============== AI INTEGRATION (OPTIONAL) ==============
+
+def submit_description_job():
+    """Queue an AI description for the request's title: (job, None) or (None, error response)"""
+    data = request.get_json(silent=True) or {}
     try:
-        from openai import OpenAI
-        client = OpenAI(api_key=app.config['OPENAI_API_KEY'])
-        
-        data = request.get_json()
-        task_title = data.get('title', '')
-        
-        if not task_title:
-            return jsonify({'error': 'Task title is required'}), 400
-        
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant that generates detailed task descriptions for project management."},
-                {"role": "user", "content": f"Generate a detailed description for this task: {task_title}. Keep it under 200 words."}
-            ],
-            max_tokens=200
-        )
-        
-        description = response.choices[0].message.content.strip()
-        
-        return jsonify({'description': description}), 200
-        
-    except Exception as e:
-        return jsonify({'error': f'AI generation failed: {str(e)}'}), 500
+        return ai_jobs.submit(current_user_id(), data.get('title', '')), None
+    except AIUnavailable as e:
+        return None, (jsonify({'error': str(e)}), 503)
+    except ValueError as e:
+        return None, (jsonify({'error': str(e)}), 400)
+    except TooManyJobs as e:
+        response = jsonify({'error': str(e)})
+        response.headers['Retry-After'] = '2'
+        return None, (response, 429)
+    except QueueFull:
+        return None, server_busy()
+
+
+# Returns the finished job (200) on a cache hit, otherwise the queued one (202): poll
+# GET /api/ai/jobs/<id> or stream GET /api/ai/jobs/<id>/stream until it's done
+@api.route('/api/ai/jobs', methods=['POST'])
+@query_budget(0)
+@login_required
+def ai_job_create():
+    job, error = submit_description_job()
+    if error:
+        return error
+    
+    response = jsonify(public_job(job))
+    response.headers['Location'] = f"/api/ai/jobs/{job['id']}"
+    return response, 200 if job['status'] == 'done' else 202
+
+
+@api.route('/api/ai/jobs/<job_id>', methods=['GET'])
+@query_budget(0)
+@login_required
+def ai_job(job_id):
+    job = ai_jobs.get(job_id, current_user_id())
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(public_job(job)), 200
+
+
+# Server-sent events: 'delta' events with the text so far, then one 'done' or 'failed' with the job
+@api.route('/api/ai/jobs/<job_id>/stream', methods=['GET'])
+@query_budget(0)
+@login_required
+def ai_job_stream(job_id):
+    job = ai_jobs.get(job_id, current_user_id())
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    response = Response(ai_jobs.events(job), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
+# Kept for older clients: submits a job and waits for it, holding a request thread meanwhile
+@api.route('/api/ai/generate-task-description', methods=['POST'])
+@query_budget(0)
+@login_required
+def generate_task_description():
+    job, error = submit_description_job()
+    if error:
+        return error
+    
+    if not ai_jobs.wait(job['id'], ai_jobs.timeout + 1):
+        return jsonify({'error': 'AI generation timed out'}), 504
+    job = ai_jobs.get(job['id'], current_user_id())
+    if job['status'] != 'done':
+        return jsonify({'error': job['error']}), 502
+    return jsonify({'description': job['description'], 'cached': job['cached']}), 200
+
+
+# Module-level app for `flask` CLI, scripts and `gunicorn app:app`; see wsgi.py for production
+app = create_app()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,12 @@
+"""
+ASGI adapter for uvicorn and other ASGI servers (requires `pip install asgiref uvicorn`):
+
+    uvicorn asgi:app --workers 4
+
+The app itself stays WSGI; requests run on asgiref's thread pool.
+"""
+
+from asgiref.wsgi import WsgiToAsgi
+from wsgi import app as wsgi_app
+
+app = WsgiToAsgi(wsgi_app)
@@ -0,0 +1,150 @@
+from functools import wraps
+from flask import current_app, g, has_app_context, jsonify, session
+from sqlalchemy import event, exists, select
+from cache import LRUCache
+from changes import owner_id
+from models import db, User, Project, Task
+from serializers import user_serializer
+
+
+def init_app(app):
+    """Short-TTL, in-process cache of identities and confirmed ownership.
+
+    Only positive answers are cached. Deletes committed in this process evict their
+    entries right away; other processes see them once AUTH_CACHE_TTL runs out.
+    """
+    app.extensions['auth_cache'] = LRUCache(app.config['AUTH_CACHE_MAX_ENTRIES'])
+
+
+def _cache():
+    return current_app.extensions['auth_cache']
+
+
+def _ttl():
+    return current_app.config['AUTH_CACHE_TTL']
+
+
+def current_user_id():
+    """The logged-in user's id, read from the session once per request"""
+    if 'user_id' not in g:
+        g.user_id = session.get('user_id')
+    return g.user_id
+
+
+def remember_user(user_data):
+    """Prime the identity cache with an already serialized user, e.g. right after login"""
+    _cache().set(f"user:{user_data['id']}", user_data, _ttl())
+
+
+def current_user():
+    """The serialized logged-in user, or None; one primary-key query on a cache miss"""
+    user_id = current_user_id()
+    if not user_id:
+        return None
+
+    user_data = _cache().get(f'user:{user_id}')
+    if user_data is None:
+        user = db.session.get(User, user_id)
+        if user is None:
+            return None
+        user_data = user_serializer.dump(user)
+        remember_user(user_data)
+    return user_data
+
+
+def _access(kind, object_id, user_id, statement):
+    """'ok', 'forbidden' or 'missing', from the cache or a single two-EXISTS query"""
+    key = f'{kind}:{object_id}:{user_id}'
+    if _cache().get(key):
+        return 'ok'
+
+    found, owned = db.session.execute(statement).one()
+    if owned:
+        _cache().set(key, True, _ttl())
+        return 'ok'
+    return 'forbidden' if found else 'missing'
+
+
+def project_access(user_id, project_id):
+    by_id = Project.id == project_id
+    access = _access('project', project_id, user_id, select(
+        exists().where(by_id),
+        exists().where(by_id, Project.user_id == user_id)
+    ))
+    if access == 'ok':
+        # Lets the counters bookkeeping resolve new tasks' owner without loading the project
+        db.session.info.setdefault('project_owners', {})[project_id] = user_id
+    return access
+
+
+def task_access(user_id, task_id):
+    by_id = Task.id == task_id
+    return _access('task', task_id, user_id, select(
+        exists().where(by_id),
+        exists().where(by_id, Task.project_id == Project.id, Project.user_id == user_id)
+    ))
+
+
+def login_required(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not current_user_id():
+            return jsonify({'error': 'Authentication required'}), 401
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def _ownership_required(check, arg, label):
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            user_id = current_user_id()
+            if not user_id:
+                return jsonify({'error': 'Authentication required'}), 401
+
+            access = check(user_id, kwargs[arg])
+            if access == 'missing':
+                return jsonify({'error': f'{label} not found'}), 404
+            if access == 'forbidden':
+                return jsonify({'error': 'Unauthorized access'}), 403
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def project_owner_required(arg='project_id'):
+    """Require a logged-in user who owns the project named by the `arg` URL parameter"""
+    return _ownership_required(project_access, arg, 'Project')
+
+
+def task_owner_required(arg='id'):
+    """Require a logged-in user who owns (the project of) the task named by the `arg` URL parameter"""
+    return _ownership_required(task_access, arg, 'Task')
+
+
+# ============== EVICTION ON DELETE ==============
+
+@event.listens_for(db.session, 'after_flush')
+def _collect_deleted(session, flush_context):
+    evict = session.info.setdefault('auth_evict', set())
+    for obj in session.deleted:
+        if isinstance(obj, Project):
+            evict.add(f'project:{obj.id}:{obj.user_id}')
+        elif isinstance(obj, Task):
+            evict.add(f'task:{obj.id}:{owner_id(session, obj)}')
+        elif isinstance(obj, User):
+            evict.add(f'user:{obj.id}')
+
+
+@event.listens_for(db.session, 'after_commit')
+def _evict_deleted(session):
+    keys = session.info.pop('auth_evict', None)
+    if keys and has_app_context() and 'auth_cache' in current_app.extensions:
+        cache = _cache()
+        for key in keys:
+            cache.delete(key)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_deleted(session):
+    session.info.pop('auth_evict', None)
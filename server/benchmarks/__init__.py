@@ -0,0 +1,41 @@
+"""
+Micro-benchmarks for the API's hot paths.
+Run from the server directory, e.g.: python -m benchmarks.serialization
+"""
+
+import os
+import time
+
+# Benchmarks run against a throwaway in-memory database unless told otherwise
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+
+def setup_app():
+    """Import the Flask app with SQL echo off and an empty schema created"""
+    from app import app
+    from models import db
+
+    with app.app_context():
+        db.engine.echo = False
+        db.create_all()
+    return app
+
+
+def measure(fn, repeat=3):
+    """Best wall-clock time of `repeat` runs, in seconds"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def print_table(title, header, rows):
+    widths = [max(len(str(cell)) for cell in column) for column in zip(header, *rows)]
+    print(f"\n{title}")
+    print('  '.join(str(cell).ljust(width) for cell, width in zip(header, widths)))
+    print('  '.join('-' * width for width in widths))
+    for row in rows:
+        print('  '.join(str(cell).ljust(width) for cell, width in zip(row, widths)))
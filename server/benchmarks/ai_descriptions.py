@@ -0,0 +1,117 @@
+"""
+AI description requests against the fake completion server (no API key or network
+needed), through the blocking endpoint versus the job queue. Each client asks for
+--requests descriptions, a --repeat-ratio share of them for titles asked before
+(cache hits). Reports how long each request holds a server thread, how long until
+the description is ready, and how many connections the API saw.
+
+    python -m benchmarks.ai_descriptions --clients 8 --latency 0.5
+"""
+
+import argparse
+import os
+import random
+import statistics
+import threading
+import time
+from benchmarks import print_table
+from fake_completions import serve_in_thread
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def run(app, fake, mode, clients, requests, repeat_ratio):
+    held, ready, statuses = [], [], []
+    lock = threading.Lock()
+
+    # Signed up one by one: the in-memory database has a single connection shared by all threads
+    test_clients = []
+    for index in range(clients):
+        client = app.test_client()
+        client.post('/api/signup', json={'username': f'{mode}_user_{index}', 'email': f'{mode}{index}@example.com',
+                                         'password': 'bench-pass'})
+        test_clients.append(client)
+
+    def client_loop(index):
+        client = test_clients[index]
+        rng = random.Random(index)
+        titles = []
+        for number in range(requests):
+            if titles and rng.random() < repeat_ratio:
+                title = rng.choice(titles).upper()
+            else:
+                title = f'{mode} client {index} task {number}'
+                titles.append(title)
+
+            start = time.perf_counter()
+            if mode == 'blocking':
+                response = client.post('/api/ai/generate-task-description', json={'title': title})
+                elapsed = time.perf_counter() - start
+                done = elapsed
+            else:
+                response = client.post('/api/ai/jobs', json={'title': title})
+                elapsed = time.perf_counter() - start
+                job = response.get_json()
+                while response.status_code in (200, 202) and job['status'] not in ('done', 'failed'):
+                    time.sleep(0.05)
+                    job = client.get(f"/api/ai/jobs/{job['id']}").get_json()
+                done = time.perf_counter() - start
+            with lock:
+                held.append(elapsed)
+                ready.append(done)
+                statuses.append(response.status_code)
+
+    before = dict(fake.stats)
+    threads = [threading.Thread(target=client_loop, args=(index,)) for index in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return (
+        mode,
+        len(statuses),
+        f'{statistics.median(held) * 1000:.1f}',
+        f'{percentile(held, 0.95) * 1000:.1f}',
+        f'{statistics.median(ready) * 1000:.0f}',
+        f'{percentile(ready, 0.95) * 1000:.0f}',
+        fake.stats['requests'] - before['requests'],
+        fake.stats['connections'] - before['connections'],
+        sum(status >= 400 for status in statuses),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=5, help='descriptions per client')
+    parser.add_argument('--repeat-ratio', type=float, default=0.4, help='share of requests repeating a title')
+    parser.add_argument('--latency', type=float, default=0.5, help='fake API seconds before the first token')
+    args = parser.parse_args()
+
+    fake, base_url = serve_in_thread(latency=args.latency, token_delay=0.005)
+    os.environ.update(OPENAI_API_KEY='fake', OPENAI_BASE_URL=base_url, CACHE_BACKEND='none')
+    # One job per client at a time, like a user waiting on the form
+    os.environ.setdefault('AI_MAX_JOBS_PER_USER', '1')
+
+    from benchmarks import setup_app
+    app = setup_app()
+    app.config['QUERY_BUDGET_MODE'] = 'off'
+    hasher = app.extensions['password_hasher']
+    hasher.workers = 0
+    hasher.rounds = 4
+
+    rows = [run(app, fake, mode, args.clients, args.requests, args.repeat_ratio) for mode in ('blocking', 'jobs')]
+    print_table(f'{args.clients} clients x {args.requests} descriptions, {args.repeat_ratio:.0%} repeated titles, '
+                f'fake API latency {args.latency:g}s',
+                ('mode', 'requests', 'thread held p50 ms', 'held p95 ms', 'ready p50 ms', 'ready p95 ms',
+                 'API calls', 'API connections', 'errors'), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Compare creating/updating N tasks one request at a time with the bulk endpoints.
+Uses an on-disk SQLite database by default so per-commit fsync cost is included.
+
+    python -m benchmarks.bulk_tasks --tasks 500
+"""
+
+import argparse
+import os
+import tempfile
+from benchmarks import measure, print_table
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tasks', type=int, default=500, help='tasks per run')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--database', help='database URL (default: a temporary SQLite file)')
+    args = parser.parse_args()
+
+    tmpdir = tempfile.TemporaryDirectory()
+    os.environ['DATABASE_URL'] = args.database or f"sqlite:///{os.path.join(tmpdir.name, 'bench.db')}"
+    # Before the app exists: its cache backend is built when it is created
+    os.environ['CACHE_BACKEND'] = 'none'
+
+    from benchmarks import setup_app
+    app = setup_app()
+    app.config['QUERY_BUDGET_MODE'] = 'off'
+
+    client = app.test_client()
+    client.post('/api/signup', json={'username': 'bench_user', 'email': 'bench@example.com', 'password': 'bench-pass'})
+
+    def new_project():
+        return client.post('/api/projects', json={'name': 'Benchmark project'}).get_json()['id']
+
+    payload = [{'title': f'Task {i}', 'priority': 'high', 'due_date': '2030-01-01T00:00:00Z'}
+               for i in range(args.tasks)]
+
+    def create_per_row():
+        project_id = new_project()
+        for item in payload:
+            client.post(f'/api/projects/{project_id}/tasks', json=item)
+
+    def create_bulk():
+        project_id = new_project()
+        response = client.post(f'/api/projects/{project_id}/tasks/bulk', json={'tasks': payload})
+        assert response.status_code == 201, response.get_json()
+
+    project_id = new_project()
+    created = client.post(f'/api/projects/{project_id}/tasks/bulk', json={'tasks': payload}).get_json()
+    ids = [result['id'] for result in created['results']]
+    toggle = iter(range(10 ** 9))
+
+    def update_per_row():
+        status = 'completed' if next(toggle) % 2 else 'in_progress'
+        for task_id in ids:
+            client.patch(f'/api/tasks/{task_id}', json={'status': status})
+
+    def update_bulk():
+        status = 'completed' if next(toggle) % 2 else 'in_progress'
+        response = client.patch('/api/tasks/bulk', json={'tasks': [{'id': i, 'status': status} for i in ids]})
+        assert response.status_code == 200, response.get_json()
+
+    rows = []
+    for label, per_row, bulk in (('create', create_per_row, create_bulk), ('update', update_per_row, update_bulk)):
+        per_row_seconds = measure(per_row, args.repeat)
+        bulk_seconds = measure(bulk, args.repeat)
+        rows.append((label, f'{per_row_seconds * 1000:.0f}', f'{bulk_seconds * 1000:.0f}',
+                     f'{per_row_seconds / bulk_seconds:.1f}x'))
+
+    print_table(f'{args.tasks} tasks, best of {args.repeat} (database: {app.config["SQLALCHEMY_DATABASE_URI"]})',
+                ('operation', 'per-row ms', 'bulk ms', 'speedup'), rows)
+    tmpdir.cleanup()
+
+
+if __name__ == '__main__':
+    main()
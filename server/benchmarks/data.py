@@ -0,0 +1,176 @@
+"""
+Synthetic data for load tests: --users x --projects (per user) x --tasks (per project),
+bulk-inserted with realistic status, priority and due-date mixes. Every user is
+user_<id> with password bench-pass. Writes to DATABASE_URL (or --database), creating
+the schema if needed; run it again to add more users.
+
+    python -m benchmarks.data --database sqlite:///bench.db --users 1000 --projects 10 --tasks 100
+"""
+
+import argparse
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+PASSWORD = 'bench-pass'
+
+# Weights, roughly what a team tracker looks like after a year of use
+PROJECT_STATUSES = {'active': 60, 'completed': 25, 'archived': 15}
+OPEN_PROJECT_TASKS = {'todo': 45, 'in_progress': 20, 'completed': 35}
+CLOSED_PROJECT_TASKS = {'todo': 5, 'in_progress': 5, 'completed': 90}
+PRIORITIES = {'low': 25, 'medium': 50, 'high': 25}
+NO_DUE_DATE = 0.25
+OVERDUE = 0.2  # of the open tasks with a due date
+
+VERBS = ('Design', 'Implement', 'Review', 'Test', 'Fix', 'Document', 'Deploy', 'Refactor', 'Plan', 'Update',
+         'Migrate', 'Write', 'Research', 'Prepare', 'Schedule', 'Audit')
+NOUNS = ('homepage', 'login flow', 'database schema', 'API client', 'release notes', 'onboarding email',
+         'billing page', 'search index', 'dashboard', 'mobile layout', 'budget', 'test plan', 'backlog',
+         'user survey', 'analytics events', 'style guide', 'invoice export', 'permissions model')
+AREAS = ('Website', 'Mobile App', 'Marketing', 'Platform', 'Infrastructure', 'Support', 'Sales', 'Design System',
+         'Data', 'Security', 'Hiring', 'Onboarding')
+
+
+def _choice(rng, weights):
+    return rng.choices(tuple(weights), weights=tuple(weights.values()))[0]
+
+
+def _moment(rng, start, end):
+    return start + timedelta(seconds=rng.uniform(0, max((end - start).total_seconds(), 0)))
+
+
+def _task(rng, number, project, now):
+    open_project = project['status'] == 'active'
+    status = _choice(rng, OPEN_PROJECT_TASKS if open_project else CLOSED_PROJECT_TASKS)
+    if status == 'completed':
+        created_at = _moment(rng, project['created_at'], project['updated_at'])
+    else:
+        # Open work is mostly recent
+        created_at = max(project['created_at'], now - timedelta(days=rng.expovariate(1 / 30)))
+
+    due_date = None
+    if rng.random() >= NO_DUE_DATE:
+        # End of a working day: a couple of weeks after creation for finished work, and for
+        # open work either a few days overdue or a couple of weeks out
+        if status == 'completed':
+            due = created_at + timedelta(days=1 + rng.expovariate(1 / 14))
+        elif rng.random() < OVERDUE:
+            due = now - timedelta(days=1 + rng.expovariate(1 / 7))
+        else:
+            due = now + timedelta(days=rng.expovariate(1 / 14))
+        due_date = due.replace(hour=17, minute=0, second=0, microsecond=0)
+
+    return {
+        'title': f'{rng.choice(VERBS)} {rng.choice(NOUNS)} #{number}',
+        'description': '' if rng.random() < 0.3 else f'{rng.choice(VERBS)} the {rng.choice(NOUNS)} for the '
+                                                      f'{rng.choice(NOUNS)}.',
+        'status': status,
+        'priority': _choice(rng, PRIORITIES),
+        'due_date': due_date,
+        'project_id': project['id'],
+        'created_at': created_at,
+        'updated_at': _moment(rng, created_at, now) if status != 'todo' else created_at,
+    }
+
+
+def generate(app, users, projects_per_user, tasks_per_project, days=365, seed=1, batch=10000):
+    """Bulk-insert the dataset; returns the new users' ids.
+
+    The database assigns every id, so deleted ids are never handed out again and
+    PostgreSQL sequences stay ahead of the rows. Users are inserted under a
+    placeholder name and renamed user_<id> in one UPDATE. The search index is
+    rebuilt once at the end and the dashboard counters are written directly,
+    instead of through the per-row triggers and flush hooks. Nothing goes to the
+    change log: clients syncing a generated account start with a full copy anyway.
+    """
+    from sqlalchemy import String, cast, insert, literal, update
+    from models import db, User, Project, Task, UserStats
+    from search import create_search_index, drop_search_index
+
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    start = now - timedelta(days=days)
+    run = f'{time.time_ns():x}'
+
+    with app.app_context():
+        password_hash = app.extensions['password_hasher'].hash(PASSWORD)
+
+        user_ids = db.session.scalars(insert(User).returning(User.id, sort_by_parameter_order=True), [
+            {'username': f'bench_{run}_{n}', 'email': f'bench_{run}_{n}@example.com', '_password_hash': password_hash,
+             'created_at': start} for n in range(users)
+        ]).all()
+        name = literal('user_') + cast(User.id, String)
+        db.session.execute(update(User).where(User.id.in_(user_ids))
+                           .values(username=name, email=name + literal('@example.com')))
+
+        projects, stats = [], {}
+        for u in user_ids:
+            stats[u] = dict.fromkeys(('projects_active', 'projects_completed', 'projects_archived',
+                                      'tasks_todo', 'tasks_in_progress', 'tasks_completed'), 0)
+            for _ in range(projects_per_user):
+                created_at = _moment(rng, start, now)
+                status = _choice(rng, PROJECT_STATUSES)
+                projects.append({
+                    'name': f'{rng.choice(AREAS)} {len(projects) + 1}',
+                    'description': f'{rng.choice(VERBS)} the {rng.choice(NOUNS)}', 'status': status, 'user_id': u,
+                    'created_at': created_at,
+                    'updated_at': now if status == 'active' else _moment(rng, created_at, now),
+                })
+                stats[u][f'projects_{status}'] += 1
+        for offset in range(0, len(projects), batch):
+            chunk = projects[offset:offset + batch]
+            ids = db.session.scalars(insert(Project).returning(Project.id, sort_by_parameter_order=True), chunk).all()
+            for project, id in zip(chunk, ids):
+                project['id'] = id
+        db.session.commit()
+
+        # Index once at the end instead of through the triggers row by row
+        drop_search_index(db.session.connection())
+        rows, number = [], 0
+        for project in projects:
+            for _ in range(tasks_per_project):
+                number += 1
+                rows.append(_task(rng, number, project, now))
+                stats[project['user_id']][f"tasks_{rows[-1]['status']}"] += 1
+                if len(rows) == batch:
+                    db.session.execute(insert(Task), rows)
+                    db.session.commit()
+                    rows = []
+        if rows:
+            db.session.execute(insert(Task), rows)
+        db.session.execute(insert(UserStats), [{'user_id': u, **counts} for u, counts in stats.items()])
+        create_search_index(db.session.connection())
+        db.session.commit()
+    return user_ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--projects', type=int, default=10, help='projects per user')
+    parser.add_argument('--tasks', type=int, default=100, help='tasks per project')
+    parser.add_argument('--days', type=int, default=365, help='history to spread creation dates over')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--database', help='database URL (default: DATABASE_URL)')
+    args = parser.parse_args()
+
+    if args.database:
+        os.environ['DATABASE_URL'] = args.database
+    elif os.environ['DATABASE_URL'] == 'sqlite://':
+        parser.error('--database or DATABASE_URL is required (the default is a throwaway in-memory database)')
+
+    from benchmarks import setup_app
+    app = setup_app()
+    app.config['QUERY_BUDGET_MODE'] = 'off'
+
+    start = time.perf_counter()
+    user_ids = generate(app, args.users, args.projects, args.tasks, days=args.days, seed=args.seed)
+    elapsed = time.perf_counter() - start
+    tasks = args.users * args.projects * args.tasks
+    print(f'Generated users {user_ids[0]}-{user_ids[-1]}, {args.users * args.projects} projects and {tasks} tasks '
+          f'in {elapsed:.1f}s ({tasks / elapsed:.0f} tasks/s); log in as user_<id> / {PASSWORD}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+Stream GET /api/export for users of increasing size and report time and peak
+Python memory, next to materializing the same tasks as ORM objects in one list.
+
+    python -m benchmarks.export --sizes 1000 10000 100000
+"""
+
+import argparse
+import tracemalloc
+from sqlalchemy import insert
+from benchmarks import setup_app, measure, print_table
+
+
+def populate(client, size, tasks_per_project=100):
+    from models import db, User, Project, Task
+
+    username = f'export_{size}'
+    client.post('/api/signup', json={'username': username, 'email': f'{username}@example.com', 'password': 'bench-pass'})
+    user_id = User.query.filter_by(username=username).one().id
+
+    project_count = max(size // tasks_per_project, 1)
+    projects = [Project(name=f'Project {i}', description='Benchmark project', user_id=user_id)
+                for i in range(project_count)]
+    db.session.add_all(projects)
+    db.session.flush()
+
+    db.session.execute(insert(Task), [
+        {'title': f'Task {i}', 'description': 'Benchmark task', 'status': 'todo', 'priority': 'medium',
+         'project_id': projects[i % project_count].id}
+        for i in range(size)
+    ])
+    db.session.commit()
+    return user_id
+
+
+def peak_memory(fn):
+    """Peak traced allocation while running fn, in MiB"""
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000], help='tasks per user')
+    parser.add_argument('--format', choices=('ndjson', 'csv'), default='ndjson')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    app = setup_app()
+    app.config['QUERY_BUDGET_MODE'] = 'off'
+    from models import db, Project, Task
+    from serializers import task_serializer
+
+    rows = []
+    for size in args.sizes:
+        client = app.test_client()
+        with app.app_context():
+            user_id = populate(client, size)
+
+        def stream():
+            response = client.get(f'/api/export?format={args.format}', buffered=False)
+            received = sum(len(chunk) for chunk in response.response)
+            response.close()
+            return received
+
+        def materialize():
+            with app.app_context():
+                tasks = Task.query.join(Project).filter(Project.user_id == user_id).all()
+                task_serializer.dump_many(tasks)
+                db.session.remove()
+
+        rows.append((
+            size,
+            f'{measure(stream, args.repeat) * 1000:.0f}',
+            f'{peak_memory(stream):.1f}',
+            f'{measure(materialize, args.repeat) * 1000:.0f}',
+            f'{peak_memory(materialize):.1f}',
+        ))
+
+    print_table(f'GET /api/export?format={args.format} vs loading every task, best of {args.repeat}',
+                ('tasks', 'stream ms', 'stream peak MiB', 'load-all ms', 'load-all peak MiB'), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""
+Rows/sec of the streaming task import for CSV and NDJSON at several chunk sizes,
+next to creating the same tasks one POST /api/projects/<id>/tasks request at a time.
+Uses an on-disk SQLite database by default so per-commit cost is included.
+
+    python -m benchmarks.import_tasks --rows 50000
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import tempfile
+import time
+from benchmarks import print_table
+
+FIELDS = ('title', 'description', 'status', 'priority', 'due_date')
+
+
+def generate(rows, format):
+    records = ({
+        'title': f'Imported task {i}',
+        'description': 'Loaded by the import benchmark',
+        'status': ('todo', 'in_progress', 'completed')[i % 3],
+        'priority': ('low', 'medium', 'high')[i % 3],
+        'due_date': '2030-01-01 00:00:00'
+    } for i in range(rows))
+
+    if format == 'ndjson':
+        return ''.join(json.dumps(record) + '\n' for record in records).encode()
+
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, FIELDS)
+    writer.writeheader()
+    writer.writerows(records)
+    return buffer.getvalue().encode()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--chunk-sizes', type=int, nargs='+', default=[100, 1000, 5000])
+    parser.add_argument('--per-row-sample', type=int, default=500,
+                        help='tasks created through the single-task endpoint for comparison')
+    parser.add_argument('--database', help='database URL (default: a temporary SQLite file)')
+    args = parser.parse_args()
+
+    tmpdir = tempfile.TemporaryDirectory()
+    os.environ['DATABASE_URL'] = args.database or f"sqlite:///{os.path.join(tmpdir.name, 'bench.db')}"
+
+    from benchmarks import setup_app
+    app = setup_app()
+    app.config['QUERY_BUDGET_MODE'] = 'off'
+    from importer import import_tasks
+    from models import db, Project
+
+    client = app.test_client()
+    client.post('/api/signup', json={'username': 'bench_user', 'email': 'bench@example.com', 'password': 'bench-pass'})
+
+    def new_project():
+        return client.post('/api/projects', json={'name': 'Import benchmark'}).get_json()['id']
+
+    rows = []
+    for format in ('csv', 'ndjson'):
+        payload = generate(args.rows, format)
+        for chunk_size in args.chunk_sizes:
+            project_id = new_project()
+            with app.app_context():
+                user_id = db.session.get(Project, project_id).user_id
+                report = import_tasks(io.BytesIO(payload), project_id, user_id, format, chunk_size=chunk_size)
+            assert report.imported == args.rows, report.to_dict()
+            rows.append((f'import {format}', chunk_size, report.imported,
+                         f'{report.elapsed:.2f}', f'{report.rows_per_second:,.0f}'))
+
+    project_id = new_project()
+    upload = client.post(f'/api/projects/{project_id}/tasks/import',
+                         data=generate(args.rows, 'ndjson'), content_type='application/x-ndjson').get_json()
+    rows.append(('POST .../tasks/import', app.config['IMPORT_CHUNK_SIZE'], upload['imported'],
+                 f"{upload['seconds']:.2f}", f"{upload['rows_per_second']:,}"))
+
+    project_id = new_project()
+    records = [json.loads(line) for line in generate(args.per_row_sample, 'ndjson').splitlines()]
+    start = time.perf_counter()
+    for record in records:
+        client.post(f'/api/projects/{project_id}/tasks', json=record)
+    elapsed = time.perf_counter() - start
+    rows.append(('POST .../tasks per row', 1, len(records), f'{elapsed:.2f}', f'{len(records) / elapsed:,.0f}'))
+
+    print_table(f'Task import (database: {app.config["SQLALCHEMY_DATABASE_URI"]})',
+                ('path', 'chunk', 'rows', 'seconds', 'rows/sec'), rows)
+    tmpdir.cleanup()
+
+
+if __name__ == '__main__':
+    main()
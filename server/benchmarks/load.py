@@ -0,0 +1,475 @@
+"""
+p50/p95/p99 latency and throughput of every API endpoint under --concurrency clients,
+in-process (Flask test clients) and over HTTP (a local threaded server, or --url),
+compared against a stored baseline. Each client logs in as a different generated
+user; writes go to a scratch project that is deleted afterwards, so runs repeat.
+
+    python -m benchmarks.data --database sqlite:////tmp/load.db --users 100 --projects 10 --tasks 100
+    python -m benchmarks.load --database sqlite:////tmp/load.db --concurrency 8 --save-baseline
+    python -m benchmarks.load --database sqlite:////tmp/load.db --concurrency 8   # exits 1 on a regression
+    python -m benchmarks.load --url http://localhost:5555 --users 100 --skip ai   # a running server
+
+Without --database a small dataset is generated in a temporary file. A result is a
+regression when its p95 is more than --tolerance slower than the baseline's (and at
+least 1 ms), or its throughput more than --tolerance lower. Baselines only compare
+on the same machine, dataset and settings.
+"""
+
+import argparse
+import http.client
+import json
+import logging
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from urllib.parse import urlsplit
+from benchmarks import print_table
+
+PASSWORD = 'bench-pass'
+BULK_SIZE = 20
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), 'load_baseline.json')
+
+
+def encode_json(value):
+    return json.dumps(value).encode()
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+# ============== CLIENTS ==============
+
+class InProcessClient:
+    """A Flask test client; requests run on the calling thread"""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, json=None, body=None, content_type=None, first_event=False):
+        """(status, body); with first_event, reads a stream up to its first event and hangs up"""
+        response = self.client.open(path, method=method, json=json, data=body, content_type=content_type,
+                                    buffered=not first_event)
+        if not first_event:
+            return response.status_code, response.get_data()
+        data = b''
+        for chunk in response.response:
+            data += chunk
+            if b'\n\n' in data:
+                break
+        response.close()
+        return response.status_code, data
+
+
+class HttpClient:
+    """One keep-alive connection and the session cookie, like a browser tab"""
+
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.connection = None
+        self.cookies = {}
+
+    def request(self, method, path, json=None, body=None, content_type=None, first_event=False):
+        headers = {}
+        if json is not None:
+            body, content_type = encode_json(json), 'application/json'
+        if content_type:
+            headers['Content-Type'] = content_type
+        if self.cookies:
+            headers['Cookie'] = '; '.join(f'{name}={value}' for name, value in self.cookies.items())
+
+        if self.connection is None:
+            self.connection = http.client.HTTPConnection(self.host, self.port, timeout=60)
+        try:
+            self.connection.request(method, path, body=body, headers=headers)
+            response = self.connection.getresponse()
+        except (http.client.HTTPException, OSError):
+            self.close()
+            raise
+
+        for header in response.headers.get_all('Set-Cookie') or ():
+            name, _, value = header.split(';', 1)[0].partition('=')
+            if value:
+                self.cookies[name.strip()] = value
+            else:
+                self.cookies.pop(name.strip(), None)
+
+        if first_event:
+            data = b''
+            while b'\n\n' not in data:
+                line = response.fp.readline()
+                if not line:
+                    break
+                data += line.replace(b'\r\n', b'\n')
+            # The rest of the stream never ends on its own: drop the connection
+            self.close()
+            return response.status, data
+        data = response.read()
+        if response.will_close:
+            self.close()
+        return response.status, data
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+# ============== SCENARIOS ==============
+
+class Worker:
+    """One simulated user: a logged-in client, their ids, and a scratch project for writes"""
+
+    def __init__(self, index, make_client, username):
+        self.index = index
+        self.make_client = make_client
+        self.client = make_client()
+        self.username = username
+        self.rng = random.Random(index)
+        self.created_projects = []
+        self.created_tasks = []
+
+    def call(self, method, path, **options):
+        """An untimed request that must succeed; returns the JSON body"""
+        status, data = self.client.request(method, path, **options)
+        if status >= 400:
+            raise RuntimeError(f'{method} {path} failed during setup: {status} {data[:200]!r}')
+        return json.loads(data) if data else None
+
+    def setup(self):
+        self.call('POST', '/api/login', json={'username': self.username, 'password': PASSWORD})
+        self.project_ids = [p['id'] for p in self.call('GET', '/api/projects?per_page=100')['projects']]
+        self.task_ids = [t['id'] for t in self.call('GET', '/api/tasks?limit=100')['tasks']]
+        if not self.project_ids or not self.task_ids:
+            raise RuntimeError(f'{self.username} has no projects or tasks: generate data with benchmarks.data')
+        self.scratch = self.call('POST', '/api/projects', json={'name': f'Load test scratch {self.index}'})['id']
+        self.spare = self.make_client()
+
+    def teardown(self):
+        for project_id in self.created_projects + [self.scratch]:
+            self.client.request('DELETE', f'/api/projects/{project_id}')
+
+    def new_projects(self, count):
+        """Projects to delete: those POST /api/projects created, then new ones"""
+        while len(self.created_projects) < count:
+            project = self.call('POST', '/api/projects', json={'name': f'Load test {self.rng.random():.8f}'})
+            self.created_projects.append(project['id'])
+        projects, self.created_projects = self.created_projects[:count], self.created_projects[count:]
+        return projects
+
+    def new_tasks(self, count):
+        """Scratch tasks to update or delete: those the create scenarios made, then new ones"""
+        while len(self.created_tasks) < count:
+            batch = [{'title': f'Load task {n}'} for n in range(min(count - len(self.created_tasks), 500))]
+            results = self.call('POST', f'/api/projects/{self.scratch}/tasks/bulk', json={'tasks': batch})['results']
+            self.created_tasks.extend(result['id'] for result in results)
+        tasks, self.created_tasks = self.created_tasks[:count], self.created_tasks[count:]
+        return tasks
+
+    def finished_job(self, title):
+        """A done AI job (also caching the description for `title`)"""
+        job = self.call('POST', '/api/ai/jobs', json={'title': title})
+        while job['status'] not in ('done', 'failed'):
+            time.sleep(0.02)
+            job = self.call('GET', f"/api/ai/jobs/{job['id']}")
+        return job
+
+
+# What the create scenarios make is kept for the update/delete scenarios after them
+
+def _created_project(worker, response):
+    if response[0] == 201:
+        worker.created_projects.append(json.loads(response[1])['id'])
+
+
+def _created_task(worker, response):
+    if response[0] == 201:
+        worker.created_tasks.append(json.loads(response[1])['id'])
+
+
+def _created_tasks(worker, response):
+    if response[0] == 201:
+        worker.created_tasks.extend(result['id'] for result in json.loads(response[1])['results'])
+
+
+def _import_body(n):
+    return ''.join(json.dumps({'title': f'Imported {n}.{i}', 'priority': 'low'}) + '\n'
+                   for i in range(BULK_SIZE)).encode()
+
+
+def _signup(worker):
+    name = f'load_{time.time_ns()}_{worker.index}'
+    return {'username': name, 'email': f'{name}@example.com', 'password': PASSWORD}
+
+
+# Each scenario: (name, group, prepare(worker, n) -> state or None, request(worker, state, i) -> request
+# (client, method, path, options), record(worker, response) or None). Creates run before the
+# updates and deletes that use what they made. Those in SLOW (bcrypt) run a tenth as often.
+SCENARIOS = [
+    ('POST /api/signup', 'auth', None,
+     lambda w, s, i: (w.spare, 'POST', '/api/signup', {'json': _signup(w)}), None),
+    ('POST /api/login', 'auth', None,
+     lambda w, s, i: (w.spare, 'POST', '/api/login', {'json': {'username': w.username, 'password': PASSWORD}}), None),
+    ('POST /api/logout', 'auth', None, lambda w, s, i: (w.spare, 'POST', '/api/logout', {}), None),
+    ('GET /api/check-session', 'read', None, lambda w, s, i: (w.client, 'GET', '/api/check-session', {}), None),
+
+    ('GET /api/projects', 'read', None,
+     lambda w, s, i: (w.client, 'GET', f"/api/projects?page={w.rng.randint(1, 3)}", {}), None),
+    ('GET /api/projects/<id>', 'read', None,
+     lambda w, s, i: (w.client, 'GET', f'/api/projects/{w.rng.choice(w.project_ids)}?include=tasks', {}), None),
+    ('GET /api/projects/<id>/tasks', 'read', None,
+     lambda w, s, i: (w.client, 'GET', f'/api/projects/{w.rng.choice(w.project_ids)}/tasks?status=todo', {}), None),
+    ('GET /api/tasks', 'read', None,
+     lambda w, s, i: (w.client, 'GET', '/api/tasks?status=todo,in_progress&priority=high&sort=due_date', {}), None),
+    ('GET /api/tasks/<id>', 'read', None,
+     lambda w, s, i: (w.client, 'GET', f'/api/tasks/{w.rng.choice(w.task_ids)}', {}), None),
+    ('GET /api/dashboard', 'read', None, lambda w, s, i: (w.client, 'GET', '/api/dashboard', {}), None),
+    ('GET /api/search', 'read', None,
+     lambda w, s, i: (w.client, 'GET', f"/api/search?q={w.rng.choice(('dashboard', 'budget', 'fix', 'schema'))}", {}),
+     None),
+    ('GET /api/export', 'read', None, lambda w, s, i: (w.client, 'GET', '/api/export', {}), None),
+    ('GET /api/sync', 'read', None, lambda w, s, i: (w.client, 'GET', '/api/sync?limit=100', {}), None),
+    ('GET /api/changes/stream', 'read', None,
+     lambda w, s, i: (w.client, 'GET', '/api/changes/stream', {'first_event': True}), None),
+
+    ('POST /api/projects', 'write', None,
+     lambda w, s, i: (w.client, 'POST', '/api/projects', {'json': {'name': f'Load test {w.index}.{i}'}}),
+     _created_project),
+    ('PATCH /api/projects/<id>', 'write', None,
+     lambda w, s, i: (w.client, 'PATCH', f'/api/projects/{w.scratch}', {'json': {'description': f'Revision {i}'}}),
+     None),
+    ('DELETE /api/projects/<id>', 'write', lambda w, n: w.new_projects(n),
+     lambda w, s, i: (w.client, 'DELETE', f'/api/projects/{s[i]}', {}), None),
+    ('POST /api/projects/<id>/tasks', 'write', None,
+     lambda w, s, i: (w.client, 'POST', f'/api/projects/{w.scratch}/tasks', {'json': {'title': f'Load task {i}'}}),
+     _created_task),
+    ('POST /api/projects/<id>/tasks/bulk', 'write', None,
+     lambda w, s, i: (w.client, 'POST', f'/api/projects/{w.scratch}/tasks/bulk',
+                      {'json': {'tasks': [{'title': f'Bulk task {i}.{n}'} for n in range(BULK_SIZE)]}}),
+     _created_tasks),
+    ('POST /api/projects/<id>/tasks/import', 'write', None,
+     lambda w, s, i: (w.client, 'POST', f'/api/projects/{w.scratch}/tasks/import',
+                      {'body': _import_body(i), 'content_type': 'application/x-ndjson'}), None),
+    ('PATCH /api/tasks/<id>', 'write', lambda w, n: w.new_tasks(1),
+     lambda w, s, i: (w.client, 'PATCH', f'/api/tasks/{s[0]}',
+                      {'json': {'status': ('todo', 'in_progress', 'completed')[i % 3]}}), None),
+    ('PATCH /api/tasks/bulk', 'write', lambda w, n: w.new_tasks(BULK_SIZE),
+     lambda w, s, i: (w.client, 'PATCH', '/api/tasks/bulk',
+                      {'json': {'tasks': [{'id': id, 'priority': ('low', 'medium', 'high')[i % 3]} for id in s]}}),
+     None),
+    ('DELETE /api/tasks/<id>', 'write', lambda w, n: w.new_tasks(n),
+     lambda w, s, i: (w.client, 'DELETE', f'/api/tasks/{s[i]}', {}), None),
+    ('DELETE /api/tasks/bulk', 'write', lambda w, n: w.new_tasks(n * BULK_SIZE),
+     lambda w, s, i: (w.client, 'DELETE', '/api/tasks/bulk', {'json': {'ids': s[i * BULK_SIZE:(i + 1) * BULK_SIZE]}}),
+     None),
+
+    # Cache hits after the first description: the fake API's latency isn't what's measured
+    ('POST /api/ai/jobs', 'ai', lambda w, n: w.finished_job('Load test description'),
+     lambda w, s, i: (w.client, 'POST', '/api/ai/jobs', {'json': {'title': 'Load test description'}}), None),
+    ('GET /api/ai/jobs/<id>', 'ai', lambda w, n: w.finished_job('Load test description'),
+     lambda w, s, i: (w.client, 'GET', f"/api/ai/jobs/{s['id']}", {}), None),
+    ('GET /api/ai/jobs/<id>/stream', 'ai', lambda w, n: w.finished_job('Load test description'),
+     lambda w, s, i: (w.client, 'GET', f"/api/ai/jobs/{s['id']}/stream", {}), None),
+    ('POST /api/ai/generate-task-description', 'ai', lambda w, n: w.finished_job('Load test description'),
+     lambda w, s, i: (w.client, 'POST', '/api/ai/generate-task-description',
+                      {'json': {'title': 'Load test description'}}), None),
+]
+SLOW = {'POST /api/signup', 'POST /api/login'}
+
+
+def run_scenario(workers, scenario, requests):
+    """Every worker sends `requests` requests at once; returns the result row's numbers"""
+    name, group, prepare, make_request, record = scenario
+    if name in SLOW:
+        requests = max(1, requests // 10)
+    latencies, errors = [], []
+    lock = threading.Lock()
+    states = [prepare(worker, requests) if prepare else None for worker in workers]
+    barrier = threading.Barrier(len(workers) + 1)
+
+    def loop(worker, state):
+        barrier.wait()
+        for i in range(requests):
+            client, method, path, options = make_request(worker, state, i)
+            start = time.perf_counter()
+            try:
+                response = client.request(method, path, **options)
+            except (http.client.HTTPException, OSError) as e:
+                response = (599, str(e).encode())
+            elapsed = time.perf_counter() - start
+            if record is not None:
+                record(worker, response)
+            with lock:
+                latencies.append(elapsed)
+                if response[0] >= 400:
+                    errors.append(response[0])
+
+    threads = [threading.Thread(target=loop, args=(worker, state)) for worker, state in zip(workers, states)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    return {
+        'requests': len(latencies),
+        'errors': len(errors),
+        'p50_ms': round(percentile(latencies, 0.5) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+        'rps': round(len(latencies) / elapsed, 1),
+        'statuses': sorted(set(errors)),
+    }
+
+
+def run(make_client, scenarios, usernames, concurrency, requests):
+    workers = [Worker(index, make_client, usernames[index % len(usernames)]) for index in range(concurrency)]
+    # One at a time: logins queue on the password hasher anyway
+    for worker in workers:
+        worker.setup()
+    try:
+        return {scenario[0]: run_scenario(workers, scenario, requests) for scenario in scenarios}
+    finally:
+        for worker in workers:
+            worker.teardown()
+
+
+# ============== BASELINE ==============
+
+def compare(result, baseline, tolerance):
+    """Why `result` regressed against `baseline`, or None"""
+    reasons = []
+    if result['p95_ms'] > baseline['p95_ms'] * (1 + tolerance) and result['p95_ms'] - baseline['p95_ms'] >= 1:
+        reasons.append(f"p95 {baseline['p95_ms']:g} -> {result['p95_ms']:g} ms")
+    if result['rps'] < baseline['rps'] * (1 - tolerance):
+        reasons.append(f"{baseline['rps']:g} -> {result['rps']:g} req/s")
+    if result['errors'] > baseline['errors']:
+        reasons.append(f"errors {baseline['errors']} -> {result['errors']}")
+    return ', '.join(reasons) or None
+
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(path, baseline, settings, results):
+    baseline = baseline if baseline and baseline.get('settings') == settings else {'settings': settings, 'modes': {}}
+    baseline['created_at'] = datetime.utcnow().isoformat(timespec='seconds')
+    for mode, rows in results.items():
+        baseline['modes'][mode] = {name: {key: value for key, value in row.items() if key != 'statuses'}
+                                   for name, row in rows.items()}
+    with open(path, 'w') as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+# ============== MAIN ==============
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mode', nargs='+', choices=('in-process', 'http'), default=None,
+                        help='default: both, or http alone with --url and no --database')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=100, help='requests per client per endpoint')
+    parser.add_argument('--database', help='database URL with generated data (default: generate a small one)')
+    parser.add_argument('--url', help='benchmark this running server over HTTP instead of a local one')
+    parser.add_argument('--users', type=int, default=20, help='generated users to log in as (and to generate)')
+    parser.add_argument('--first-user', type=int, default=1, help='id of the first generated user to log in as')
+    parser.add_argument('--only', help='regex: only endpoints whose name or group matches')
+    parser.add_argument('--skip', help='regex: skip endpoints whose name or group matches (e.g. "ai|auth")')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='baseline JSON file')
+    parser.add_argument('--save-baseline', action='store_true', help='store these results as the baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed p95/throughput change, as a fraction')
+    args = parser.parse_args()
+
+    modes = args.mode or (['http'] if args.url and not args.database else ['in-process', 'http'])
+    if 'in-process' in modes and args.url and not args.database:
+        parser.error('in-process mode needs --database: the same data the --url server uses')
+
+    scenarios = [scenario for scenario in SCENARIOS
+                 if (not args.only or re.search(args.only, f'{scenario[0]} {scenario[1]}'))
+                 and not (args.skip and re.search(args.skip, f'{scenario[0]} {scenario[1]}'))]
+    usernames = [f'user_{id}' for id in range(args.first_user, args.first_user + args.users)]
+
+    app = None
+    if 'in-process' in modes or not args.url:
+        tmpdir = tempfile.TemporaryDirectory()
+        os.environ['DATABASE_URL'] = args.database or f"sqlite:///{os.path.join(tmpdir.name, 'load.db')}"
+        # A stream the client dropped keeps its slot until its next keep-alive, so every stream of the run may
+        # still be open at once; a --url server applies its own limit (503s count as errors)
+        os.environ.setdefault('CHANGE_FEED_MAX_STREAMS', str(args.concurrency * args.requests))
+        # Never a real AI API: descriptions come from the fake completion server
+        from fake_completions import serve_in_thread
+        _, fake_url = serve_in_thread(latency=0.05, token_delay=0.001)
+        os.environ.update(OPENAI_API_KEY='fake', OPENAI_BASE_URL=fake_url)
+
+        from benchmarks import setup_app
+        app = setup_app()
+        app.config['QUERY_BUDGET_MODE'] = 'off'
+        if not args.database:
+            from benchmarks.data import generate
+            print(f'Generating {args.users} users x 10 projects x 50 tasks...')
+            generate(app, args.users, 10, 50)
+
+    results = {}
+    for mode in modes:
+        if mode == 'in-process':
+            make_client = lambda: InProcessClient(app)
+            where = 'in-process'
+        else:
+            url = args.url
+            if url is None:
+                from werkzeug.serving import make_server
+                logging.getLogger('werkzeug').setLevel(logging.WARNING)
+                server = make_server('127.0.0.1', 0, app, threaded=True)
+                threading.Thread(target=server.serve_forever, daemon=True).start()
+                url = f'http://127.0.0.1:{server.server_port}'
+            make_client = lambda: HttpClient(url)
+            where = f'HTTP {url}'
+        print(f'Running {len(scenarios)} endpoints, {where}, {args.concurrency} clients x {args.requests} requests...')
+        results[mode] = run(make_client, scenarios, usernames, args.concurrency, args.requests)
+
+    settings = {'concurrency': args.concurrency, 'requests': args.requests, 'database': args.database,
+                'url': args.url, 'users': args.users}
+    baseline = load_baseline(args.baseline)
+    if baseline is not None and baseline.get('settings') != settings:
+        print(f'\nBaseline {args.baseline} was recorded with other settings {baseline.get("settings")}; not comparing')
+        baseline = None
+
+    regressions = 0
+    for mode, rows in results.items():
+        table = []
+        for name, row in rows.items():
+            previous = (baseline or {}).get('modes', {}).get(mode, {}).get(name)
+            verdict = compare(row, previous, args.tolerance) if previous else None
+            regressions += verdict is not None
+            table.append((name, row['requests'], f"{row['errors']} {row['statuses'] or ''}".strip(),
+                          f"{row['p50_ms']:.1f}", f"{row['p95_ms']:.1f}", f"{row['p99_ms']:.1f}", f"{row['rps']:.0f}",
+                          f'REGRESSED: {verdict}' if verdict else ('ok' if previous else '-')))
+        print_table(f'{mode}, {args.concurrency} clients', ('endpoint', 'requests', 'errors', 'p50 ms', 'p95 ms',
+                                                            'p99 ms', 'req/s', 'vs baseline'), table)
+
+    if args.save_baseline:
+        save_baseline(args.baseline, load_baseline(args.baseline), settings, results)
+        print(f'\nSaved baseline to {args.baseline}')
+    elif regressions:
+        print(f'\n{regressions} regression(s) against {args.baseline}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+Login throughput and latency as concurrent clients increase, with bcrypt run inline
+on the request threads versus on the bounded process pool. A background client
+polls GET /api/check-session throughout to show what logins do to cheap requests.
+
+    python -m benchmarks.login --concurrency 1 4 16 --rounds 10
+"""
+
+import argparse
+import statistics
+import threading
+import time
+from benchmarks import setup_app, print_table
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def run(app, concurrency, duration):
+    """Hammer /api/login from `concurrency` threads for `duration` seconds"""
+    latencies, statuses, cheap = [], [], []
+    lock = threading.Lock()
+    stop = time.perf_counter() + duration
+
+    def login_client():
+        client = app.test_client()
+        while time.perf_counter() < stop:
+            start = time.perf_counter()
+            status = client.post('/api/login', json={'username': 'bench_user', 'password': 'bench-pass'}).status_code
+            with lock:
+                latencies.append(time.perf_counter() - start)
+                statuses.append(status)
+
+    def cheap_client():
+        client = app.test_client()
+        while time.perf_counter() < stop:
+            start = time.perf_counter()
+            client.get('/api/check-session')
+            cheap.append(time.perf_counter() - start)
+            time.sleep(0.01)
+
+    threads = [threading.Thread(target=login_client) for _ in range(concurrency)]
+    threads.append(threading.Thread(target=cheap_client))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    ok = statuses.count(200)
+    return {
+        'logins/sec': f'{ok / duration:.1f}',
+        'p50 ms': f'{statistics.median(latencies) * 1000:.0f}' if latencies else '-',
+        'p95 ms': f'{percentile(latencies, 0.95) * 1000:.0f}',
+        '503s': statuses.count(503),
+        'check-session p95 ms': f'{percentile(cheap, 0.95) * 1000:.1f}',
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+    parser.add_argument('--rounds', type=int, default=10, help='BCRYPT_LOG_ROUNDS to benchmark with')
+    parser.add_argument('--workers', type=int, default=None, help='pool size (default: PASSWORD_HASH_WORKERS)')
+    parser.add_argument('--duration', type=float, default=3.0, help='seconds per run')
+    args = parser.parse_args()
+
+    app = setup_app()
+    app.config['QUERY_BUDGET_MODE'] = 'off'
+    hasher = app.extensions['password_hasher']
+
+    hasher.rounds = args.rounds
+    pool_workers = args.workers or hasher.workers or 1
+    app.test_client().post('/api/signup', json={
+        'username': 'bench_user', 'email': 'bench@example.com', 'password': 'bench-pass'
+    })
+
+    rows = []
+    for mode, workers in (('inline', 0), (f'pool x{pool_workers}', pool_workers)):
+        hasher.workers = workers
+        for concurrency in args.concurrency:
+            result = run(app, concurrency, args.duration)
+            rows.append((mode, concurrency, *result.values()))
+
+    print_table(f'POST /api/login at BCRYPT_LOG_ROUNDS={args.rounds}, '
+                f'{app.config["PASSWORD_HASH_MAX_PENDING"]} max pending, {args.duration:.0f}s per run',
+                ('hashing', 'clients', 'logins/sec', 'p50 ms', 'p95 ms', '503s', 'check-session p95 ms'), rows)
+
+
+if __name__ == '__main__':
+    main()
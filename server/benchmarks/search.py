@@ -0,0 +1,149 @@
+"""
+GET /api/search latency on a generated dataset (1M tasks by default) for a spread of
+query shapes, checked against a p95 target. Uses an on-disk SQLite database unless
+--database is given; building the 1M-task dataset takes about a minute.
+
+    python -m benchmarks.search --tasks 1000000 --users 100 --target-p95-ms 50
+"""
+
+import argparse
+import itertools
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime
+from benchmarks import print_table
+
+STATUSES = ('todo', 'in_progress', 'completed')
+PRIORITIES = ('low', 'medium', 'high')
+SYLLABLES = [consonant + vowel for consonant in 'bcdfghjklmnprstvwz' for vowel in 'aeiou']
+
+
+def vocabulary(size, rng):
+    """`size` made-up words in random order (the order decides how common each one is)"""
+    words = set()
+    while len(words) < size:
+        words.add(''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    words = sorted(words)
+    rng.shuffle(words)
+    return words
+
+
+def generate(app, tasks, users, projects_per_user, seed=1):
+    """Bulk-insert users, projects and tasks whose titles draw on a Zipf-like vocabulary"""
+    from sqlalchemy import insert
+    from models import db, User, Project, Task
+    from search import create_search_index, drop_search_index
+
+    rng = random.Random(seed)
+    words = vocabulary(5000, rng)
+    # Rank-weighted choice: a few words are in most titles, most words are rare
+    cum_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(words))))
+    password_hash = app.extensions['password_hasher'].hash('bench-pass')
+    now = datetime.utcnow()
+
+    with app.app_context():
+        db.session.execute(insert(User), [
+            {'id': u, 'username': f'user_{u}', 'email': f'user_{u}@example.com', '_password_hash': password_hash,
+             'created_at': now} for u in range(1, users + 1)
+        ])
+        db.session.execute(insert(Project), [
+            {'id': p, 'name': f'Project {p}', 'description': '', 'status': 'active',
+             'user_id': (p - 1) // projects_per_user + 1, 'created_at': now, 'updated_at': now}
+            for p in range(1, users * projects_per_user + 1)
+        ])
+        db.session.commit()
+
+        # Index once at the end instead of through the triggers row by row
+        drop_search_index(db.session.connection())
+        project_count = users * projects_per_user
+        batch = 10000
+        for start in range(0, tasks, batch):
+            rows = []
+            for i in range(start, min(start + batch, tasks)):
+                title = ' '.join(rng.choices(words, cum_weights=cum_weights, k=rng.randint(2, 6)))
+                description = ' '.join(rng.choices(words, cum_weights=cum_weights, k=rng.randint(0, 12)))
+                rows.append({
+                    'title': title.capitalize(), 'description': description,
+                    'status': STATUSES[i % 3], 'priority': PRIORITIES[(i // 3) % 3],
+                    'project_id': i % project_count + 1, 'created_at': now, 'updated_at': now,
+                })
+            db.session.execute(insert(Task), rows)
+            db.session.commit()
+        create_search_index(db.session.connection())
+        db.session.commit()
+    return words
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tasks', type=int, default=1000000)
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--projects-per-user', type=int, default=10)
+    parser.add_argument('--queries', type=int, default=100, help='requests per query shape')
+    parser.add_argument('--target-p95-ms', type=float, default=50.0)
+    parser.add_argument('--database', help='database URL (default: a temporary SQLite file)')
+    args = parser.parse_args()
+
+    tmpdir = tempfile.TemporaryDirectory()
+    os.environ['DATABASE_URL'] = args.database or f"sqlite:///{os.path.join(tmpdir.name, 'bench.db')}"
+    # Before the app exists: its cache backend is built when it is created
+    os.environ['CACHE_BACKEND'] = 'none'
+
+    from benchmarks import setup_app
+    app = setup_app()
+    app.config['QUERY_BUDGET_MODE'] = 'off'
+    hasher = app.extensions['password_hasher']
+    hasher.workers = 0
+    hasher.rounds = 4
+
+    start = time.perf_counter()
+    words = generate(app, args.tasks, args.users, args.projects_per_user)
+    print(f'Generated {args.tasks} tasks for {args.users} users in {time.perf_counter() - start:.0f}s')
+
+    client = app.test_client()
+    client.post('/api/login', json={'username': 'user_1', 'password': 'bench-pass'})
+    rng = random.Random(2)
+    common, rare = words[:20], words[-2000:]
+
+    def page_five(word):
+        cursor = ''
+        for _ in range(4):
+            cursor = client.get(f'/api/search?q={word}&limit=20&cursor={cursor}').get_json()['next_cursor'] or ''
+        return f'/api/search?q={word}&limit=20&cursor={cursor}'
+
+    shapes = {
+        'common word': lambda: f'/api/search?q={rng.choice(common)}',
+        'rare word': lambda: f'/api/search?q={rng.choice(rare)}',
+        'two-letter prefix': lambda: f'/api/search?q={rng.choice(SYLLABLES)}',
+        'four-letter prefix': lambda: f'/api/search?q={rng.choice(common)[:4]}',
+        'three words': lambda: '/api/search?q=' + '+'.join(rng.choice(words[:500]) for _ in range(3)),
+        'common + status + priority': lambda: f'/api/search?q={rng.choice(common)}&status=todo&priority=high',
+        'projects': lambda: '/api/search?type=projects&q=project',
+        'page 5 (cursor)': lambda: page_five(rng.choice(common)),
+    }
+
+    rows = []
+    for label, make_url in shapes.items():
+        latencies, hits = [], []
+        for _ in range(args.queries):
+            url = make_url()
+            begin = time.perf_counter()
+            response = client.get(url)
+            latencies.append(time.perf_counter() - begin)
+            assert response.status_code == 200, response.get_json()
+            hits.append(len(next(value for key, value in response.get_json().items() if isinstance(value, list))))
+        latencies.sort()
+        p95 = latencies[int(len(latencies) * 0.95) - 1] * 1000
+        rows.append((label, f'{statistics.mean(hits):.1f}', f'{statistics.median(latencies) * 1000:.1f}',
+                     f'{p95:.1f}', 'ok' if p95 <= args.target_p95_ms else 'MISS'))
+
+    print_table(f'GET /api/search, {args.tasks} tasks, {args.tasks // args.users} per user, '
+                f'target p95 <= {args.target_p95_ms:.0f} ms',
+                ('query', 'results', 'p50 ms', 'p95 ms', 'target'), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+Compare SerializerMixin.to_dict() with the precompiled serializers in serializers.py
+on large payloads, counting the SQL each approach issues along the way.
+
+    python -m benchmarks.serialization --rows 10000
+"""
+
+import argparse
+from sqlalchemy import event
+from sqlalchemy.orm import selectinload
+from benchmarks import setup_app, measure, print_table
+
+
+def populate(rows, tasks_per_project):
+    from models import db, User, Project, Task
+
+    user = User(username='bench_user', email='bench@example.com', _password_hash='x')
+    db.session.add(user)
+    db.session.flush()
+
+    project_count = max(rows // tasks_per_project, 1)
+    projects = [Project(name=f'Project {i}', description='Benchmark project', user_id=user.id)
+                for i in range(project_count)]
+    db.session.add_all(projects)
+    db.session.flush()
+
+    db.session.add_all([
+        Task(title=f'Task {i}', description='Benchmark task', status='todo', priority='medium',
+             project_id=projects[i % project_count].id)
+        for i in range(rows)
+    ])
+    db.session.commit()
+    return user.id
+
+
+class QueryCounter:
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, 'before_cursor_execute', self._on_execute)
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=10000, help='number of tasks to serialize')
+    parser.add_argument('--tasks-per-project', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    app = setup_app()
+    from models import db, Project, Task
+    from serializers import project_serializer, task_serializer
+
+    with app.app_context():
+        user_id = populate(args.rows, args.tasks_per_project)
+        counter = QueryCounter(db.engine)
+
+        def run(label, load, dump):
+            def once():
+                # Start from a cold identity map each time, like a fresh request
+                db.session.expire_all()
+                dump(load())
+            counter.count = 0
+            seconds = measure(once, args.repeat)
+            queries = counter.count // args.repeat
+            return label, f'{seconds * 1000:.1f}', queries
+
+        def load_tasks():
+            return Task.query.all()
+
+        def load_projects():
+            return Project.query.filter_by(user_id=user_id).all()
+
+        rows = [
+            run('tasks: SerializerMixin.to_dict', load_tasks,
+                lambda tasks: [task.to_dict() for task in tasks]),
+            run('tasks: task_serializer', load_tasks, task_serializer.dump_many),
+            run('projects+tasks: SerializerMixin.to_dict', load_projects,
+                lambda projects: [project.to_dict() for project in projects]),
+            run('projects+tasks: project_serializer', lambda: Project.query
+                .filter_by(user_id=user_id)
+                .options(selectinload(Project.tasks)).all(),
+                lambda projects: project_serializer.dump_many(projects, ('tasks',))),
+        ]
+
+    print_table(f'Serialization of {args.rows} tasks (best of {args.repeat})',
+                ('approach', 'ms', 'queries'), rows)
+
+
+if __name__ == '__main__':
+    main()
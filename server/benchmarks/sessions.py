@@ -0,0 +1,79 @@
+"""
+Per-request session lookup latency for each session backend: Flask's signed
+cookies, the in-memory store and a Redis-protocol store (a real server with
+--redis-url, otherwise fakeredis when it is installed).
+
+    python -m benchmarks.sessions --requests 2000
+"""
+
+import argparse
+import statistics
+import time
+from benchmarks import setup_app, print_table
+
+
+def redis_client(url):
+    if url:
+        import redis
+        return redis.Redis.from_url(url)
+    try:
+        import fakeredis
+    except ImportError:
+        return None
+    return fakeredis.FakeRedis()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--redis-url', help='benchmark a real Redis server instead of fakeredis')
+    args = parser.parse_args()
+
+    app = setup_app()
+    app.config['QUERY_BUDGET_MODE'] = 'off'
+    from flask.sessions import SecureCookieSessionInterface
+    import sessions
+
+    hasher = app.extensions['password_hasher']
+    hasher.workers = 0
+    hasher.rounds = 4
+
+    backends = [('cookie', SecureCookieSessionInterface()),
+                ('memory', sessions.ServerSideSessionInterface(sessions.MemorySessionStore()))]
+    client = redis_client(args.redis_url)
+    if client is not None:
+        label = 'redis' if args.redis_url else 'redis (fakeredis)'
+        backends.append((label, sessions.ServerSideSessionInterface(sessions.RedisSessionStore(client))))
+
+    rows = []
+    for index, (label, interface) in enumerate(backends):
+        app.session_interface = interface
+        client = app.test_client()
+        client.post('/api/signup', json={
+            'username': f'session_{index}', 'email': f'session_{index}@example.com', 'password': 'bench-pass'
+        })
+
+        request_times, lookup_times = [], []
+        for _ in range(args.requests):
+            start = time.perf_counter()
+            response = client.get('/api/check-session')
+            request_times.append(time.perf_counter() - start)
+            for timing in response.headers.getlist('Server-Timing'):
+                if timing.startswith('session;dur='):
+                    lookup_times.append(float(timing.split('=', 1)[1]))
+
+        request_times.sort()
+        rows.append((
+            label,
+            f'{statistics.median(lookup_times):.3f}' if lookup_times else '-',
+            f'{sorted(lookup_times)[int(len(lookup_times) * 0.99)]:.3f}' if lookup_times else '-',
+            f'{statistics.median(request_times) * 1000:.3f}',
+            f'{request_times[int(len(request_times) * 0.99)] * 1000:.3f}',
+        ))
+
+    print_table(f'GET /api/check-session x {args.requests}',
+                ('backend', 'lookup p50 ms', 'lookup p99 ms', 'request p50 ms', 'request p99 ms'), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+"""
+Mixed read/write load from concurrent clients against an on-disk SQLite database,
+with SQLite's defaults (rollback journal, fsync per commit, writers racing for the
+lock) versus performance mode (WAL, synchronous=NORMAL and the writer queue).
+Failed requests are mostly 'database is locked'.
+
+    python -m benchmarks.sqlite_concurrency --clients 1 4 8 16 --write-ratio 0.2
+    python -m benchmarks.sqlite_concurrency --processes 4 --clients 4
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+from benchmarks import print_table
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def build_app(path, performance_mode, clients):
+    from config import Config
+    from app import create_app
+    from models import db
+
+    config = type('BenchmarkConfig', (Config,), {
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}',
+        'SQLALCHEMY_ENGINE_OPTIONS': {},
+        'SQLALCHEMY_ECHO': False,
+        'SQLITE_PERFORMANCE_MODE': performance_mode,
+        # One connection per client so the pool isn't what they queue on
+        'DB_POOL_SIZE': clients,
+        'CACHE_BACKEND': 'none',
+        'QUERY_BUDGET_MODE': 'off',
+        'PASSWORD_HASH_WORKERS': 0,
+        'BCRYPT_LOG_ROUNDS': 4,
+    })
+    app = create_app(config)
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def seed(app, seed_tasks):
+    client = app.test_client()
+    client.post('/api/signup', json={'username': 'bench_user', 'email': 'bench@example.com', 'password': 'bench-pass'})
+    project_id = client.post('/api/projects', json={'name': 'Benchmark project'}).get_json()['id']
+    for start in range(0, seed_tasks, 1000):
+        client.post(f'/api/projects/{project_id}/tasks/bulk', json={'tasks': [
+            {'title': f'Seed {i}'} for i in range(start, min(start + 1000, seed_tasks))
+        ]})
+    return project_id
+
+
+def load(path, performance_mode, clients, project_id, write_ratio, duration, process=0):
+    """Run `clients` threads for `duration` seconds; returns (read latencies, write latencies, failures)"""
+    app = build_app(path, performance_mode, clients)
+    reads, writes, failures = [], [], []
+    lock = threading.Lock()
+    stop = time.perf_counter() + duration
+
+    def client_loop(index):
+        client = app.test_client()
+        client.post('/api/login', json={'username': 'bench_user', 'password': 'bench-pass'})
+        rng = random.Random(index)
+        counter = 0
+        while time.perf_counter() < stop:
+            start = time.perf_counter()
+            if rng.random() < write_ratio:
+                counter += 1
+                status = client.post(f'/api/projects/{project_id}/tasks',
+                                     json={'title': f'Client {index} task {counter}'}).status_code
+                samples = writes
+            else:
+                status = client.get(f'/api/projects/{project_id}/tasks?per_page=50').status_code
+                samples = reads
+            with lock:
+                samples.append(time.perf_counter() - start)
+                if status >= 500:
+                    failures.append(status)
+
+    threads = [threading.Thread(target=client_loop, args=(process * clients + index,)) for index in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return reads, writes, len(failures)
+
+
+def run(path, performance_mode, processes, clients, write_ratio, duration, seed_tasks):
+    app = build_app(path, performance_mode, clients)
+    project_id = seed(app, seed_tasks)
+    with app.app_context():
+        # Forked workers must not share the parent's open SQLite connections
+        from models import db
+        db.engine.dispose()
+    jobs = [(path, performance_mode, clients, project_id, write_ratio, duration, process)
+            for process in range(processes)]
+    if processes == 1:
+        results = [load(*jobs[0])]
+    else:
+        # Separate processes, like gunicorn workers: only SQLite's file lock stands between them
+        with multiprocessing.get_context('fork').Pool(processes) as pool:
+            results = pool.starmap(load, jobs)
+
+    reads = [sample for result in results for sample in result[0]]
+    writes = [sample for result in results for sample in result[1]]
+    failures = sum(result[2] for result in results)
+    return (
+        f'{(len(reads) + len(writes)) / duration:.0f}',
+        f'{len(writes) / duration:.0f}',
+        f'{statistics.median(reads) * 1000:.1f}' if reads else '-',
+        f'{percentile(reads, 0.95) * 1000:.1f}',
+        f'{statistics.median(writes) * 1000:.1f}' if writes else '-',
+        f'{percentile(writes, 0.95) * 1000:.1f}',
+        failures,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, nargs='+', default=[1, 4, 8, 16], help='threads per process')
+    parser.add_argument('--processes', type=int, default=1, help='worker processes sharing the database file')
+    parser.add_argument('--write-ratio', type=float, default=0.2, help='fraction of requests that create a task')
+    parser.add_argument('--duration', type=float, default=3.0, help='seconds per run')
+    parser.add_argument('--seed-tasks', type=int, default=2000, help='tasks in the project before the run')
+    args = parser.parse_args()
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for label, performance_mode in (('sqlite defaults', False), ('performance mode', True)):
+            for clients in args.clients:
+                path = os.path.join(tmpdir, f'{label.split()[0]}-{clients}.db')
+                result = run(path, performance_mode, args.processes, clients,
+                             args.write_ratio, args.duration, args.seed_tasks)
+                rows.append((label, clients, *result))
+
+    print_table(f'{args.processes} process(es), {args.write_ratio:.0%} writes, {args.seed_tasks} tasks, '
+                f'{args.duration:.0f}s per run',
+                ('mode', 'clients', 'req/sec', 'writes/sec', 'read p50 ms', 'read p95 ms',
+                 'write p50 ms', 'write p95 ms', 'failed'), rows)
+
+
+if __name__ == '__main__':
+    main()
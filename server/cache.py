@@ -0,0 +1,154 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, request, session
+from changes import on_owner_commit
+
+
+class LRUCache:
+    """In-process LRU cache with per-entry TTL. Only coherent within a single process."""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        # Generation counters are kept apart so LRU eviction can never reset them
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def get_counter(self, key):
+        with self._lock:
+            return self._counters.get(key, 0)
+
+    def incr(self, key):
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._counters.clear()
+
+
+class RedisCache:
+    """Cache backed by any client speaking the redis-py API (redis.Redis, fakeredis, ...)."""
+
+    def __init__(self, client, prefix='tricab:'):
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key, value, ttl):
+        self.client.set(self.prefix + key, json.dumps(value), ex=ttl)
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def get_counter(self, key):
+        raw = self.client.get(self.prefix + key)
+        return int(raw) if raw is not None else 0
+
+    def incr(self, key):
+        return self.client.incr(self.prefix + key)
+
+    def clear(self):
+        for key in self.client.scan_iter(match=self.prefix + '*'):
+            self.client.delete(key)
+
+
+def create_backend(config):
+    backend = config.get('CACHE_BACKEND', 'lru')
+    if backend == 'none':
+        return None
+    if backend == 'lru':
+        return LRUCache(config.get('CACHE_MAX_ENTRIES', 1024))
+    if backend == 'redis':
+        import redis
+        return RedisCache(redis.Redis.from_url(config['CACHE_REDIS_URL']))
+    raise ValueError(f"Unknown CACHE_BACKEND '{backend}' (expected 'lru', 'redis' or 'none')")
+
+
+def _generation_key(user_id):
+    return f'gen:{user_id}'
+
+
+def invalidate_users(user_ids, app=None):
+    """Bump each user's generation so every response cached for them becomes unreachable"""
+    backend = (app or current_app).extensions.get('response_cache')
+    if backend is None:
+        return
+    for user_id in user_ids:
+        backend.incr(_generation_key(user_id))
+
+
+def cached_response(view):
+    """Cache a view's successful GET responses per user and query string.
+
+    Keys embed the user's generation counter, which is bumped after any commit that
+    touches that user's projects or tasks, so stale entries are simply never read again.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        backend = current_app.extensions.get('response_cache')
+        user_id = session.get('user_id')
+        if backend is None or request.method != 'GET' or not user_id:
+            return view(*args, **kwargs)
+
+        generation = backend.get_counter(_generation_key(user_id))
+        query = '&'.join(f'{k}={v}' for k, v in sorted(request.args.items(multi=True)))
+        key = f'resp:{user_id}:{generation}:{request.path}?{query}'
+
+        hit = backend.get(key)
+        if hit is not None:
+            response = current_app.response_class(hit['body'], status=hit['status'], mimetype=hit['mimetype'])
+            response.headers['X-Cache'] = 'HIT'
+            return response
+
+        response = current_app.make_response(view(*args, **kwargs))
+        if response.status_code == 200 and not response.is_streamed:
+            backend.set(key, {
+                'body': response.get_data(as_text=True),
+                'status': response.status_code,
+                'mimetype': response.mimetype
+            }, current_app.config.get('CACHE_DEFAULT_TTL', 60))
+        response.headers['X-Cache'] = 'MISS'
+        return response
+
+    return wrapper
+
+
+def init_app(app, backend=None):
+    """Attach a cache backend (built from CACHE_* config unless one is passed in, e.g. a fake)"""
+    app.extensions['response_cache'] = backend if backend is not None else create_backend(app.config)
+
+    @on_owner_commit(app)
+    def invalidate_changed_owners(user_ids):
+        invalidate_users(user_ids, app)
@@ -0,0 +1,75 @@
+from itertools import chain
+from flask import current_app, has_app_context
+from sqlalchemy import event, inspect
+from sqlalchemy.orm.base import NO_VALUE
+from models import db, Project, Task, UserStats
+
+
+def task_owner_id(session, task):
+    # Prefer the already-loaded parent (it may have been deleted in this same flush)
+    project = inspect(task).attrs.project.loaded_value
+    if project is not NO_VALUE and project is not None:
+        return project.user_id
+
+    # Projects never change owner, so remember lookups for the rest of the session
+    owners = session.info.setdefault('project_owners', {})
+    if task.project_id not in owners:
+        project = session.get(Project, task.project_id)
+        owners[task.project_id] = project.user_id if project is not None else None
+    return owners[task.project_id]
+
+
+def owner_id(session, obj):
+    """The id of the user who owns a Project, Task or UserStats row"""
+    if isinstance(obj, Task):
+        return task_owner_id(session, obj)
+    return obj.user_id
+
+
+def on_owner_commit(app):
+    """Decorator registering `listener(user_ids)` to run after each of `app`'s commits that touched those users' data
+
+    Listeners live on the app, so each app created (e.g. one per test) only runs its own.
+    """
+    def register(listener):
+        app.extensions.setdefault('owner_commit_listeners', []).append(listener)
+        return listener
+    return register
+
+
+def mark_changed(session, user_id):
+    """Record a change the ORM can't see, e.g. from a bulk UPDATE or INSERT ... SELECT"""
+    if user_id is not None:
+        session.info.setdefault('changed_owners', set()).add(user_id)
+
+
+def flush_owners(session):
+    """Ids of users whose Project/Task/UserStats rows the current flush writes (call from after_flush)"""
+    owners = set()
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if not isinstance(obj, (Project, Task, UserStats)):
+            continue
+        if obj in session.dirty and not session.is_modified(obj):
+            continue
+        owners.add(owner_id(session, obj))
+    owners.discard(None)
+    return owners
+
+
+@event.listens_for(db.session, 'after_flush')
+def _track_changed_owners(session, flush_context):
+    for user_id in flush_owners(session):
+        mark_changed(session, user_id)
+
+
+@event.listens_for(db.session, 'after_commit')
+def _publish_changed_owners(session):
+    owners = session.info.pop('changed_owners', None)
+    if owners and has_app_context():
+        for listener in current_app.extensions.get('owner_commit_listeners', ()):
+            listener(owners)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_changed_owners(session):
+    session.info.pop('changed_owners', None)
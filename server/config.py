@@ -1,18 +1,207 @@
 import os
 from datetime import timedelta
 
+DEFAULT_SECRET_KEY = 'dev-secret-key-change-in-production'
+CPU_COUNT = os.cpu_count() or 1
+
+
+def env_flag(name, default=False):
+    value = os.environ.get(name)
+    if value is None or value == '':
+        return default
+    return value.lower() not in ('0', 'false', 'no', 'off')
+
+
 class Config:
-    SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
+    APP_ENV = 'development'
+    SECRET_KEY = os.environ.get('SECRET_KEY') or DEFAULT_SECRET_KEY
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///tricab.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
-    SQLALCHEMY_ECHO = True
+    # Logging every statement is expensive on the hot path; opt in with SQLALCHEMY_ECHO=1
+    SQLALCHEMY_ECHO = env_flag('SQLALCHEMY_ECHO')
+    
+    CORS_ORIGINS = os.environ.get('CORS_ORIGINS', 'http://localhost:3000').split(',')
+    
+    # Serving: gunicorn processes and threads per process (read by gunicorn.conf.py).
+    # Each thread can hold one database connection, so the pool is sized from WEB_THREADS.
+    WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY', 2 * CPU_COUNT + 1))
+    WEB_THREADS = int(os.environ.get('WEB_THREADS', 4))
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', WEB_THREADS))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 2))
+    DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 10))
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+    
+    # SQLite file databases: WAL journaling, fsync at checkpoints rather than every commit,
+    # a memory-mapped read path and one queued writer at a time (see sqlite_tuning.py)
+    SQLITE_PERFORMANCE_MODE = env_flag('SQLITE_PERFORMANCE_MODE', True)
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'mmap_size': 256 * 1024 * 1024,
+        'cache_size': -64 * 1024,  # negative = KiB, so 64 MiB per connection
+        'busy_timeout': 5000,  # ms; waits out writers in other processes
+        'temp_store': 'MEMORY',
+    }
+    # Seconds a request waits for its turn to write before giving up
+    SQLITE_WRITE_TIMEOUT = float(os.environ.get('SQLITE_WRITE_TIMEOUT', 10))
+    
+    # Read replicas for @replica_reads GET views (comma-separated DATABASE_REPLICA_URLS).
+    # Staleness policy: skip replicas more than DB_REPLICA_MAX_LAG seconds behind (probed every
+    # DB_REPLICA_CHECK_INTERVAL; unset = don't probe), and send a user's reads to the primary
+    # for DB_REPLICA_STICKY_SECONDS after they write
+    SQLALCHEMY_REPLICA_URLS = [url for url in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if url]
+    DB_REPLICA_MAX_LAG = float(os.environ['DB_REPLICA_MAX_LAG']) if os.environ.get('DB_REPLICA_MAX_LAG') else None
+    DB_REPLICA_CHECK_INTERVAL = float(os.environ.get('DB_REPLICA_CHECK_INTERVAL', 5))
+    DB_REPLICA_STICKY_SECONDS = float(os.environ.get('DB_REPLICA_STICKY_SECONDS', 5))
+    
+    # Verify the database, migrations and backing services when the app is created
+    STARTUP_CHECK = env_flag('STARTUP_CHECK')
     
-    # Session configuration
-    SESSION_TYPE = 'filesystem'
+    # Session configuration: 'memory' (server-side, single process), 'redis' (server-side,
+    # shared by all workers) or 'cookie' (Flask's signed cookies, which can't be revoked)
+    SESSION_TYPE = os.environ.get('SESSION_TYPE', 'memory')
+    SESSION_REDIS_URL = os.environ.get('SESSION_REDIS_URL', 'redis://localhost:6379/0')
+    SESSION_SWEEP_INTERVAL = 60
     PERMANENT_SESSION_LIFETIME = timedelta(days=7)
     
-    # OpenAI API (optional)
+    # Identity and project/task ownership answers cached per process (seconds, entries)
+    AUTH_CACHE_TTL = int(os.environ.get('AUTH_CACHE_TTL', 30))
+    AUTH_CACHE_MAX_ENTRIES = 10000
+    
+    # Password hashing: bcrypt cost (hashes made with another cost are upgraded at login)
+    # and the process pool that runs bcrypt off the request threads (0 workers = inline)
+    BCRYPT_LOG_ROUNDS = int(os.environ.get('BCRYPT_LOG_ROUNDS', 12))
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', CPU_COUNT))
+    PASSWORD_HASH_MAX_PENDING = int(os.environ.get('PASSWORD_HASH_MAX_PENDING', 4 * PASSWORD_HASH_WORKERS))
+    PASSWORD_HASH_TIMEOUT = float(os.environ.get('PASSWORD_HASH_TIMEOUT', 5))
+    
+    # OpenAI API (optional); OPENAI_BASE_URL points at any compatible server, e.g. fake_completions.py
     OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY')
+    OPENAI_BASE_URL = os.environ.get('OPENAI_BASE_URL')
+    AI_MODEL = os.environ.get('AI_MODEL', 'gpt-3.5-turbo')
+    
+    # AI description jobs: threads (and pooled API connections) per process, jobs queued or
+    # running per process and per user, and seconds each job may take end to end
+    AI_WORKERS = int(os.environ.get('AI_WORKERS', 4))
+    AI_MAX_PENDING = int(os.environ.get('AI_MAX_PENDING', 32))
+    AI_MAX_JOBS_PER_USER = int(os.environ.get('AI_MAX_JOBS_PER_USER', 2))
+    AI_TIMEOUT = float(os.environ.get('AI_TIMEOUT', 30))
+    
+    # Where jobs (kept AI_JOB_TTL seconds) and generated descriptions (AI_CACHE_TTL) live:
+    # 'lru' (in-process, single worker) or 'redis' (CACHE_REDIS_URL, shared by all workers)
+    AI_STORE_BACKEND = os.environ.get('AI_STORE_BACKEND', 'lru')
+    AI_STORE_MAX_ENTRIES = 10000
+    AI_JOB_TTL = 600
+    AI_CACHE_TTL = int(os.environ.get('AI_CACHE_TTL', 7 * 24 * 3600))
     
     # Pagination
     ITEMS_PER_PAGE = 10
+    MAX_ITEMS_PER_PAGE = 100
+    
+    # Maximum items in one bulk create/update/delete request
+    BULK_MAX_ITEMS = 1000
+    
+    # Task import: rows per INSERT/transaction, and how many per-row errors to report
+    IMPORT_CHUNK_SIZE = 1000
+    IMPORT_MAX_ERRORS = 100
+    
+    # GET /api/search ranks at most this many of the newest matches (SQLite FTS5)
+    SEARCH_RANK_WINDOW = 1000
+    
+    # Rows fetched per round trip (and per streamed chunk) by GET /api/export
+    EXPORT_YIELD_PER = 1000
+    
+    # GET /api/changes/stream: seconds between change log polls (commits in this process
+    # wake streams right away) and before a stream is closed for the client to reconnect
+    CHANGE_FEED_POLL_INTERVAL = float(os.environ.get('CHANGE_FEED_POLL_INTERVAL', 2))
+    CHANGE_FEED_MAX_SECONDS = int(os.environ.get('CHANGE_FEED_MAX_SECONDS', 300))
+    # Streams open at once per worker process: each holds a request thread, so the rest of
+    # WEB_THREADS stay free for API calls. Past it the stream answers 503 and clients poll.
+    CHANGE_FEED_MAX_STREAMS = int(os.environ.get('CHANGE_FEED_MAX_STREAMS', max(1, WEB_THREADS // 2)))
+    # Days of changes `flask changes prune` keeps; older resume points get a reset event
+    # (and GET /api/sync tokens a full copy), so this is also how long tombstones last
+    CHANGE_LOG_RETENTION_DAYS = int(os.environ.get('CHANGE_LOG_RETENTION_DAYS', 30))
+    
+    # Most projects + tasks (or changes) per GET /api/sync page, and the default ?limit=
+    SYNC_PAGE_SIZE = 1000
+    
+    # Relationship loading strategy per endpoint: 'selectin', 'joined' or 'lazy'
+    EAGER_LOADING = {
+        'projects': {'tasks': 'selectin'},
+        'project_by_id': {'tasks': 'selectin'},
+        'task_by_id': {'project': 'joined'},
+    }
+    
+    # Response cache for read endpoints: 'lru' (in-process, single worker), 'redis' or 'none'
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'lru')
+    CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+    CACHE_DEFAULT_TTL = int(os.environ.get('CACHE_DEFAULT_TTL', 60))
+    CACHE_MAX_ENTRIES = 1024
+    
+    # SQL statements per request vs. each route's @query_budget: 'off', 'warn' or 'raise'
+    # (defaults to 'raise' under TESTING and 'warn' otherwise)
+    QUERY_BUDGET_MODE = os.environ.get('QUERY_BUDGET_MODE')
+    
+    # Per-route latency, SQL, serialization and response size histograms at GET /metrics
+    METRICS_ENABLED = env_flag('METRICS_ENABLED', True)
+    # When set, the metrics endpoints answer only requests with `Authorization: Bearer <METRICS_TOKEN>`
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+    # `X-Profile: 1` (cProfile) or `X-Profile: pyinstrument` writes a profile of that request
+    # to PROFILE_DIR (default: instance/profiles)
+    PROFILING_ENABLED = env_flag('PROFILING_ENABLED', True)
+    PROFILE_DIR = os.environ.get('PROFILE_DIR')
+    
+    # Statements slower than SLOW_QUERY_MS are logged with their normalized SQL, parameter types,
+    # endpoint and (SLOW_QUERY_EXPLAIN) query plan, and aggregated by query shape over the last
+    # SLOW_QUERY_WINDOW seconds at GET /metrics/slow-queries
+    SLOW_QUERY_LOG = env_flag('SLOW_QUERY_LOG', True)
+    SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', 100))
+    SLOW_QUERY_EXPLAIN = env_flag('SLOW_QUERY_EXPLAIN', True)
+    SLOW_QUERY_WINDOW = int(os.environ.get('SLOW_QUERY_WINDOW', 3600))
+
+
+class ProductionConfig(Config):
+    APP_ENV = 'production'
+    DEBUG = False
+    STARTUP_CHECK = env_flag('STARTUP_CHECK', True)
+    # Never let a header switch on a profiler in production
+    PROFILING_ENABLED = False
+    # Route names, timings and query plans aren't public: opt in, together with METRICS_TOKEN
+    METRICS_ENABLED = env_flag('METRICS_ENABLED', False)
+    # Every gunicorn process gets its own hashing pool; together they should fill the CPUs, not oversubscribe them
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', max(1, CPU_COUNT // Config.WEB_CONCURRENCY)))
+    PASSWORD_HASH_MAX_PENDING = int(os.environ.get('PASSWORD_HASH_MAX_PENDING', 4 * PASSWORD_HASH_WORKERS))
+
+
+PROFILES = {
+    'development': Config,
+    'production': ProductionConfig,
+}
+
+
+def get_config(name=None):
+    """The config class for APP_ENV ('development' unless set)"""
+    name = name or os.environ.get('APP_ENV', 'development')
+    if name not in PROFILES:
+        raise ValueError(f"Unknown APP_ENV '{name}' (expected: {', '.join(PROFILES)})")
+    return PROFILES[name]
+
+
+def is_memory_sqlite(uri):
+    return uri.startswith('sqlite') and (uri in ('sqlite://', 'sqlite:///:memory:') or 'mode=memory' in uri)
+
+
+def engine_options(config):
+    """SQLAlchemy engine/pool settings for the configured database"""
+    options = {'pool_pre_ping': True}
+    uri = config['SQLALCHEMY_DATABASE_URI']
+    # In-memory SQLite uses a single static connection, so there is no pool to size
+    if is_memory_sqlite(uri):
+        return options
+    options.update(
+        pool_size=config['DB_POOL_SIZE'],
+        max_overflow=config['DB_MAX_OVERFLOW'],
+        pool_timeout=config['DB_POOL_TIMEOUT'],
+        pool_recycle=config['DB_POOL_RECYCLE'],
+    )
+    return options
@@ -0,0 +1,44 @@
+import hashlib
+from functools import wraps
+from flask import current_app, request, session
+from models import db, UserStats
+
+
+def data_version(user_id):
+    """The user's data version: a primary-key read of user_stats.version"""
+    return db.session.query(UserStats.version).filter_by(user_id=user_id).scalar()
+
+
+def conditional_get(view):
+    """Strong ETags for a user's GET responses, derived from their data version.
+
+    The tag combines the user's version with the path and query string, so it
+    changes whenever any of the user's projects or tasks change. A matching
+    If-None-Match returns 304 before the view runs or anything is serialized.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        user_id = session.get('user_id')
+        if request.method != 'GET' or not user_id:
+            return view(*args, **kwargs)
+
+        version = data_version(user_id)
+        if version is None:
+            return view(*args, **kwargs)
+
+        resource = hashlib.sha1(request.full_path.encode()).hexdigest()[:16]
+        etag = f'{user_id}-{version}-{resource}'
+
+        if etag in request.if_none_match:
+            response = current_app.response_class(status=304)
+        else:
+            response = current_app.make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+
+        response.set_etag(etag)
+        # Let browsers keep the body but always revalidate it
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+
+    return wrapper
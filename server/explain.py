@@ -0,0 +1,132 @@
+from datetime import datetime
+import click
+from flask.cli import AppGroup
+from sqlalchemy import func
+from models import db, Project, Task
+from pagination import keyset_query
+from queries import TaskQuery, project_list_query, task_list_query, task_query_plans
+from export import project_export_query, task_export_query
+from feed import changes_after_query
+from sync import snapshot_tasks_query
+
+indexes_cli = AppGroup('indexes', help='Inspect how the hot queries use indexes.')
+
+
+def explain(statement, connection=None):
+    """Return the database's query plan for a SQLAlchemy statement or ORM query, one line per step"""
+    if hasattr(statement, 'statement'):
+        statement = statement.statement
+    connection = connection or db.session.connection()
+    dialect = connection.dialect
+
+    # Expanding IN (...) parameters are rendered as plain placeholders
+    compiled = statement.compile(dialect=dialect, compile_kwargs={'render_postcompile': True})
+    if compiled.positional:
+        params = tuple(compiled.params[name] for name in compiled.positiontup)
+    else:
+        params = compiled.params
+
+    if dialect.name == 'sqlite':
+        rows = connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {compiled}', params).fetchall()
+        return [row[-1] for row in rows]
+
+    rows = connection.exec_driver_sql(f'EXPLAIN {compiled}', params).fetchall()
+    return [row[0] for row in rows]
+
+
+def plan_problems(plan, allow_sort=False):
+    """Steps of a plan that read a whole table or sort rows instead of walking an index"""
+    problems = []
+    for step in plan:
+        # SQLite: "SCAN tasks" / "USE TEMP B-TREE FOR ORDER BY"; Postgres: "Seq Scan on tasks" / "Sort"
+        if step.startswith('SCAN ') and 'INDEX' not in step:
+            problems.append(step)
+        elif 'Seq Scan' in step:
+            problems.append(step)
+        elif not allow_sort and ('TEMP B-TREE' in step or step.strip().startswith('Sort ')):
+            problems.append(step)
+    return problems
+
+
+def task_query_shapes(user_id, project_ids):
+    """GET /api/tasks for every filter/sort combination it accepts, first page and cursor page"""
+    samples = {'status': ['todo'], 'priority': ['high']}
+    for filtered, sort in sorted(task_query_plans(), key=lambda plan: (plan[1], sorted(plan[0]))):
+        task_query = TaskQuery(user_id, {name: samples[name] for name in filtered}, project_ids,
+                               sort=f'-{sort}')
+        label = f"GET /api/tasks (sort={sort}{''.join(f', {name}' for name in sorted(filtered))}"
+        sort_column = getattr(Task, sort)
+        yield f'{label}, page)', keyset_query(task_query.query(), sort_column, Task.id, None, 11)
+        yield f'{label}, cursor)', keyset_query(task_query.query(), sort_column, Task.id, (datetime.utcnow(), 0), 11)
+
+
+def listing_query_shapes(user_id=1, project_id=1):
+    """The queries behind every listing endpoint, built by the same helpers the routes use"""
+    now = datetime.utcnow()
+    per_page = 10
+
+    for status in (None, 'active'):
+        label = f'status={status}' if status else 'all'
+        query = project_list_query(user_id, status)
+        yield f'GET /api/projects ({label}, page)', \
+            query.order_by(Project.updated_at.desc()).limit(per_page).offset(per_page)
+        yield f'GET /api/projects ({label}, count)', query.with_entities(func.count(Project.id))
+        yield f'GET /api/projects ({label}, cursor)', \
+            keyset_query(query, Project.updated_at, Project.id, (now, 0), per_page + 1)
+
+    for status in (None, 'todo'):
+        label = f'status={status}' if status else 'all'
+        query = task_list_query(project_id, status)
+        yield f'GET /api/projects/<id>/tasks ({label}, page)', \
+            query.order_by(Task.created_at.desc()).limit(per_page).offset(per_page)
+        yield f'GET /api/projects/<id>/tasks ({label}, count)', query.with_entities(func.count(Task.id))
+        yield f'GET /api/projects/<id>/tasks ({label}, cursor)', \
+            keyset_query(query, Task.created_at, Task.id, (now, 0), per_page + 1)
+
+    for label, query in task_query_shapes(user_id, [project_id]):
+        yield label.replace('(', '(one project, ', 1), query
+
+    yield 'GET /api/export (projects)', project_export_query(user_id)
+    yield 'GET /api/export (tasks)', task_export_query(user_id)
+    yield 'GET /api/changes/stream', changes_after_query(user_id, 0, 100)
+    yield 'GET /api/sync (changes)', changes_after_query(user_id, 0, 1001)
+    yield 'GET /api/sync (copy projects)', \
+        keyset_query(project_list_query(user_id), Project.updated_at, Project.id, (now, 0), 1001, descending=False)
+    yield 'GET /api/sync (copy tasks)', snapshot_tasks_query(user_id, (project_id, now, 0)).limit(1001)
+
+
+def merged_query_shapes(user_id=1):
+    """Queries that read one index range per project and merge them with a sort of the matches"""
+    for label, query in task_query_shapes(user_id, []):
+        yield label.replace('(', '(all projects, ', 1), query
+
+
+@indexes_cli.command('check')
+@click.option('--verbose', '-v', is_flag=True, help='Print every query plan.')
+def check_command(verbose):
+    """EXPLAIN each listing query and fail if any of them scans a table or sorts in memory.
+
+    Cross-project GET /api/tasks queries may sort (they merge one range per project) but not scan.
+    """
+    connection = db.session.connection()
+    if connection.dialect.name == 'postgresql':
+        # Tiny tables make sequential scans look cheap; ask what the planner can do with indexes
+        connection.exec_driver_sql('SET LOCAL enable_seqscan = off')
+        connection.exec_driver_sql('SET LOCAL enable_sort = off')
+
+    failures = 0
+    shapes = [(label, query, False) for label, query in listing_query_shapes()]
+    shapes += [(label, query, True) for label, query in merged_query_shapes()]
+    for label, query, allow_sort in shapes:
+        plan = explain(query, connection)
+        problems = plan_problems(plan, allow_sort)
+        failures += bool(problems)
+
+        click.echo(f"{'FAIL' if problems else 'ok  '}  {label}")
+        for step in (plan if verbose else problems):
+            click.echo(f'        {step}')
+
+    db.session.rollback()
+    if failures:
+        raise click.ClickException(f'{failures} query shape(s) are not served by an index')
+    click.echo('All listing queries use an index')
@@ -0,0 +1,129 @@
+"""
+A stand-in for the OpenAI chat completions API, for developing and load-testing AI
+descriptions without an API key or network access:
+
+    python fake_completions.py --port 5556 --latency 0.5 --token-delay 0.02
+    OPENAI_API_KEY=fake OPENAI_BASE_URL=http://localhost:5556/v1 python app.py
+
+Answers POST /v1/chat/completions, streamed or not, with a canned description of the
+prompt after `latency` seconds. It counts requests and TCP connections, so a pooled client
+shows up as fewer connections than requests.
+"""
+
+import argparse
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WORDS = ('Clarify the goal and scope of "{title}", list the concrete steps with an owner for each, '
+         'note dependencies and risks, and agree on what done looks like before starting.')
+
+
+def completion_text(messages):
+    prompt = messages[-1]['content'] if messages else ''
+    title = prompt.split(':', 1)[-1].split('. Keep it', 1)[0].strip() or 'this task'
+    return WORDS.format(title=title)
+
+
+class CompletionHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.stats['connections'] += 1
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _write_chunk(self, data):
+        self.wfile.write(f'{len(data):x}\r\n'.encode() + data + b'\r\n')
+        self.wfile.flush()
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        with self.server.lock:
+            self.server.stats['requests'] += 1
+        if self.path.rstrip('/') != '/v1/chat/completions':
+            return self._send_json(404, {'error': {'message': f'Unknown path {self.path}'}})
+
+        time.sleep(self.server.latency)
+        text = completion_text(body.get('messages', []))
+        completion_id = f'chatcmpl-{uuid.uuid4().hex[:24]}'
+        model = body.get('model', 'fake')
+
+        if not body.get('stream'):
+            return self._send_json(200, {
+                'id': completion_id, 'object': 'chat.completion', 'created': int(time.time()), 'model': model,
+                'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': text}, 'finish_reason': 'stop'}],
+                'usage': {'prompt_tokens': 0, 'completion_tokens': len(text.split()), 'total_tokens': len(text.split())},
+            })
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        pieces = [word + ' ' for word in text.split(' ')]
+        try:
+            for index, piece in enumerate(pieces):
+                chunk = {
+                    'id': completion_id, 'object': 'chat.completion.chunk', 'created': int(time.time()), 'model': model,
+                    'choices': [{'index': 0, 'delta': {'content': piece},
+                                 'finish_reason': 'stop' if index == len(pieces) - 1 else None}],
+                }
+                self._write_chunk(f'data: {json.dumps(chunk)}\n\n'.encode())
+                time.sleep(self.server.token_delay)
+            self._write_chunk(b'data: [DONE]\n\n')
+            self._write_chunk(b'')
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up (timeout) or closed the stream early
+            self.close_connection = True
+
+
+def create_server(port=0, latency=0.5, token_delay=0.02, verbose=False):
+    """A fake completion server on localhost (port 0: any free port); call serve_forever() on it"""
+    server = ThreadingHTTPServer(('127.0.0.1', port), CompletionHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.token_delay = token_delay
+    server.verbose = verbose
+    server.lock = threading.Lock()
+    server.stats = {'requests': 0, 'connections': 0}
+    return server
+
+
+def serve_in_thread(**options):
+    """Start a fake completion server in the background; returns (server, base_url for OPENAI_BASE_URL)"""
+    server = create_server(**options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}/v1'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=5556)
+    parser.add_argument('--latency', type=float, default=0.5, help='seconds before the first token')
+    parser.add_argument('--token-delay', type=float, default=0.02, help='seconds between streamed tokens')
+    args = parser.parse_args()
+
+    server = create_server(args.port, args.latency, args.token_delay, verbose=True)
+    print(f'Fake completions at http://127.0.0.1:{args.port}/v1')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
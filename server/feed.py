@@ -0,0 +1,247 @@
+import json
+import threading
+import time
+from itertools import chain
+from datetime import datetime, timedelta
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import event, func, inspect, select, text
+from changes import on_owner_commit, owner_id
+from models import db, Change, Project, Task
+from serializers import project_serializer, task_serializer
+
+changes_cli = AppGroup('changes', help='Maintain the change log behind the change feed.')
+
+# Fields every update delta carries, changed or not
+ALWAYS_SENT = ('id', 'updated_at')
+
+# pg_advisory_xact_lock key serializing change log writers on PostgreSQL (ASCII 'change')
+CHANGE_LOG_LOCK = 0x6368616E6765
+
+
+# ============== RECORDING ==============
+
+ENTITIES = {
+    Project: ('project', project_serializer),
+    Task: ('task', task_serializer),
+}
+
+
+def _update_fields(obj, data):
+    state = inspect(obj)
+    changed = {name for name in data if name in state.attrs and state.attrs[name].history.has_changes()}
+    return {name: value for name, value in data.items() if name in changed or name in ALWAYS_SENT} \
+        if changed else None
+
+
+def change_row(session, obj, op):
+    """The change log row for one flushed Project/Task, or None when nothing clients see changed"""
+    entity, serializer = ENTITIES[type(obj)]
+    data = None
+    if op != 'delete':
+        data = serializer.dump(obj)
+        if op == 'update':
+            data = _update_fields(obj, data)
+            if data is None:
+                return None
+    return {
+        'user_id': owner_id(session, obj), 'entity': entity, 'entity_id': obj.id, 'op': op,
+        'data': json.dumps(data) if data is not None else None, 'created_at': datetime.utcnow(),
+    }
+
+
+def lock_change_log(session):
+    """Take the change log's turn until commit; call before writing projects or tasks outside a flush.
+
+    Readers resume after the highest sequence number they have seen, so numbers must
+    become visible in order. PostgreSQL assigns them at INSERT but shows them at COMMIT,
+    so a lower number committing late would be skipped; this lock makes writers commit
+    one at a time. Taken before the rows are written, so no writer waits for it while
+    holding row locks another one needs. SQLite already has a single writer.
+    """
+    connection = session.connection()
+    if connection.dialect.name == 'postgresql' and not session.info.get('change_log_locked'):
+        connection.execute(text('SELECT pg_advisory_xact_lock(:key)'), {'key': CHANGE_LOG_LOCK})
+        session.info['change_log_locked'] = True
+
+
+@event.listens_for(db.session, 'after_transaction_end')
+def _change_log_unlocked(session, transaction):
+    if transaction.parent is None:
+        session.info.pop('change_log_locked', None)
+
+
+def _write(session, rows):
+    rows = [row for row in rows if row is not None and row['user_id'] is not None]
+    if rows:
+        # Normally taken already, by the flush hook or a bulk writer
+        lock_change_log(session)
+        # One executemany INSERT for the whole flush
+        session.connection().execute(Change.__table__.insert(), rows)
+
+
+@event.listens_for(db.session, 'before_flush')
+def _lock_before_writing(session, flush_context, instances):
+    if any(type(obj) in ENTITIES for obj in chain(session.new, session.dirty, session.deleted)):
+        lock_change_log(session)
+
+
+@event.listens_for(db.session, 'after_flush')
+def _record_changes(session, flush_context):
+    # Attribute history still describes the flushed changes here
+    rows = []
+    for op, objs in (('create', session.new), ('update', session.dirty), ('delete', session.deleted)):
+        for obj in objs:
+            if type(obj) not in ENTITIES:
+                continue
+            if op == 'update' and not session.is_modified(obj):
+                continue
+            rows.append(change_row(session, obj, op))
+    _write(session, rows)
+
+
+def record_creates(session, objs):
+    """Change log rows for objects inserted with a bulk INSERT ... RETURNING, which skips the flush hooks.
+
+    Call it in the same transaction, after the INSERT (and call lock_change_log() before it).
+    """
+    _write(session, [change_row(session, obj, 'create') for obj in objs])
+
+
+# ============== READING ==============
+
+class ChangeNotifier:
+    """Wakes this process's change streams when a commit touches their user.
+
+    Commits in other processes are only noticed by the streams' periodic poll.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._versions = {}
+
+    def notify(self, user_ids):
+        with self._condition:
+            for user_id in user_ids:
+                self._versions[user_id] = self._versions.get(user_id, 0) + 1
+            self._condition.notify_all()
+
+    def version(self, user_id):
+        with self._condition:
+            return self._versions.get(user_id, 0)
+
+    def wait(self, user_id, version, timeout):
+        """Wait until `user_id` has a commit after `version` or `timeout` passes; returns the new version"""
+        with self._condition:
+            self._condition.wait_for(lambda: self._versions.get(user_id, 0) != version, timeout)
+            return self._versions.get(user_id, 0)
+
+
+def log_bounds():
+    """(oldest, newest) sequence numbers in the change log, (None, None) when it's empty"""
+    return db.session.query(func.min(Change.id), func.max(Change.id)).one()
+
+
+def head():
+    """Sequence number of the latest change, anyone's (0 if none).
+
+    Not the user's own latest: that stays behind the pruned range if they stop
+    writing, which would make every resume from it look stale.
+    """
+    return log_bounds()[1] or 0
+
+
+def is_stale(since):
+    """Whether changes after `since` may have been pruned, or `since` came from another database"""
+    oldest, newest = log_bounds()
+    return oldest is not None and not oldest - 1 <= since <= newest
+
+
+def changes_after_query(user_id, seq, limit):
+    """The user's changes after sequence number `seq`, oldest first, served by ix_changes_user_id_id"""
+    return select(Change).where(Change.user_id == user_id, Change.id > seq).order_by(Change.id).limit(limit)
+
+
+def changes_after(user_id, seq, limit):
+    return db.session.execute(changes_after_query(user_id, seq, limit)).scalars().all()
+
+
+def public_change(change):
+    return {
+        'seq': change.id, 'entity': change.entity, 'id': change.entity_id, 'op': change.op,
+        'data': json.loads(change.data) if change.data is not None else None,
+    }
+
+
+def _event(event, data, id=None):
+    lines = [f'id: {id}'] if id is not None else []
+    return '\n'.join(lines + [f'event: {event}', f'data: {json.dumps(data)}']) + '\n\n'
+
+
+def change_events(user_id, since=None, batch=100):
+    """Server-sent events for the user's change feed, starting after sequence number `since`.
+
+    Without `since`, the feed starts at the latest change. Every 'change' event
+    carries its sequence number as the SSE id, so a reconnecting EventSource resumes
+    from Last-Event-ID. If `since` is older than the retained log, a 'reset' event
+    tells the client to reload its lists before applying further changes. The stream
+    ends after CHANGE_FEED_MAX_SECONDS so long-lived connections get recycled.
+    """
+    config = current_app.config
+    notifier = current_app.extensions['change_notifier']
+    poll_interval = config['CHANGE_FEED_POLL_INTERVAL']
+    stop = time.monotonic() + config['CHANGE_FEED_MAX_SECONDS']
+
+    version = notifier.version(user_id)
+    if since is None:
+        last = head()
+    elif is_stale(since):
+        last = head()
+        yield _event('reset', {'seq': last}, id=last)
+    else:
+        last = since
+    # End the read transaction: between polls the stream holds neither a connection nor a snapshot
+    db.session.rollback()
+    # With an id, so a reconnect resumes from here even if no change arrives in between
+    yield f"retry: {int(poll_interval * 1000)}\n" + _event('ready', {'seq': last}, id=last)
+
+    while time.monotonic() < stop:
+        rows = changes_after(user_id, last, batch)
+        db.session.rollback()
+        for row in rows:
+            yield _event('change', public_change(row), id=row.id)
+            last = row.id
+        if len(rows) == batch:
+            continue
+        # Keeps proxies from timing out the connection and notices clients that went away
+        yield ': keep-alive\n\n'
+        version = notifier.wait(user_id, version, max(0.0, min(poll_interval, stop - time.monotonic())))
+
+
+def init_app(app):
+    notifier = ChangeNotifier()
+    app.extensions['change_notifier'] = notifier
+    # Taken by GET /api/changes/stream, given back when the response is closed
+    app.extensions['change_stream_slots'] = threading.BoundedSemaphore(app.config['CHANGE_FEED_MAX_STREAMS'])
+    app.cli.add_command(changes_cli)
+
+    @on_owner_commit(app)
+    def wake_streams(user_ids):
+        notifier.notify(user_ids)
+
+    return notifier
+
+
+@changes_cli.command('prune')
+@click.option('--days', type=int, help='Keep this many days of changes (default: CHANGE_LOG_RETENTION_DAYS).')
+def prune_command(days):
+    """Delete change log entries older than the retention period."""
+    days = days if days is not None else current_app.config['CHANGE_LOG_RETENTION_DAYS']
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    newest = log_bounds()[1]
+    # The newest entry always stays, so resume points can still be told apart from stale ones
+    deleted = Change.query.filter(Change.created_at < cutoff, Change.id < newest).delete(synchronize_session=False) \
+        if newest is not None else 0
+    db.session.commit()
+    click.echo(f'Deleted {deleted} change(s) older than {days} day(s)')
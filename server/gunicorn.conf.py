@@ -0,0 +1,25 @@
+# gunicorn settings, driven by the same environment variables as config.py:
+#   gunicorn -c gunicorn.conf.py wsgi:app
+import os
+from config import Config
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5555')}"
+
+# Processes for CPU parallelism, threads to overlap database and network waits
+workers = Config.WEB_CONCURRENCY
+threads = Config.WEB_THREADS
+worker_class = 'gthread'
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = 30
+keepalive = 5
+
+# Recycle workers now and then to bound memory growth, staggered so they don't restart together
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 10000))
+max_requests_jitter = max_requests // 10
+
+# Not preloaded: every worker opens its own connection pool and password hashing pool
+preload_app = False
+
+accesslog = '-'
+errorlog = '-'
@@ -0,0 +1,47 @@
+"""
+Load tasks from a CSV or NDJSON file into an existing project.
+
+    python import_tasks.py 1 tasks.csv
+    python import_tasks.py 1 export.ndjson --chunk-size 5000
+"""
+
+import argparse
+import sys
+from app import app, db
+from models import Project
+from importer import FORMATS, detect_format, import_tasks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('project_id', type=int)
+    parser.add_argument('path', help='CSV or NDJSON file (format taken from the extension unless --format is given)')
+    parser.add_argument('--format', choices=FORMATS)
+    parser.add_argument('--chunk-size', type=int, default=app.config['IMPORT_CHUNK_SIZE'])
+    parser.add_argument('--max-errors', type=int, default=app.config['IMPORT_MAX_ERRORS'])
+    args = parser.parse_args()
+
+    with app.app_context():
+        project = db.session.get(Project, args.project_id)
+        if project is None:
+            sys.exit(f'Project {args.project_id} not found')
+
+        try:
+            import_format = detect_format(args.format, args.path)
+        except ValueError as e:
+            sys.exit(str(e))
+
+        with open(args.path, 'rb') as stream:
+            report = import_tasks(stream, project.id, project.user_id, import_format,
+                                  chunk_size=args.chunk_size, max_errors=args.max_errors)
+
+    for error in report.errors:
+        print(f"  row {error['row']}: {error['error']}")
+    if report.failed > len(report.errors):
+        print(f'  ... and {report.failed - len(report.errors)} more')
+    print(f'Imported {report.imported} task(s), {report.failed} failed '
+          f'in {report.elapsed:.2f}s ({report.rows_per_second:,.0f} rows/sec)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+import csv
+import io
+import json
+import time
+from collections import Counter
+from sqlalchemy import insert
+from sqlalchemy.exc import SQLAlchemyError
+from feed import lock_change_log, record_creates
+from models import db, Project, Task
+from stats import record_task_inserts
+from task_fields import build_task, insert_values
+
+FORMATS = ('csv', 'ndjson')
+
+# Columns read from each row; anything else (e.g. the id/created_at of an export) is ignored
+IMPORT_FIELDS = ('title', 'description', 'status', 'priority', 'due_date')
+
+
+def detect_format(explicit=None, filename=None, mimetype=None):
+    """Pick the import format from ?format=, the upload's file extension or its content type"""
+    if explicit:
+        if explicit not in FORMATS:
+            raise ValueError(f"Unknown format '{explicit}' (expected: {', '.join(FORMATS)})")
+        return explicit
+    if filename:
+        extension = filename.rsplit('.', 1)[-1].lower()
+        if extension in FORMATS:
+            return extension
+        if extension in ('jsonl', 'json'):
+            return 'ndjson'
+    if mimetype == 'text/csv':
+        return 'csv'
+    if mimetype in ('application/x-ndjson', 'application/jsonl'):
+        return 'ndjson'
+    raise ValueError('Could not tell the file format: pass format=csv or format=ndjson')
+
+
+def read_rows(stream, format):
+    """Yield (row number, fields, error) for each record of a binary stream, one line at a time"""
+    if not hasattr(stream, 'read1'):
+        stream = io.BufferedReader(stream)
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+
+    if format == 'csv':
+        reader = csv.DictReader(text)
+        for row in reader:
+            # Blank cells mean "use the default", as a missing JSON key would
+            fields = {name: row[name] for name in IMPORT_FIELDS if row.get(name)}
+            yield reader.line_num, fields, None
+        return
+
+    for number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield number, None, 'Invalid JSON'
+            continue
+        if not isinstance(record, dict):
+            yield number, None, 'Each line must be a JSON object'
+            continue
+        yield number, {name: record[name] for name in IMPORT_FIELDS if name in record}, None
+
+
+class ImportReport:
+    def __init__(self, max_errors=100):
+        self.max_errors = max_errors
+        self.imported = 0
+        self.failed = 0
+        self.errors = []
+        self.started = time.perf_counter()
+        self.elapsed = None
+
+    def add_error(self, row, message):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({'row': row, 'error': message})
+
+    def finish(self):
+        self.elapsed = time.perf_counter() - self.started
+
+    @property
+    def rows_per_second(self):
+        total = self.imported + self.failed
+        return total / self.elapsed if self.elapsed else 0.0
+
+    def to_dict(self):
+        return {
+            'imported': self.imported,
+            'failed': self.failed,
+            'errors': self.errors,
+            'errors_truncated': self.failed > len(self.errors),
+            'seconds': round(self.elapsed or 0, 3),
+            'rows_per_second': round(self.rows_per_second)
+        }
+
+
+def _save_chunk(chunk, owner_id, report):
+    """Insert one chunk as a single multi-row INSERT in its own transaction"""
+    try:
+        lock_change_log(db.session)
+        # RETURNING hands back the new tasks (ids, defaults) for the change feed
+        tasks = db.session.scalars(insert(Task).returning(Task), [values for _, values in chunk]).all()
+        record_creates(db.session, tasks)
+        record_task_inserts(db.session, owner_id, Counter(values['status'] for _, values in chunk))
+        db.session.commit()
+        report.imported += len(chunk)
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        message = f'Not saved: {e.__class__.__name__}'
+        for row, _ in chunk:
+            report.add_error(row, message)
+
+
+def import_tasks(stream, project_id, user_id, format, chunk_size=1000, max_errors=100):
+    """Stream-parse CSV/NDJSON tasks into a project.
+
+    Rows are checked with the same rules as POST /api/projects/<id>/tasks; invalid
+    rows are reported and skipped. Valid rows are written `chunk_size` at a time,
+    each chunk committed on its own, so a large file never sits in memory or in one
+    transaction, and a failing chunk does not undo the ones before it. The counters
+    are kept for the project's owner; ValueError if `user_id` is given and isn't them.
+    """
+    owner_id = db.session.query(Project.user_id).filter(Project.id == project_id).scalar()
+    # Don't keep this read open while the rest of the upload streams in
+    db.session.rollback()
+    if owner_id is None:
+        raise ValueError(f'Project {project_id} does not exist')
+    if user_id is not None and user_id != owner_id:
+        raise ValueError(f'Project {project_id} is not owned by user {user_id}')
+
+    report = ImportReport(max_errors)
+    chunk = []
+
+    try:
+        for row, fields, error in read_rows(stream, format):
+            if error is None:
+                try:
+                    chunk.append((row, insert_values(build_task(fields, project_id))))
+                except ValueError as e:
+                    error = str(e)
+            if error is not None:
+                report.add_error(row, error)
+                continue
+
+            if len(chunk) >= chunk_size:
+                _save_chunk(chunk, owner_id, report)
+                chunk = []
+    except (UnicodeDecodeError, csv.Error) as e:
+        # The rest of the file can't be read; keep what was saved and say where it stopped
+        report.add_error(None, f'Stopped reading the file: {e}')
+
+    if chunk:
+        _save_chunk(chunk, owner_id, report)
+
+    report.finish()
+    return report
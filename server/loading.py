@@ -0,0 +1,24 @@
+from flask import current_app
+from sqlalchemy.orm import joinedload, lazyload, selectinload
+
+STRATEGIES = {
+    'selectin': selectinload,
+    'joined': joinedload,
+    'lazy': lazyload,
+}
+
+
+def eager_options(endpoint, model, relationships):
+    """Loader options for the relationships an endpoint is about to touch.
+
+    The strategy for each relationship comes from EAGER_LOADING[endpoint] in the
+    config and falls back to the model's default lazy loading.
+    """
+    configured = current_app.config.get('EAGER_LOADING', {}).get(endpoint, {})
+    options = []
+    for name in relationships:
+        strategy = configured.get(name, 'lazy')
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown loading strategy '{strategy}' for {endpoint}.{name}")
+        options.append(STRATEGIES[strategy](getattr(model, name)))
+    return options
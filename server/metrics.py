@@ -0,0 +1,262 @@
+import cProfile
+import hmac
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from flask import Response, g, has_request_context, request
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 4, 5, 6, 8, 10, 15, 20, 50)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+PROFILERS = ('cprofile', 'pyinstrument')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Histogram:
+    """A Prometheus histogram: cumulative bucket counts, sum and count per label set"""
+
+    def __init__(self, name, help, labelnames, buckets):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # Per-bucket counts (made cumulative when rendered), then sum and count
+                series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][index] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = sorted((labels, (list(counts), total, count)) for labels, (counts, total, count) in self._series.items())
+        for labels, (counts, total, count) in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = _format_labels(self.labelnames, labels, [('le', _format_value(bound))])
+                lines.append(f'{self.name}_bucket{le} {cumulative}')
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, [('le', '+Inf')])} {count}")
+            lines.append(f'{self.name}_sum{_format_labels(self.labelnames, labels)} {total!r}')
+            lines.append(f'{self.name}_count{_format_labels(self.labelnames, labels)} {count}')
+        return '\n'.join(lines)
+
+
+class Registry:
+    def __init__(self):
+        self.request_seconds = Histogram(
+            'http_request_duration_seconds', 'Time to produce a response (streamed bodies excluded).',
+            ('method', 'route', 'status'), LATENCY_BUCKETS)
+        self.sql_statements = Histogram(
+            'http_request_sql_statements', 'SQL statements issued per request.',
+            ('method', 'route'), STATEMENT_BUCKETS)
+        self.sql_seconds = Histogram(
+            'http_request_sql_duration_seconds', 'Time spent executing SQL per request.',
+            ('method', 'route'), LATENCY_BUCKETS)
+        self.serialization_seconds = Histogram(
+            'http_request_serialization_seconds', 'Time spent serializing models and encoding JSON per request.',
+            ('method', 'route'), LATENCY_BUCKETS)
+        self.response_bytes = Histogram(
+            'http_response_size_bytes', 'Response body size (streamed bodies excluded).',
+            ('method', 'route'), SIZE_BUCKETS)
+
+    def histograms(self):
+        return (self.request_seconds, self.sql_statements, self.sql_seconds,
+                self.serialization_seconds, self.response_bytes)
+
+    def render(self):
+        return '\n'.join(histogram.render() for histogram in self.histograms()) + '\n'
+
+
+# One registry per process: each gunicorn worker reports its own requests
+registry = Registry()
+
+
+@contextmanager
+def timed(name):
+    """Add the time spent in the block to this request's `name` total (e.g. 'serialization')"""
+    if not has_request_context():
+        yield
+        return
+    active = g.setdefault('timing_active', set())
+    if name in active:
+        # Nested inside an outer block of the same kind, which already counts it
+        yield
+        return
+    active.add(name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        active.discard(name)
+        timing = g.setdefault('timing', {})
+        timing[name] = timing.get(name, 0.0) + time.perf_counter() - start
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """Flask's JSON provider, with encoding time counted as serialization"""
+
+    def dumps(self, obj, **kwargs):
+        with timed('serialization'):
+            return super().dumps(obj, **kwargs)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('metrics_query_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('metrics_query_start')
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    if has_request_context():
+        g.sql_seconds = g.get('sql_seconds', 0.0) + elapsed
+
+
+def route_label():
+    """The matched URL rule (e.g. /api/tasks/<int:id>), so ids don't explode the label set"""
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+
+def profiler_requested(app):
+    """The profiler named by the X-Profile header, if profiling is allowed here"""
+    value = request.headers.get('X-Profile', '').strip().lower()
+    if not value or not app.config['PROFILING_ENABLED']:
+        return None
+    if value in ('1', 'true', 'yes'):
+        value = 'cprofile'
+    return value if value in PROFILERS else None
+
+
+def _start_profiler(name):
+    if name == 'pyinstrument':
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            logger.warning('X-Profile: pyinstrument requested but pyinstrument is not installed; using cProfile')
+        else:
+            profiler = Profiler()
+            profiler.start()
+            return profiler
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+
+def _save_profile(app, profiler):
+    """Write the request's profile under PROFILE_DIR; returns the file name"""
+    directory = app.config['PROFILE_DIR'] or os.path.join(app.instance_path, 'profiles')
+    os.makedirs(directory, exist_ok=True)
+    endpoint = (request.endpoint or 'unmatched').replace('.', '_')
+    stamp = datetime.utcnow().strftime('%Y%m%d-%H%M%S-%f')
+    if isinstance(profiler, cProfile.Profile):
+        profiler.disable()
+        filename = f'{stamp}-{request.method}-{endpoint}.prof'
+        profiler.dump_stats(os.path.join(directory, filename))
+    else:
+        profiler.stop()
+        filename = f'{stamp}-{request.method}-{endpoint}.html'
+        with open(os.path.join(directory, filename), 'w') as f:
+            f.write(profiler.output_html())
+    return filename
+
+
+def metrics_forbidden(app):
+    """None if this request may read the metrics endpoints, else the (body, status, headers) to answer with"""
+    if not app.config['METRICS_ENABLED']:
+        return 'Metrics are disabled', 404, {}
+    token = app.config['METRICS_TOKEN']
+    if token:
+        scheme, _, given = request.headers.get('Authorization', '').partition(' ')
+        if scheme.lower() != 'bearer' or not hmac.compare_digest(given.strip().encode(), token.encode()):
+            return 'Metrics token required', 401, {'WWW-Authenticate': 'Bearer'}
+    return None
+
+
+def init_app(app):
+    """Per-route latency, SQL and serialization metrics at /metrics, and opt-in request profiles.
+
+    Call it before the other extensions so its after_request hook runs last and
+    sees their work. Send `X-Profile: 1` (cProfile) or `X-Profile: pyinstrument`
+    to profile one request when PROFILING_ENABLED; the file name comes back in
+    X-Profile-File.
+    """
+    app.json = TimedJSONProvider(app)
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+
+    @app.before_request
+    def start_request_metrics():
+        g.request_start = time.perf_counter()
+        name = profiler_requested(app)
+        if name is not None:
+            g.profiler = _start_profiler(name)
+
+    @app.after_request
+    def record_request_metrics(response):
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            response.headers['X-Profile-File'] = _save_profile(app, profiler)
+
+        start = g.pop('request_start', None)
+        if start is None or not app.config['METRICS_ENABLED'] or request.endpoint == 'metrics':
+            return response
+
+        method, route = request.method, route_label()
+        registry.request_seconds.observe((method, route, str(response.status_code)), time.perf_counter() - start)
+        registry.sql_statements.observe((method, route), g.get('query_count', 0))
+        registry.sql_seconds.observe((method, route), g.get('sql_seconds', 0.0))
+        registry.serialization_seconds.observe((method, route), g.get('timing', {}).get('serialization', 0.0))
+        if not response.is_streamed:
+            registry.response_bytes.observe((method, route), response.content_length or 0)
+        return response
+
+    @app.teardown_request
+    def stop_profiler(exc):
+        # The view raised before after_request could save the profile; don't leave this thread profiled
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            if isinstance(profiler, cProfile.Profile):
+                profiler.disable()
+            else:
+                profiler.stop()
+
+    @app.route('/metrics', endpoint='metrics')
+    def metrics():
+        forbidden = metrics_forbidden(app)
+        if forbidden is not None:
+            message, status, headers = forbidden
+            return Response(message + '\n', status=status, headers=headers, mimetype='text/plain')
+        return Response(registry.render(), mimetype='text/plain; version=0.0.4')
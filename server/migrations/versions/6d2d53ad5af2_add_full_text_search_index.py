@@ -0,0 +1,27 @@
+"""Add full-text search index for tasks and projects
+
+Revision ID: 6d2d53ad5af2
+Revises: fabdc08b6962
+Create Date: 2026-10-17 18:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from search import create_search_index, drop_search_index
+
+
+# revision identifiers, used by Alembic.
+revision = '6d2d53ad5af2'
+down_revision = 'fabdc08b6962'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # SQLite: FTS5 tables kept in sync by triggers; Postgres: generated tsvector columns with GIN indexes
+    create_search_index(op.get_bind())
+
+
+def downgrade():
+    drop_search_index(op.get_bind())
@@ -0,0 +1,42 @@
+"""Never reuse project and task ids on SQLite
+
+Revision ID: a3e1c9d47b20
+Revises: c76f692f6ae6
+Create Date: 2026-10-17 19:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from search import create_search_index, drop_search_index
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3e1c9d47b20'
+down_revision = 'c76f692f6ae6'
+branch_labels = None
+depends_on = None
+
+
+def _rebuild(autoincrement):
+    # SQLite only: without AUTOINCREMENT a deleted row's id (the highest) is handed to the
+    # next insert, possibly another user's, while caches still know the old owner.
+    # Postgres sequences never go back.
+    bind = op.get_bind()
+    if bind.dialect.name != 'sqlite':
+        return
+    # The search triggers live on these tables and go with them; re-created (and re-indexed) after
+    drop_search_index(bind)
+    for table in ('projects', 'tasks'):
+        with op.batch_alter_table(table, recreate='always',
+                                  table_kwargs={'sqlite_autoincrement': autoincrement}) as batch_op:
+            pass
+    create_search_index(bind)
+
+
+def upgrade():
+    _rebuild(True)
+
+
+def downgrade():
+    _rebuild(False)
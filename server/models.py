@@ -2,18 +2,21 @@ from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy import MetaData
 from sqlalchemy_serializer import SerializerMixin
 from sqlalchemy.orm import validates
+from replicas import RoutingSession
 from datetime import datetime
 
 metadata = MetaData(naming_convention={
+    "ix": "ix_%(column_0_label)s",
     "fk": "fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s",
 })
 
-db = SQLAlchemy(metadata=metadata)
+# RoutingSession lets read-only requests use a replica (see replicas.py)
+db = SQLAlchemy(metadata=metadata, session_options={'class_': RoutingSession})
 
 class User(db.Model, SerializerMixin):
     __tablename__ = 'users'
     
-    serialize_rules = ('-projects.user', '-password_hash', '-_password_hash')
+    serialize_rules = ('-projects.user', '-password_hash', '-_password_hash', '-stats')
     
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
@@ -23,6 +26,7 @@ class User(db.Model, SerializerMixin):
     
     # Relationships
     projects = db.relationship('Project', backref='user', cascade='all, delete-orphan', lazy=True)
+    stats = db.relationship('UserStats', cascade='all, delete-orphan', uselist=False, lazy=True)
     
     @validates('username')
     def validate_username(self, key, username):
@@ -45,6 +49,15 @@ class Project(db.Model, SerializerMixin):
     
     serialize_rules = ('-user.projects', '-tasks.project')
     
+    # Listing queries filter by owner (and optionally status), newest first
+    __table_args__ = (
+        db.Index('ix_projects_user_id_updated_at', 'user_id', 'updated_at', 'id'),
+        db.Index('ix_projects_user_id_status_updated_at', 'user_id', 'status', 'updated_at', 'id'),
+        # Ids are never reused (SQLite would hand out a deleted max id again), so a cached
+        # ownership answer can't outlive its row and apply to someone else's new one
+        {'sqlite_autoincrement': True},
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text)
@@ -78,6 +91,18 @@ class Task(db.Model, SerializerMixin):
     
     serialize_rules = ('-project.tasks',)
     
+    # Listing queries filter by project (and optionally status), newest first. The
+    # due_date indexes serve GET /api/tasks; see queries.TaskQuery for how they're picked.
+    __table_args__ = (
+        db.Index('ix_tasks_project_id_created_at', 'project_id', 'created_at', 'id'),
+        db.Index('ix_tasks_project_id_status_created_at', 'project_id', 'status', 'created_at', 'id'),
+        db.Index('ix_tasks_project_id_due_date', 'project_id', 'due_date', 'id'),
+        db.Index('ix_tasks_project_id_status_due_date', 'project_id', 'status', 'due_date', 'id'),
+        db.Index('ix_tasks_project_id_priority_due_date', 'project_id', 'priority', 'due_date', 'id'),
+        db.Index('ix_tasks_project_id_status_priority_due_date', 'project_id', 'status', 'priority', 'due_date', 'id'),
+        {'sqlite_autoincrement': True},
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text)
@@ -85,7 +110,7 @@ class Task(db.Model, SerializerMixin):
     priority = db.Column(db.String(20), default='medium')  # low, medium, high
     due_date = db.Column(db.DateTime)
     project_id = db.Column(db.Integer, db.ForeignKey('projects.id'), nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     @validates('title')
@@ -110,3 +135,47 @@ class Task(db.Model, SerializerMixin):
     
     def __repr__(self):
         return f'<Task {self.title}>'
+
+
+class UserStats(db.Model):
+    __tablename__ = 'user_stats'
+    
+    # Materialized dashboard counters, maintained incrementally by the session
+    # hooks in stats.py. Can always be rebuilt with `flask stats rebuild`.
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    projects_active = db.Column(db.Integer, nullable=False, default=0)
+    projects_completed = db.Column(db.Integer, nullable=False, default=0)
+    projects_archived = db.Column(db.Integer, nullable=False, default=0)
+    tasks_todo = db.Column(db.Integer, nullable=False, default=0)
+    tasks_in_progress = db.Column(db.Integer, nullable=False, default=0)
+    tasks_completed = db.Column(db.Integer, nullable=False, default=0)
+    # Bumped on every write to the user's projects or tasks; ETags are derived from it
+    version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    
+    def __repr__(self):
+        return f'<UserStats {self.user_id}>'
+
+
+class Change(db.Model):
+    __tablename__ = 'changes'
+    
+    # Append-only log of project/task writes, one row per entity per flush, written by
+    # the session hooks in feed.py. The id is the sequence number clients resume from;
+    # AUTOINCREMENT keeps SQLite from reusing one after `flask changes prune`.
+    __table_args__ = (
+        db.Index('ix_changes_user_id_id', 'user_id', 'id'),
+        {'sqlite_autoincrement': True},
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    # Not a foreign key: entries outlive the rows (and users) they describe until pruned
+    user_id = db.Column(db.Integer, nullable=False)
+    entity = db.Column(db.String(20), nullable=False)  # project, task
+    entity_id = db.Column(db.Integer, nullable=False)
+    op = db.Column(db.String(10), nullable=False)  # create, update, delete
+    # JSON: every serialized field for a create, the changed ones for an update, null for a delete
+    data = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    def __repr__(self):
+        return f'<Change {self.id} {self.op} {self.entity} {self.entity_id}>'
@@ -0,0 +1,93 @@
+import base64
+import json
+from datetime import datetime
+from flask import current_app, request
+from sqlalchemy import tuple_
+
+
+def parse_flag(value, default=False):
+    """Parse a boolean query parameter such as ?total=false"""
+    if value is None or value == '':
+        return default
+    return value.lower() not in ('0', 'false', 'no', 'off')
+
+
+def page_limit():
+    """The ?limit= page size, clamped to MAX_ITEMS_PER_PAGE"""
+    limit = request.args.get('limit', current_app.config['ITEMS_PER_PAGE'], type=int)
+    return max(1, min(limit, current_app.config['MAX_ITEMS_PER_PAGE']))
+
+
+def encode_token(values):
+    """Opaque, URL-safe token for a list of JSON values"""
+    payload = json.dumps(values, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_token(token):
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        return json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+
+
+def encode_cursor(sort_value, id):
+    return encode_token([sort_value.isoformat() if sort_value else None, id])
+
+
+def decode_cursor(token):
+    try:
+        sort_value, id = decode_token(token)
+        return datetime.fromisoformat(sort_value), int(id)
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+
+
+class KeysetPage:
+    def __init__(self, items, next_cursor, total=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.total = total
+
+    def meta(self):
+        meta = {
+            'next_cursor': self.next_cursor,
+            'has_more': self.next_cursor is not None
+        }
+        if self.total is not None:
+            meta['total'] = self.total
+        return meta
+
+
+def keyset_query(query, sort_column, id_column, after=None, limit=None, descending=True):
+    """Rows strictly after the (sort value, id) position `after`, newest first unless not `descending`"""
+    if after is not None:
+        position = tuple_(sort_column, id_column)
+        query = query.filter(position < tuple_(*after) if descending else position > tuple_(*after))
+    if descending:
+        query = query.order_by(sort_column.desc(), id_column.desc())
+    else:
+        query = query.order_by(sort_column, id_column)
+    return query.limit(limit) if limit is not None else query
+
+
+def keyset_paginate(query, sort_column, id_column, cursor, limit, with_total=False, descending=True):
+    """Newest-first (or oldest-first) keyset pagination on (sort_column, id_column).
+
+    Each page is a single indexed range scan from the cursor position, so deep
+    pages cost the same as the first one. The optional total is a separate COUNT.
+    """
+    total = query.order_by(None).count() if with_total else None
+    after = decode_cursor(cursor) if cursor else None
+
+    # Fetch one extra row to learn whether another page exists
+    items = keyset_query(query, sort_column, id_column, after, limit + 1, descending).all()
+
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        last = items[-1]
+        next_cursor = encode_cursor(getattr(last, sort_column.key), getattr(last, id_column.key))
+
+    return KeysetPage(items, next_cursor, total)
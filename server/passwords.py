@@ -0,0 +1,128 @@
+import atexit
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from flask_bcrypt import Bcrypt
+from werkzeug.local import LocalProxy
+
+passwords_cli = AppGroup('passwords', help='Tune password hashing.')
+
+# Used inside the pool's worker processes, where there is no app
+_bcrypt = Bcrypt()
+
+
+class HasherBusy(Exception):
+    """Too many hashes are queued (or one took too long); the caller should answer 503"""
+
+
+def _hash_password(password, rounds):
+    return _bcrypt.generate_password_hash(password, rounds).decode('utf-8')
+
+
+def _check_password(password_hash, password):
+    return _bcrypt.check_password_hash(password_hash, password)
+
+
+def hash_rounds(password_hash):
+    """The bcrypt cost a hash was made with ('$2b$12$...' -> 12)"""
+    try:
+        return int(password_hash.split('$')[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+class PasswordHasher:
+    """Runs bcrypt on a bounded process pool instead of the request thread.
+
+    At most PASSWORD_HASH_MAX_PENDING hashes may be queued or running at once;
+    beyond that, and when one takes longer than PASSWORD_HASH_TIMEOUT, HasherBusy
+    is raised so a login storm turns into fast 503s rather than pinning every
+    request worker. PASSWORD_HASH_WORKERS = 0 hashes inline (handy in tests).
+    Create one per app; code serving a request uses `password_hasher`.
+    """
+
+    def __init__(self, app=None):
+        self._executor = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.rounds = app.config['BCRYPT_LOG_ROUNDS']
+        self.workers = app.config['PASSWORD_HASH_WORKERS']
+        self.timeout = app.config['PASSWORD_HASH_TIMEOUT']
+        self._slots = threading.BoundedSemaphore(app.config['PASSWORD_HASH_MAX_PENDING'])
+        app.extensions['password_hasher'] = self
+        app.cli.add_command(passwords_cli)
+
+    def _pool(self):
+        # Created on first use so CLI commands and imports don't start processes
+        with self._lock:
+            if self._executor is None:
+                # Forking a multi-threaded server is unsafe; forkserver also avoids re-running
+                # the __main__ script in every worker the way spawn does (Windows only has spawn)
+                method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+                self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context(method))
+                atexit.register(self._executor.shutdown, cancel_futures=True)
+            return self._executor
+
+    def _run(self, fn, *args):
+        if not self.workers:
+            return fn(*args)
+
+        if not self._slots.acquire(blocking=False):
+            raise HasherBusy('Too many password checks in progress')
+        try:
+            future = self._pool().submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        # The slot is held until the hash actually finishes, even if we stop waiting for it
+        future.add_done_callback(lambda _: self._slots.release())
+
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            raise HasherBusy('Password check timed out')
+
+    def hash(self, password, rounds=None):
+        if not password:
+            raise ValueError('Password must be non-empty.')
+        return self._run(_hash_password, password, rounds or self.rounds)
+
+    def check(self, password_hash, password):
+        if not password_hash or not password:
+            return False
+        return self._run(_check_password, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """True when a hash was made with a different cost than BCRYPT_LOG_ROUNDS"""
+        return hash_rounds(password_hash) != self.rounds
+
+
+# The current app's hasher, so each app hashes with its own cost, pool and limits
+password_hasher = LocalProxy(lambda: current_app.extensions['password_hasher'])
+
+
+@passwords_cli.command('calibrate')
+@click.option('--target-ms', type=int, default=250, show_default=True, help='Desired time per hash.')
+@click.option('--max-rounds', type=int, default=15, show_default=True)
+def calibrate_command(target_ms, max_rounds):
+    """Time bcrypt at each cost on this machine and suggest BCRYPT_LOG_ROUNDS."""
+    suggestion = 4
+    for rounds in range(4, max_rounds + 1):
+        start = time.perf_counter()
+        _hash_password('calibration-password', rounds)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        click.echo(f'  rounds={rounds:<3} {elapsed_ms:8.1f} ms')
+        if elapsed_ms > target_ms:
+            break
+        suggestion = rounds
+
+    current = current_app.config['BCRYPT_LOG_ROUNDS']
+    click.echo(f'Suggested BCRYPT_LOG_ROUNDS={suggestion} (currently {current}). '
+               'Existing hashes are upgraded on the next successful login.')
@@ -0,0 +1,150 @@
+from sqlalchemy import select
+from models import Project, Task
+from pagination import keyset_paginate
+from task_fields import parse_due_date
+
+
+def project_list_query(user_id, status=None):
+    """Base query for GET /api/projects, served by the ix_projects_user_id_* indexes"""
+    query = Project.query.filter_by(user_id=user_id)
+    if status:
+        query = query.filter_by(status=status)
+    return query
+
+
+def task_list_query(project_id, status=None):
+    """Base query for GET /api/projects/<id>/tasks, served by the ix_tasks_project_id_* indexes"""
+    query = Task.query.filter_by(project_id=project_id)
+    if status:
+        query = query.filter_by(status=status)
+    return query
+
+
+# ============== GET /api/tasks ==============
+
+# Columns that can be matched against one or more values (?status=todo,in_progress)
+TASK_QUERY_FILTERS = {
+    'status': ('todo', 'in_progress', 'completed'),
+    'priority': ('low', 'medium', 'high'),
+}
+TASK_QUERY_PARAMS = ('status', 'priority', 'project_id', 'due_after', 'due_before', 'sort',
+                     'cursor', 'limit', 'total')
+
+
+def task_query_plans():
+    """{(filtered columns, sort column): index name} for every tasks index led by project_id.
+
+    Within one project, an index (project_id, <filters...>, <sort>, id) answers the
+    filters with a seek and returns rows already in sort order. Those are the only
+    combinations GET /api/tasks accepts, so adding an index is what enables a new one.
+    """
+    plans = {}
+    for index in Task.__table__.indexes:
+        names = [column.name for column in index.columns]
+        if names[0] != 'project_id':
+            continue
+        filtered = frozenset(name for name in names[1:] if name in TASK_QUERY_FILTERS)
+        sort = names[1 + len(filtered)] if len(names) > 1 + len(filtered) else None
+        if sort is not None and set(names[1:1 + len(filtered)]) == filtered:
+            plans[(filtered, sort)] = index.name
+    return plans
+
+
+def describe_plans(plans):
+    return '; '.join(sorted(
+        f"sort={sort} with {' + '.join(sorted(filtered)) or 'no filters'}" for filtered, sort in plans
+    ))
+
+
+def _values(args, name, allowed=None):
+    values = [value for value in args.get(name, '').split(',') if value]
+    for value in values:
+        if allowed is not None and value not in allowed:
+            raise ValueError(f"{name} must be one of: {', '.join(allowed)}")
+    return values
+
+
+class TaskQuery:
+    """The current user's tasks across projects, as parsed from GET /api/tasks parameters.
+
+    Every combination compiles to one statement: the user's (or the requested) project
+    ids come from a subquery on the projects index, and the filters and sort must match
+    an index in task_query_plans(). Anything else raises ValueError instead of
+    falling back to a scan. Each project's matches are one index range (the due date
+    range and the cursor position included); across projects they are merged by a
+    single sort. Sorting by due_date only lists tasks that have one.
+    """
+
+    def __init__(self, user_id, filters=None, project_ids=(), due_after=None, due_before=None, sort='-created_at'):
+        self.user_id = user_id
+        self.filters = {name: list(values) for name, values in (filters or {}).items() if values}
+        self.project_ids = list(project_ids)
+        self.due_after = due_after
+        self.due_before = due_before
+        self.descending = sort.startswith('-')
+        self.sort = sort.lstrip('-')
+        self.index = self.plan()
+
+    @classmethod
+    def from_args(cls, user_id, args):
+        unknown = sorted(set(args) - set(TASK_QUERY_PARAMS))
+        if unknown:
+            raise ValueError(f"Unknown parameter(s): {', '.join(unknown)} "
+                             f"(expected: {', '.join(TASK_QUERY_PARAMS)})")
+        try:
+            project_ids = [int(value) for value in _values(args, 'project_id')]
+        except ValueError:
+            raise ValueError('project_id must be a comma-separated list of project ids')
+
+        due_after = parse_due_date(args.get('due_after'))
+        due_before = parse_due_date(args.get('due_before'))
+        # A due date range is only an index range when the results are sorted by due date
+        default_sort = 'due_date' if due_after or due_before else '-created_at'
+        return cls(
+            user_id,
+            filters={name: _values(args, name, allowed) for name, allowed in TASK_QUERY_FILTERS.items()},
+            project_ids=project_ids, due_after=due_after, due_before=due_before,
+            sort=args.get('sort') or default_sort,
+        )
+
+    def plan(self):
+        """Name of the index serving this query; ValueError if none does"""
+        plans = task_query_plans()
+        sortable = sorted({sort for _, sort in plans})
+        if self.sort not in sortable:
+            raise ValueError(f"Cannot sort by '{self.sort}' (indexed: {', '.join(sortable)})")
+        if (self.due_after or self.due_before) and self.sort != 'due_date':
+            raise ValueError('due_after/due_before require sort=due_date or sort=-due_date')
+
+        index = plans.get((frozenset(self.filters), self.sort))
+        if index is None:
+            filtered = ' + '.join(sorted(self.filters)) or 'no filters'
+            raise ValueError(f'No index serves {filtered} sorted by {self.sort} '
+                             f'(supported: {describe_plans(plans)})')
+        return index
+
+    def query(self):
+        owned = select(Project.id).where(Project.user_id == self.user_id)
+        if self.project_ids:
+            owned = owned.where(Project.id.in_(self.project_ids))
+
+        query = Task.query.filter(Task.project_id.in_(owned))
+        if len(self.project_ids) == 1:
+            # One index range, already in order: no merge sort, and the cursor is a seek
+            query = query.filter(Task.project_id == self.project_ids[0])
+        for name, values in self.filters.items():
+            column = getattr(Task, name)
+            query = query.filter(column == values[0] if len(values) == 1 else column.in_(values))
+
+        sort_column = getattr(Task, self.sort)
+        if self.sort == 'due_date':
+            query = query.filter(sort_column.isnot(None))
+        if self.due_after:
+            query = query.filter(sort_column >= self.due_after)
+        if self.due_before:
+            query = query.filter(sort_column < self.due_before)
+        return query
+
+    def page(self, cursor, limit, with_total=False):
+        return keyset_paginate(self.query(), getattr(Task, self.sort), Task.id, cursor, limit,
+                               with_total=with_total, descending=self.descending)
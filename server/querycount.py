@@ -0,0 +1,71 @@
+import logging
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+MODES = ('off', 'warn', 'raise')
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def query_budget(limit):
+    """Declare the maximum number of SQL statements a view may issue per request.
+
+    Place it below @app.route so the registered view carries the budget:
+
+        @app.route('/api/projects')
+        @query_budget(3)
+        def projects(): ...
+    """
+    def decorator(view):
+        view.query_budget = limit
+        return view
+    return decorator
+
+
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        g.query_count = g.get('query_count', 0) + 1
+
+
+def _budget_mode(app):
+    # Resolved per request so tests can flip TESTING/QUERY_BUDGET_MODE after import
+    mode = app.config.get('QUERY_BUDGET_MODE') or ('raise' if app.testing else 'warn')
+    if mode not in MODES:
+        raise ValueError(f"QUERY_BUDGET_MODE must be one of: {', '.join(MODES)}")
+    return mode
+
+
+def init_app(app):
+    """Count SQL statements per request and check them against each view's budget.
+
+    QUERY_BUDGET_MODE is 'off', 'warn' (log over-budget requests) or 'raise'
+    (fail the request, so N+1 regressions break the tests). It defaults to
+    'raise' when TESTING is on and 'warn' otherwise.
+    """
+    # Listen on the Engine class so every engine (primary or otherwise) is counted
+    if not event.contains(Engine, 'before_cursor_execute', _count_statement):
+        event.listen(Engine, 'before_cursor_execute', _count_statement)
+
+    @app.after_request
+    def check_query_budget(response):
+        mode = _budget_mode(app)
+        if mode == 'off':
+            return response
+
+        count = g.get('query_count', 0)
+        response.headers['X-Query-Count'] = str(count)
+
+        view = app.view_functions.get(request.endpoint)
+        budget = getattr(view, 'query_budget', None)
+        if budget is not None and count > budget:
+            message = f'{request.method} {request.path} issued {count} SQL statements (budget {budget})'
+            if mode == 'raise':
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+
+        return response
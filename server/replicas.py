@@ -0,0 +1,207 @@
+import os
+import random
+import threading
+import time
+import click
+from flask import current_app, g, has_request_context, request, session as flask_session
+from flask.cli import AppGroup
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.sql import CompoundSelect, Select
+from config import engine_options
+
+replicas_cli = AppGroup('replicas', help='Read replica status.')
+
+READ_METHODS = ('GET', 'HEAD')
+
+# Replay lag in seconds, 0 once the replica has applied everything it received
+POSTGRES_LAG = (
+    'SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 '
+    'ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END'
+)
+
+
+def default_lag_probe(dbapi_connection, dialect_name):
+    """Seconds behind the primary. Dialects without a lag query only prove they answer (lag 0)."""
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(POSTGRES_LAG if dialect_name == 'postgresql' else 'SELECT 0')
+        return float(cursor.fetchone()[0] or 0)
+    finally:
+        cursor.close()
+
+
+class ReplicaSet:
+    """Replica engines plus the staleness policy deciding which of them may serve reads.
+
+    With `max_lag` set, each replica's lag is probed at most every `check_interval`
+    seconds; replicas that are further behind, or unreachable, are skipped until the
+    next probe. When none qualify, reads fall back to the primary.
+    """
+
+    def __init__(self, engines, max_lag=None, check_interval=5.0, lag_probe=default_lag_probe):
+        self.engines = list(engines)
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.lag_probe = lag_probe
+        self.lags = {}
+        self._fresh = self.engines
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+
+    def probe(self, engine):
+        # A raw DBAPI connection keeps the probe out of the request's statement count
+        connection = engine.raw_connection()
+        try:
+            return self.lag_probe(connection.driver_connection, engine.dialect.name)
+        finally:
+            connection.close()
+
+    def refresh(self):
+        lags = {}
+        for engine in self.engines:
+            try:
+                lags[engine] = self.probe(engine)
+            except Exception:
+                lags[engine] = None
+        self.lags = lags
+        self._fresh = [engine for engine, lag in lags.items()
+                       if lag is not None and (self.max_lag is None or lag <= self.max_lag)]
+        return lags
+
+    def fresh(self):
+        if self.max_lag is None:
+            return self.engines
+        if time.monotonic() >= self._next_check and self._lock.acquire(blocking=False):
+            # One thread probes; the others keep using the last answer meanwhile
+            try:
+                self._next_check = time.monotonic() + self.check_interval
+                self.refresh()
+            finally:
+                self._lock.release()
+        return self._fresh
+
+    def pick(self):
+        fresh = self.fresh()
+        return random.choice(fresh) if fresh else None
+
+
+def replica_reads(view):
+    """Let GET requests to this view read from a replica.
+
+    Place it below the route decorator, like @query_budget. Writes still go to the
+    primary, and so does every read after the request's first write.
+    """
+    view.replica_reads = True
+    return view
+
+
+def _request_replica():
+    """The replica engine serving this request's reads, or None for the primary"""
+    if 'db_replica' not in g:
+        g.db_replica = None
+        replica_set = current_app.extensions.get('db_replicas')
+        view = current_app.view_functions.get(request.endpoint)
+        if (replica_set is not None and request.method in READ_METHODS
+                and getattr(view, 'replica_reads', False)
+                and flask_session.get('primary_until', 0) <= time.time()):
+            g.db_replica = replica_set.pick()
+    return g.db_replica
+
+
+def _is_read(clause):
+    return isinstance(clause, (Select, CompoundSelect)) and getattr(clause, '_for_update_arg', None) is None
+
+
+def use_primary(session):
+    """Send the rest of this session's reads to the primary; True if they weren't going there already"""
+    replica = has_request_context() and g.get('db_replica')
+    already = session.info.get('pinned_to_primary')
+    session.info['pinned_to_primary'] = True
+    return bool(replica) and not already
+
+
+class RoutingSession(Session):
+    """db.session that can send a request's plain SELECTs to a read replica.
+
+    Anything else (flushes, Core writes, session.connection()) goes to the primary and
+    pins the session there, so a request reads its own writes.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_request_context():
+            if _is_read(clause) and not self._flushing and not self.info.get('pinned_to_primary'):
+                replica = _request_replica()
+                if replica is not None:
+                    return replica
+            elif not _is_read(clause):
+                self.info['pinned_to_primary'] = True
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _note_write(session):
+    if session.info.get('pinned_to_primary') and has_request_context():
+        g.db_wrote = True
+
+
+def _stick_to_primary(response):
+    """After a write, the user reads from the primary until replicas have had time to catch up"""
+    sticky = current_app.config['DB_REPLICA_STICKY_SECONDS']
+    if g.get('db_wrote') and sticky and flask_session.get('user_id'):
+        flask_session['primary_until'] = time.time() + sticky
+    return response
+
+
+def create_replica_engine(app, url):
+    from sqlite_tuning import apply_pragmas
+
+    config = app.config
+    url = make_url(url)
+    if url.get_backend_name() == 'sqlite' and url.database and url.database != ':memory:' \
+            and not os.path.isabs(url.database):
+        # Relative paths resolve against the instance folder, as for the primary
+        url = url.set(database=os.path.join(app.instance_path, url.database))
+    engine = create_engine(url, echo=config['SQLALCHEMY_ECHO'],
+                           **engine_options(dict(config, SQLALCHEMY_DATABASE_URI=str(url))))
+    if engine.dialect.name == 'sqlite':
+        pragmas = dict(config['SQLITE_PRAGMAS']) if config['SQLITE_PERFORMANCE_MODE'] else {}
+        # Replicas are read-only: a write that slips through fails instead of forking the data
+        apply_pragmas(engine, dict(pragmas, query_only='ON'))
+    return engine
+
+
+def init_app(app, lag_probe=default_lag_probe):
+    """Route reads of @replica_reads views to SQLALCHEMY_REPLICA_URLS, if any are configured.
+
+    Staleness policy: replicas lagging more than DB_REPLICA_MAX_LAG seconds are skipped
+    (unset: never probed), and a user who just wrote reads from the primary for the
+    next DB_REPLICA_STICKY_SECONDS.
+    """
+    app.cli.add_command(replicas_cli)
+    urls = app.config['SQLALCHEMY_REPLICA_URLS']
+    if not urls:
+        return None
+
+    replica_set = ReplicaSet(
+        [create_replica_engine(app, url) for url in urls],
+        max_lag=app.config['DB_REPLICA_MAX_LAG'],
+        check_interval=app.config['DB_REPLICA_CHECK_INTERVAL'],
+        lag_probe=lag_probe,
+    )
+    app.extensions['db_replicas'] = replica_set
+    app.after_request(_stick_to_primary)
+    return replica_set
+
+
+@replicas_cli.command('status')
+def status_command():
+    """Probe every replica and show its lag."""
+    replica_set = current_app.extensions.get('db_replicas')
+    if replica_set is None:
+        click.echo('No replicas configured (SQLALCHEMY_REPLICA_URLS)')
+        return
+    for engine, lag in replica_set.refresh().items():
+        state = 'unreachable' if lag is None else f'{lag:.1f}s behind'
+        click.echo(f'{engine.url.render_as_string(hide_password=True)}  {state}')
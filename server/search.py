@@ -0,0 +1,253 @@
+import re
+import click
+from flask.cli import AppGroup
+from sqlalchemy import Float, Integer, and_, event, func, literal_column, or_, text
+from models import db, Project, Task
+from pagination import decode_token, encode_token
+
+search_cli = AppGroup('search', help='Maintain the full-text search index.')
+
+TYPES = ('tasks', 'projects')
+MAX_TERMS = 8
+
+# Filters each searchable type accepts besides the text query
+FILTERS = {
+    'tasks': {'status': ('todo', 'in_progress', 'completed'), 'priority': ('low', 'medium', 'high')},
+    'projects': {'status': ('active', 'completed', 'archived')},
+}
+
+# ============== SQLITE: FTS5 ==============
+#
+# One FTS5 table per model, keyed by the row id and kept in sync by triggers, so ORM
+# flushes and Core bulk writes alike are indexed. Besides the text, each row carries
+# its owner ('u<user_id>') and filter values scoped to the owner ('u<user_id>s<status>')
+# as tokens, so "this user's high-priority todo tasks matching 'deploy'" is answered
+# by the index alone and a filter's doclist is never longer than one user's rows.
+
+SQLITE_SEARCH_TABLES = {
+    'tasks': {
+        'table': 'task_search',
+        'columns': ('title', 'description', 'owner', 'status', 'priority'),
+        # bm25 weight per column: title matches count most; owner/filters don't rank
+        'weights': (10.0, 4.0, 0.0, 0.0, 0.0),
+        'values': "{row}.id, {row}.title, coalesce({row}.description, ''), 'u' || projects.user_id, "
+                  "'u' || projects.user_id || 's' || replace({row}.status, '_', ''), "
+                  "'u' || projects.user_id || 'p' || {row}.priority",
+        'trigger_from': 'FROM projects WHERE projects.id = new.project_id',
+        'backfill_from': 'FROM tasks JOIN projects ON projects.id = tasks.project_id',
+        'watch': 'title, description, status, priority, project_id',
+    },
+    'projects': {
+        'table': 'project_search',
+        'columns': ('name', 'description', 'owner', 'status'),
+        'weights': (10.0, 4.0, 0.0, 0.0),
+        'values': "{row}.id, {row}.name, coalesce({row}.description, ''), 'u' || {row}.user_id, "
+                  "'u' || {row}.user_id || 's' || replace({row}.status, '_', '')",
+        'trigger_from': '',
+        'backfill_from': 'FROM projects',
+        'watch': 'name, description, status, user_id',
+    },
+}
+
+
+def _sqlite_statements(source, spec):
+    table, columns = spec['table'], ', '.join(spec['columns'])
+    insert = f"INSERT INTO {table}(rowid, {columns}) SELECT {spec['values'].format(row='new')} {spec['trigger_from']};"
+    delete = f'DELETE FROM {table} WHERE rowid = old.id;'
+    return [
+        # Prefix indexes, so 'de*' to 'depl*' don't merge the doclists of every matching term
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5({columns}, "
+        f"tokenize='unicode61 remove_diacritics 2', prefix='2 3 4')",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_ai AFTER INSERT ON {source} BEGIN {insert} END",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_au AFTER UPDATE OF {spec['watch']} ON {source} "
+        f"BEGIN {delete} {insert} END",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_ad AFTER DELETE ON {source} BEGIN {delete} END",
+    ]
+
+
+def _sqlite_backfill(source, spec):
+    table, columns = spec['table'], ', '.join(spec['columns'])
+    return [
+        f'DELETE FROM {table}',
+        f"INSERT INTO {table}(rowid, {columns}) SELECT {spec['values'].format(row=source)} {spec['backfill_from']}",
+    ]
+
+
+# ============== POSTGRES: TSVECTOR + GIN ==============
+
+POSTGRES_VECTORS = {
+    'tasks': ('title', 'description'),
+    'projects': ('name', 'description'),
+}
+
+
+def _postgres_statements(source, columns):
+    heading, body = columns
+    return [
+        f"ALTER TABLE {source} ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ("
+        f"setweight(to_tsvector('simple', coalesce({heading}, '')), 'A') || "
+        f"setweight(to_tsvector('simple', coalesce({body}, '')), 'B')) STORED",
+        f'CREATE INDEX IF NOT EXISTS ix_{source}_search_vector ON {source} USING GIN (search_vector)',
+    ]
+
+
+def create_search_index(connection):
+    """Create the search tables/columns and triggers, and index the existing rows"""
+    if connection.dialect.name == 'sqlite':
+        for source, spec in SQLITE_SEARCH_TABLES.items():
+            for statement in _sqlite_statements(source, spec) + _sqlite_backfill(source, spec):
+                connection.exec_driver_sql(statement)
+    elif connection.dialect.name == 'postgresql':
+        # Generated columns fill themselves in for existing rows
+        for source, columns in POSTGRES_VECTORS.items():
+            for statement in _postgres_statements(source, columns):
+                connection.exec_driver_sql(statement)
+
+
+def drop_search_index(connection):
+    if connection.dialect.name == 'sqlite':
+        for spec in SQLITE_SEARCH_TABLES.values():
+            for suffix in ('ai', 'au', 'ad'):
+                connection.exec_driver_sql(f"DROP TRIGGER IF EXISTS {spec['table']}_{suffix}")
+            connection.exec_driver_sql(f"DROP TABLE IF EXISTS {spec['table']}")
+    elif connection.dialect.name == 'postgresql':
+        for source in POSTGRES_VECTORS:
+            connection.exec_driver_sql(f'DROP INDEX IF EXISTS ix_{source}_search_vector')
+            connection.exec_driver_sql(f'ALTER TABLE {source} DROP COLUMN IF EXISTS search_vector')
+
+
+def rebuild_search_index(connection):
+    """Re-index every row (SQLite); the Postgres columns are generated and never drift"""
+    if connection.dialect.name == 'sqlite':
+        for source, spec in SQLITE_SEARCH_TABLES.items():
+            for statement in _sqlite_backfill(source, spec):
+                connection.exec_driver_sql(statement)
+
+
+# db.create_all() (dev databases, benchmarks) gets the index too; migrations call create_search_index
+event.listen(db.metadata, 'after_create', lambda target, connection, **kw: create_search_index(connection))
+event.listen(db.metadata, 'before_drop', lambda target, connection, **kw: drop_search_index(connection))
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    """Keep autogenerate from proposing to drop the search tables and columns it doesn't know about"""
+    if type_ == 'table' and reflected and compare_to is None:
+        return not any(name == spec['table'] or name.startswith(spec['table'] + '_')
+                       for spec in SQLITE_SEARCH_TABLES.values())
+    if type_ in ('column', 'index') and reflected and compare_to is None:
+        return name not in ('search_vector',) and not name.endswith('_search_vector')
+    return True
+
+
+# ============== QUERIES ==============
+
+def parse_terms(q):
+    """Words of a search string, lowercased; at most MAX_TERMS of them"""
+    terms = re.findall(r'\w+', (q or '').lower())
+    if not terms:
+        raise ValueError('Search query must contain at least one word')
+    return terms[:MAX_TERMS]
+
+
+def parse_filters(kind, args):
+    filters = {}
+    for name, allowed in FILTERS[kind].items():
+        value = args.get(name)
+        if value:
+            if value not in allowed:
+                raise ValueError(f"{name} must be one of: {', '.join(allowed)}")
+            filters[name] = value
+    return filters
+
+
+def filter_token(user_id, name, value):
+    # Matches the trigger's 'u' || user_id || 's' || replace(status, '_', '')
+    return f"u{user_id}{name[0]}{value.replace('_', '')}"
+
+
+def _fts_match(terms, user_id, filters, text_columns):
+    # Every term is quoted, so nothing the user types is parsed as FTS5 syntax. The last
+    # term matches as a prefix ('fix dep' finds 'fix deploy'), as it is usually still being typed.
+    words = ' '.join(f'"{term}"' for term in terms[:-1])
+    words += f' "{terms[-1]}"*' if len(terms[-1]) > 1 else f' "{terms[-1]}"'
+    clauses = [f'owner:"u{user_id}"'] + [f'{name}:"{filter_token(user_id, name, value)}"'
+                                          for name, value in filters.items()]
+    return ' AND '.join(clauses) + f" AND {{{' '.join(text_columns)}}}: ({words})"
+
+
+def _sqlite_matches(kind, terms, user_id, filters, rank_window):
+    spec = SQLITE_SEARCH_TABLES[kind]
+    table = spec['table']
+    weights = ', '.join(str(weight) for weight in spec['weights'])
+    # bm25 costs ~10us per matching row, so a word found in most of a user's 10k tasks
+    # would dominate the request. Only the newest `rank_window` matches are ranked; the
+    # cutoff comes from walking the match newest-first, which needs no scoring.
+    statement = text(
+        f"SELECT rowid AS id, bm25({table}, {weights}) AS rank FROM {table} "
+        f"WHERE {table} MATCH :match AND rowid >= coalesce("
+        f"(SELECT rowid FROM {table} WHERE {table} MATCH :match ORDER BY rowid DESC "
+        f"LIMIT 1 OFFSET :window), 0)"
+    ).bindparams(match=_fts_match(terms, user_id, filters, spec['columns'][:2]), window=rank_window - 1)
+    return statement.columns(id=Integer, rank=Float).subquery('matches')
+
+
+def _postgres_search(model, terms, user_id, filters):
+    tsquery = func.to_tsquery('simple', ' & '.join(f'{term}:*' for term in terms))
+    vector = literal_column(f'{model.__tablename__}.search_vector')
+    # Lower is better, as with SQLite's bm25
+    rank = (-func.ts_rank_cd(vector, tsquery)).label('rank')
+    query = db.session.query(model, rank).filter(vector.op('@@')(tsquery))
+    if model is Task:
+        query = query.join(Project, Task.project_id == Project.id).filter(Project.user_id == user_id)
+    else:
+        query = query.filter(Project.user_id == user_id)
+    for name, value in filters.items():
+        query = query.filter(getattr(model, name) == value)
+    return query, rank
+
+
+def search_query(kind, terms, user_id, filters, rank_window):
+    """(query of (row, rank) pairs, rank column), best match first once ordered by (rank, id)"""
+    model = Task if kind == 'tasks' else Project
+    if db.engine.dialect.name == 'postgresql':
+        return _postgres_search(model, terms, user_id, filters)
+    matches = _sqlite_matches(kind, terms, user_id, filters, rank_window)
+    query = db.session.query(model, matches.c.rank).join(matches, model.id == matches.c.id)
+    return query, matches.c.rank
+
+
+def search(kind, q, user_id, args, cursor, limit, rank_window=1000):
+    """One page of ranked results for `q`, filtered by the FILTERS found in `args`: (rows, next_cursor).
+
+    Pages continue from the (rank, id) of the previous page's last row. Ranks depend
+    on the whole index, so writes between pages can shift results slightly.
+    """
+    if kind not in TYPES:
+        raise ValueError(f"Unknown type '{kind}' (expected: {', '.join(TYPES)})")
+    terms = parse_terms(q)
+    filters = parse_filters(kind, args)
+    model = Task if kind == 'tasks' else Project
+    query, rank = search_query(kind, terms, user_id, filters, rank_window)
+
+    if cursor:
+        try:
+            after_rank, after_id = decode_token(cursor)
+            after_rank, after_id = float(after_rank), int(after_id)
+        except (TypeError, ValueError):
+            raise ValueError('Invalid cursor')
+        query = query.filter(or_(rank > after_rank, and_(rank == after_rank, model.id > after_id)))
+
+    rows = query.order_by(rank, model.id).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_token([rows[-1][1], rows[-1][0].id])
+    return [row for row, _ in rows], next_cursor
+
+
+@search_cli.command('rebuild')
+def rebuild_command():
+    """Re-index every task and project."""
+    with db.engine.begin() as connection:
+        rebuild_search_index(connection)
+    click.echo('Search index rebuilt')
@@ -1,13 +1,11 @@
-from app import app, db
-from models import User, Project, Task
-from flask_bcrypt import Bcrypt
+from app import app, db, password_hasher
+from models import User, Project, Task, UserStats
 from datetime import datetime, timedelta
 
-bcrypt = Bcrypt()
-
 def seed_data():
     with app.app_context():
         print("Clearing database...")
+        UserStats.query.delete()
         Task.query.delete()
         Project.query.delete()
         User.query.delete()
@@ -17,13 +15,13 @@ def seed_data():
         user1 = User(
             username="demo_user",
             email="demo@tricab.com",
-            _password_hash=bcrypt.generate_password_hash("password123").decode('utf-8')
+            _password_hash=password_hasher.hash("password123")
         )
         
         user2 = User(
             username="john_doe",
             email="john@example.com",
-            _password_hash=bcrypt.generate_password_hash("password123").decode('utf-8')
+            _password_hash=password_hasher.hash("password123")
         )
         
         db.session.add_all([user1, user2])
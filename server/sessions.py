@@ -0,0 +1,240 @@
+import json
+import secrets
+import threading
+import time
+from flask import request
+from flask.sessions import SessionInterface, SessionMixin
+from itsdangerous import BadSignature, Signer
+from werkzeug.datastructures import CallbackDict
+
+
+class MemorySessionStore:
+    """Sessions in a dict in this process. Single-node only: other workers can't see them."""
+
+    def __init__(self, sweep_interval=60):
+        self.sweep_interval = sweep_interval
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._next_sweep = time.monotonic() + sweep_interval
+
+    def get(self, sid):
+        self._maybe_sweep()
+        with self._lock:
+            entry = self._sessions.get(sid)
+            if entry is None:
+                return None
+            expires_at, data = entry
+            if expires_at < time.time():
+                del self._sessions[sid]
+                return None
+            return data, expires_at
+
+    def set(self, sid, data, ttl):
+        with self._lock:
+            self._sessions[sid] = (time.time() + ttl, data)
+
+    def delete(self, sid):
+        with self._lock:
+            self._sessions.pop(sid, None)
+
+    def sweep(self):
+        """Drop every expired session; returns how many were removed"""
+        now = time.time()
+        with self._lock:
+            expired = [sid for sid, (expires_at, _) in self._sessions.items() if expires_at < now]
+            for sid in expired:
+                del self._sessions[sid]
+        return len(expired)
+
+    def _maybe_sweep(self):
+        # Piggyback on lookups instead of running a background thread
+        now = time.monotonic()
+        if now >= self._next_sweep:
+            self._next_sweep = now + self.sweep_interval
+            self.sweep()
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+class RedisSessionStore:
+    """Sessions in any server speaking the Redis protocol (redis.Redis, fakeredis, ...).
+
+    Entries carry a Redis TTL, so the server expires them itself and sweep() has nothing to do.
+    """
+
+    def __init__(self, client, prefix='tricab:session:'):
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, sid):
+        raw = self.client.get(self.prefix + sid)
+        if raw is None:
+            return None
+        payload = json.loads(raw)
+        return payload['data'], payload['expires_at']
+
+    def set(self, sid, data, ttl):
+        payload = {'data': data, 'expires_at': time.time() + ttl}
+        self.client.set(self.prefix + sid, json.dumps(payload, separators=(',', ':')), ex=int(ttl))
+
+    def delete(self, sid):
+        self.client.delete(self.prefix + sid)
+
+    def sweep(self):
+        return 0
+
+
+class ServerSideSession(CallbackDict, SessionMixin):
+    """Session data kept in a store; the cookie only carries a signed, random session id"""
+
+    def __init__(self, initial=None, sid=None, expires_at=None):
+        def on_update(self):
+            self.modified = True
+            self.accessed = True
+
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.expires_at = expires_at
+        self.previous_sid = None
+        self.modified = False
+        self.accessed = False
+
+    def regenerate(self):
+        """Move the data to a fresh id, e.g. at login, so a pre-login id can't be reused"""
+        self.previous_sid = self.previous_sid or self.sid
+        self.sid = None
+        self.modified = True
+
+
+def create_store(config):
+    backend = config.get('SESSION_TYPE', 'memory')
+    if backend == 'memory':
+        return MemorySessionStore(config.get('SESSION_SWEEP_INTERVAL', 60))
+    if backend == 'redis':
+        import redis
+        return RedisSessionStore(redis.Redis.from_url(config['SESSION_REDIS_URL']))
+    raise ValueError(f"Unknown SESSION_TYPE '{backend}' (expected 'memory', 'redis' or 'cookie')")
+
+
+class ServerSideSessionInterface(SessionInterface):
+    """Flask session interface backed by a MemorySessionStore or RedisSessionStore.
+
+    Each request does at most one store read (when it carries a cookie) and one
+    write (when the session changed or is past half its lifetime). The read time
+    is reported in a Server-Timing header and accumulated in `lookup_stats`.
+    """
+
+    salt = 'tricab-session'
+
+    def __init__(self, store):
+        self.store = store
+        self.lookup_count = 0
+        self.lookup_seconds = 0.0
+        self._stats_lock = threading.Lock()
+
+    def _signer(self, app):
+        return Signer(app.secret_key, salt=self.salt)
+
+    def _lifetime(self, app):
+        return app.permanent_session_lifetime.total_seconds()
+
+    def lookup_stats(self):
+        with self._stats_lock:
+            average = self.lookup_seconds / self.lookup_count if self.lookup_count else 0.0
+            return {'lookups': self.lookup_count, 'average_ms': average * 1000}
+
+    def open_session(self, app, request):
+        cookie = request.cookies.get(self.get_cookie_name(app))
+        if not cookie:
+            return ServerSideSession()
+
+        try:
+            # Forged or stale-key cookies are rejected without touching the store
+            sid = self._signer(app).unsign(cookie).decode()
+        except BadSignature:
+            return ServerSideSession()
+
+        start = time.perf_counter()
+        found = self.store.get(sid)
+        elapsed = time.perf_counter() - start
+        with self._stats_lock:
+            self.lookup_count += 1
+            self.lookup_seconds += elapsed
+        request.environ['tricab.session_lookup'] = elapsed
+
+        if found is None:
+            return ServerSideSession()
+        data, expires_at = found
+        return ServerSideSession(data, sid=sid, expires_at=expires_at)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        secure = self.get_cookie_secure(app)
+        samesite = self.get_cookie_samesite(app)
+        httponly = self.get_cookie_httponly(app)
+
+        elapsed = request.environ.get('tricab.session_lookup')
+        if elapsed is not None:
+            response.headers.add('Server-Timing', f'session;dur={elapsed * 1000:.3f}')
+
+        if session.accessed:
+            response.vary.add('Cookie')
+
+        if session.previous_sid:
+            self.store.delete(session.previous_sid)
+
+        # Emptied (logout): revoke it server-side and drop the cookie
+        if not session:
+            if session.sid:
+                self.store.delete(session.sid)
+            if session.modified or session.sid:
+                response.delete_cookie(name, domain=domain, path=path, secure=secure,
+                                       samesite=samesite, httponly=httponly)
+                response.vary.add('Cookie')
+            return
+
+        lifetime = self._lifetime(app)
+        # Sliding expiry without a write per request: renew once half the lifetime is used
+        needs_renewal = session.expires_at is None or session.expires_at - time.time() < lifetime / 2
+        if not (session.modified or needs_renewal):
+            return
+
+        new_sid = session.sid is None
+        if new_sid:
+            session.sid = secrets.token_urlsafe(32)
+        self.store.set(session.sid, dict(session), lifetime)
+
+        if new_sid or session.permanent:
+            response.set_cookie(
+                name,
+                self._signer(app).sign(session.sid).decode(),
+                expires=self.get_expiration_time(app, session),
+                httponly=httponly,
+                domain=domain,
+                path=path,
+                secure=secure,
+                samesite=samesite,
+            )
+            response.vary.add('Cookie')
+
+
+def regenerate_session(session):
+    """Issue a new session id (no-op for cookie sessions, which have no id to fixate)"""
+    if isinstance(session, ServerSideSession):
+        session.regenerate()
+
+
+def init_app(app, store=None):
+    """Install server-side sessions unless SESSION_TYPE is 'cookie' (Flask's signed cookies).
+
+    Pass `store` to use a specific backend, e.g. a RedisSessionStore around fakeredis.
+    """
+    if store is None and app.config.get('SESSION_TYPE', 'memory') == 'cookie':
+        return None
+    interface = ServerSideSessionInterface(store if store is not None else create_store(app.config))
+    app.session_interface = interface
+    app.extensions['session_store'] = interface.store
+    return interface
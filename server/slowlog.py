@@ -0,0 +1,230 @@
+import hashlib
+import logging
+import re
+import threading
+import time
+from collections import Counter, deque
+from flask import current_app, has_app_context, has_request_context, jsonify, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from explain import plan_problems
+from metrics import metrics_forbidden, route_label
+
+logger = logging.getLogger(__name__)
+
+# Literals and placeholders (qmark, named and pyformat) all normalize to ?
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'(?<![\w.])-?\d+(?:\.\d+)?\b')
+_PLACEHOLDER = re.compile(r'%\(\w+\)s|%s|(?<![:\w]):\w+')
+# IN (?, ?, ?) and the VALUES (?, ?), (?, ?) rows of batched INSERTs, whatever their length
+_LIST = re.compile(r'\(\?(?:\s*,\s*\?)*\)')
+_ROWS = re.compile(r'\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+')
+
+_EXPLAINABLE = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+
+def normalize_sql(statement):
+    """The statement with literals and parameter lists collapsed, so one query shape has one text"""
+    sql = _STRING.sub('?', statement)
+    sql = _PLACEHOLDER.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = ' '.join(sql.split())
+    sql = _LIST.sub('(...)', sql)
+    return _ROWS.sub('(...), ...', sql)
+
+
+def fingerprint(normalized):
+    return hashlib.sha1(normalized.encode()).hexdigest()[:16]
+
+
+def _parameter_rows(parameters, executemany):
+    """The executemany rows, or None for one set of parameters.
+
+    SQLAlchemy reports executemany for each row of an INSERT ... RETURNING it runs
+    one row at a time, with that row's parameters alone.
+    """
+    if not executemany or not parameters:
+        return None
+    rows = list(parameters)
+    return rows if isinstance(rows[0], (tuple, list, dict)) else None
+
+
+def parameter_shape(parameters, executemany=False):
+    """The parameters' types, never their values: '(int, str)', '{user_id: int}', '500 x (int, str)'"""
+    rows = _parameter_rows(parameters, executemany)
+    if rows is not None:
+        return f'{len(rows)} x {parameter_shape(rows[0])}'
+    if isinstance(parameters, dict):
+        return '{' + ', '.join(f'{name}: {type(value).__name__}' for name, value in parameters.items()) + '}'
+
+    # Runs of one type are counted, so a 1000-id IN list stays short
+    runs = []
+    for value in parameters or ():
+        name = type(value).__name__
+        if runs and runs[-1][0] == name:
+            runs[-1][1] += 1
+        else:
+            runs.append([name, 1])
+    return '(' + ', '.join(name if count == 1 else f'{name} x {count}' for name, count in runs) + ')'
+
+
+def explainable(statement):
+    """Only DML has a plan; EXPLAIN on DDL would just re-validate it against the changed schema"""
+    words = statement.split(None, 1)
+    return bool(words) and words[0].upper() in _EXPLAINABLE
+
+
+def explain_plan(cursor_factory, dialect_name, statement, parameters):
+    """The plan for a statement just executed, on a raw DBAPI cursor so no engine events fire"""
+    prefix = 'EXPLAIN QUERY PLAN' if dialect_name == 'sqlite' else 'EXPLAIN'
+    cursor = cursor_factory()
+    try:
+        cursor.execute(f'{prefix} {statement}', parameters)
+        return [row[-1] if dialect_name == 'sqlite' else row[0] for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+
+def _percentile(ordered, fraction):
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+class SlowQueryLog:
+    """Statements slower than a threshold, logged and aggregated by fingerprint over a rolling window.
+
+    A fingerprint is the hash of the normalized SQL, so every execution of one
+    query shape lands in one entry whatever its literals or IN-list lengths. Each
+    entry keeps the endpoints that issued it, its parameter shape and one
+    EXPLAIN per window, so a plan that changes as tables grow is captured again.
+    """
+
+    def __init__(self, threshold, window, explain=True, max_events=10000):
+        self.threshold = threshold
+        self.window = window
+        self.explain = explain
+        self._events = deque(maxlen=max_events)
+        self._queries = {}
+        self._lock = threading.Lock()
+
+    def _prune(self, now):
+        while self._events and self._events[0][0] < now - self.window:
+            self._events.popleft()
+        live = {event[1] for event in self._events}
+        for key in [key for key in self._queries if key not in live]:
+            del self._queries[key]
+
+    def record(self, statement, parameters, executemany, duration, endpoint, cursor_factory=None, dialect_name=None):
+        normalized = normalize_sql(statement)
+        key = fingerprint(normalized)
+        shape = parameter_shape(parameters, executemany)
+        now = time.time()
+
+        with self._lock:
+            self._prune(now)
+            query = self._queries.get(key)
+            if query is None:
+                query = self._queries[key] = {'sql': normalized, 'plan': None, 'explained_at': None}
+            query['parameters'] = shape
+            needs_plan = self.explain and cursor_factory is not None and explainable(statement) and (
+                query['explained_at'] is None or query['explained_at'] < now - self.window)
+            if needs_plan:
+                query['explained_at'] = now
+            self._events.append((now, key, duration, endpoint))
+
+        plan = None
+        if needs_plan:
+            try:
+                rows = _parameter_rows(parameters, executemany)
+                # One row's parameters plan an executemany like any of its rows
+                sample = rows[0] if rows is not None else parameters
+                plan = explain_plan(cursor_factory, dialect_name, statement, sample)
+            except Exception as e:
+                plan = [f'EXPLAIN failed: {e.__class__.__name__}: {e}']
+            with self._lock:
+                if key in self._queries:
+                    self._queries[key]['plan'] = plan
+
+        logger.warning('Slow query %s (%.1f ms, %s): %s params=%s', key, duration * 1000, endpoint, normalized, shape)
+        if plan is not None:
+            logger.warning('Slow query %s plan: %s', key, ' | '.join(plan))
+
+    def report(self):
+        """Fingerprints seen in the window, slowest in total first"""
+        with self._lock:
+            self._prune(time.time())
+            events = list(self._events)
+            queries = {key: dict(query) for key, query in self._queries.items()}
+
+        grouped = {}
+        for at, key, duration, endpoint in events:
+            entry = grouped.setdefault(key, {'durations': [], 'endpoints': Counter(), 'first_seen': at})
+            entry['durations'].append(duration)
+            entry['endpoints'][endpoint] += 1
+            entry['last_seen'] = at
+
+        rows = []
+        for key, entry in grouped.items():
+            durations = sorted(entry['durations'])
+            query = queries[key]
+            rows.append({
+                'fingerprint': key,
+                'sql': query['sql'],
+                'parameters': query['parameters'],
+                'count': len(durations),
+                'total_ms': round(sum(durations) * 1000, 1),
+                'p50_ms': round(_percentile(durations, 0.5) * 1000, 1),
+                'p95_ms': round(_percentile(durations, 0.95) * 1000, 1),
+                'max_ms': round(durations[-1] * 1000, 1),
+                'endpoints': dict(entry['endpoints'].most_common()),
+                'plan': query['plan'],
+                'plan_problems': plan_problems(query['plan'] or [], allow_sort=False),
+                'first_seen': entry['first_seen'],
+                'last_seen': entry['last_seen'],
+            })
+        return sorted(rows, key=lambda row: row['total_ms'], reverse=True)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('slowlog_query_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('slowlog_query_start')
+    if not starts:
+        return
+    duration = time.perf_counter() - starts.pop()
+    if not has_app_context():
+        return
+    log = current_app.extensions.get('slow_queries')
+    if log is None or duration < log.threshold:
+        return
+
+    endpoint = f'{request.method} {route_label()}' if has_request_context() else 'no request'
+    log.record(statement, parameters, executemany, duration, endpoint,
+               cursor_factory=conn.connection.cursor, dialect_name=conn.dialect.name)
+
+
+def init_app(app):
+    """Log statements slower than SLOW_QUERY_MS and aggregate them at GET /metrics/slow-queries"""
+    if not app.config['SLOW_QUERY_LOG']:
+        return None
+    log = SlowQueryLog(app.config['SLOW_QUERY_MS'] / 1000, app.config['SLOW_QUERY_WINDOW'],
+                       explain=app.config['SLOW_QUERY_EXPLAIN'])
+    app.extensions['slow_queries'] = log
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+
+    @app.route('/metrics/slow-queries', endpoint='slow_queries')
+    def slow_queries():
+        forbidden = metrics_forbidden(app)
+        if forbidden is not None:
+            message, status, headers = forbidden
+            return jsonify({'error': message}), status, headers
+        return jsonify({
+            'threshold_ms': app.config['SLOW_QUERY_MS'],
+            'window_seconds': log.window,
+            'queries': log.report()
+        }), 200
+
+    return log
@@ -0,0 +1,185 @@
+import threading
+import time
+from collections import deque
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from config import is_memory_sqlite
+from models import db
+
+READ_METHODS = ('GET', 'HEAD', 'OPTIONS')
+WRITE_STATEMENTS = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+
+class WriterQueueTimeout(RuntimeError):
+    pass
+
+
+class WriterQueue:
+    """One writer at a time, admitted in arrival order.
+
+    SQLite allows a single writer per database no matter how it is configured. Queueing
+    writers here means a thread waits its turn instead of racing the others into
+    'database is locked'; readers never touch the queue and run concurrently under WAL.
+    """
+
+    def __init__(self, timeout=10.0):
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._waiters = deque()
+        self._held = False
+        self.acquired = 0
+        self.waited = 0
+        self.wait_seconds = 0.0
+        self.max_depth = 0
+
+    def acquire(self):
+        with self._lock:
+            self.acquired += 1
+            if not self._held and not self._waiters:
+                self._held = True
+                return
+            turn = threading.Event()
+            self._waiters.append(turn)
+            self.waited += 1
+            self.max_depth = max(self.max_depth, len(self._waiters))
+
+        start = time.perf_counter()
+        granted = turn.wait(self.timeout)
+        with self._lock:
+            self.wait_seconds += time.perf_counter() - start
+            # The previous writer may have handed over just as the wait timed out
+            if granted or turn.is_set():
+                return
+            self._waiters.remove(turn)
+        raise WriterQueueTimeout(f'Timed out after {self.timeout:g}s waiting to write to the database')
+
+    def release(self):
+        with self._lock:
+            if self._waiters:
+                # Hand the turn straight to the next writer so no newcomer can jump the queue
+                self._waiters.popleft().set()
+            else:
+                self._held = False
+
+    def stats(self):
+        with self._lock:
+            return {
+                'writes': self.acquired,
+                'waited': self.waited,
+                'average_wait_ms': self.wait_seconds / self.waited * 1000 if self.waited else 0.0,
+                'max_queue_depth': self.max_depth,
+                'queued': len(self._waiters),
+            }
+
+
+def read_mostly(view):
+    """Mark a non-GET view whose transactions usually only read (e.g. login).
+
+    Its transactions start as plain deferred reads instead of taking the writer queue
+    up front, so slow work between its queries (bcrypt) doesn't block every writer.
+    Place it below the route decorator, like @query_budget.
+    """
+    view.read_mostly = True
+    return view
+
+
+def _is_write_transaction():
+    """Writes are expected from every non-GET request (until its first commit) and from CLI/scripts"""
+    if not has_request_context():
+        return True
+    if request.method in READ_METHODS or g.get('sqlite_committed'):
+        # Transactions after the commit mostly reload what was written for the response
+        return False
+    view = current_app.view_functions.get(request.endpoint)
+    return not getattr(view, 'read_mostly', False)
+
+
+def _set_pragmas(dbapi_connection, pragmas):
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+    finally:
+        cursor.close()
+
+
+def apply_pragmas(engine, pragmas):
+    """Run `pragmas` on every new connection of `engine`"""
+    @event.listens_for(engine, 'connect')
+    def on_connect(dbapi_connection, connection_record):
+        _set_pragmas(dbapi_connection, pragmas)
+
+
+def install(engine, pragmas, queue):
+    """Apply `pragmas` to every new connection of `engine` and serialize its writers through `queue`.
+
+    pysqlite's own transaction handling is switched off so transactions can be begun
+    explicitly: BEGIN IMMEDIATE (after taking the queue) when the transaction is
+    expected to write, a deferred BEGIN otherwise. A read transaction that does end up
+    writing joins the queue at its first write statement.
+    """
+
+    def holds_turn(conn):
+        return conn.connection.info.get('sqlite_writer', False)
+
+    def take_turn(conn):
+        queue.acquire()
+        conn.connection.info['sqlite_writer'] = True
+
+    def give_turn(info):
+        if info.pop('sqlite_writer', False):
+            queue.release()
+
+    @event.listens_for(engine, 'connect')
+    def on_connect(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    apply_pragmas(engine, pragmas)
+
+    @event.listens_for(engine, 'begin')
+    def on_begin(conn):
+        # Straight on the driver connection: BEGIN isn't one of the request's statements
+        if _is_write_transaction():
+            take_turn(conn)
+            conn.connection.driver_connection.execute('BEGIN IMMEDIATE')
+        else:
+            conn.connection.driver_connection.execute('BEGIN')
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        if conn.in_transaction() and not holds_turn(conn) and statement.lstrip()[:7].upper().startswith(WRITE_STATEMENTS):
+            take_turn(conn)
+
+    @event.listens_for(engine, 'commit')
+    def on_commit(conn):
+        if has_request_context():
+            g.sqlite_committed = True
+        on_end(conn)
+
+    @event.listens_for(engine, 'rollback')
+    def on_end(conn):
+        # Released just before COMMIT/ROLLBACK runs; the next writer's BEGIN IMMEDIATE
+        # covers the gap by waiting on busy_timeout
+        give_turn(conn.connection.info)
+
+    @event.listens_for(engine, 'checkin')
+    def on_checkin(dbapi_connection, connection_record):
+        # Safety net for connections returned or invalidated mid-transaction
+        give_turn(connection_record.info)
+
+
+def init_app(app):
+    """SQLite performance mode for file databases: WAL, relaxed fsync and a writer queue.
+
+    Enabled with SQLITE_PERFORMANCE_MODE (on by default); the PRAGMAs applied to each
+    connection come from SQLITE_PRAGMAS. Other databases and in-memory SQLite are left alone.
+    """
+    uri = app.config['SQLALCHEMY_DATABASE_URI']
+    if not uri.startswith('sqlite') or is_memory_sqlite(uri) or not app.config['SQLITE_PERFORMANCE_MODE']:
+        return None
+
+    queue = WriterQueue(app.config['SQLITE_WRITE_TIMEOUT'])
+    with app.app_context():
+        install(db.engine, app.config['SQLITE_PRAGMAS'], queue)
+    app.extensions['sqlite_writer_queue'] = queue
+    return queue
@@ -0,0 +1,158 @@
+import logging
+import os
+import time
+import click
+from sqlalchemy import text
+from config import DEFAULT_SECRET_KEY, is_memory_sqlite
+from models import db
+
+logger = logging.getLogger(__name__)
+
+OK, WARN, FAIL = 'ok', 'warn', 'FAIL'
+
+
+def _check_database(app):
+    start = time.perf_counter()
+    with db.engine.connect() as connection:
+        connection.execute(text('SELECT 1'))
+    pool = db.engine.pool
+    return OK, f'{db.engine.dialect.name} reachable in {(time.perf_counter() - start) * 1000:.1f} ms ({pool.status()})'
+
+
+def _check_sqlite(app):
+    if db.engine.dialect.name != 'sqlite':
+        return OK, 'not used'
+    if is_memory_sqlite(app.config['SQLALCHEMY_DATABASE_URI']):
+        return OK, 'in-memory database'
+    with db.engine.connect() as connection:
+        journal_mode = connection.exec_driver_sql('PRAGMA journal_mode').scalar()
+    if 'sqlite_writer_queue' not in app.extensions:
+        return WARN, f'journal_mode={journal_mode}, performance mode off: concurrent writers may see "database is locked"'
+    return OK, f'journal_mode={journal_mode}, writes serialized through the writer queue'
+
+
+def _check_replicas(app):
+    replica_set = app.extensions.get('db_replicas')
+    if replica_set is None:
+        return OK, 'not used'
+    lags = replica_set.refresh()
+    down = [engine.url.render_as_string(hide_password=True) for engine, lag in lags.items() if lag is None]
+    if down:
+        # Reads fall back to the primary, so this degrades rather than breaks
+        return WARN, f"unreachable: {', '.join(down)}"
+    return OK, f'{len(lags)} reachable, lag ' + ', '.join(f'{lag:.1f}s' for lag in lags.values())
+
+
+def _check_migrations(app):
+    from alembic.config import Config as AlembicConfig
+    from alembic.runtime.migration import MigrationContext
+    from alembic.script import ScriptDirectory
+
+    directory = os.path.join(app.root_path, 'migrations')
+    if not os.path.isdir(directory):
+        return WARN, 'no migrations directory'
+    alembic_config = AlembicConfig()
+    alembic_config.set_main_option('script_location', directory)
+    heads = set(ScriptDirectory.from_config(alembic_config).get_heads())
+
+    with db.engine.connect() as connection:
+        current = set(MigrationContext.configure(connection).get_current_heads())
+    if current != heads:
+        return FAIL, f"database at {', '.join(sorted(current)) or 'no revision'}, code expects " \
+                     f"{', '.join(sorted(heads))}: run 'flask db upgrade'"
+    return OK, f"at head {', '.join(sorted(heads))}"
+
+
+def _check_secret_key(app):
+    if app.config['SECRET_KEY'] == DEFAULT_SECRET_KEY:
+        return (FAIL if app.config['APP_ENV'] == 'production' else WARN), 'SECRET_KEY is the development default'
+    return OK, 'set'
+
+
+def _check_shared_state(app):
+    """Per-process sessions and caches break once several workers serve the same users"""
+    problems = []
+    if app.config['SESSION_TYPE'] == 'memory':
+        problems.append("SESSION_TYPE='memory' is not shared between workers")
+    if app.config['CACHE_BACKEND'] == 'lru':
+        problems.append("CACHE_BACKEND='lru' is invalidated only in the worker that wrote")
+    if not problems:
+        return OK, 'sessions and cache are shared'
+    multi_worker = app.config['APP_ENV'] == 'production' and app.config['WEB_CONCURRENCY'] > 1
+    return (FAIL if multi_worker else WARN), '; '.join(problems)
+
+
+def _check_redis(app):
+    clients = []
+    session_store = app.extensions.get('session_store')
+    if hasattr(session_store, 'client'):
+        clients.append(('sessions', session_store.client))
+    response_cache = app.extensions.get('response_cache')
+    if hasattr(response_cache, 'client'):
+        clients.append(('cache', response_cache.client))
+    if not clients:
+        return OK, 'not used'
+    for name, client in clients:
+        client.ping()
+    return OK, 'reachable for ' + ', '.join(name for name, _ in clients)
+
+
+def _check_password_hasher(app):
+    # Also starts the hashing pool now rather than on the first login
+    hasher = app.extensions['password_hasher']
+    start = time.perf_counter()
+    hasher.hash('startup-self-check')
+    mode = f'{hasher.workers} worker process(es)' if hasher.workers else 'inline'
+    return OK, f'cost {hasher.rounds}, {mode}, one hash took {(time.perf_counter() - start) * 1000:.0f} ms'
+
+
+CHECKS = (
+    ('database', _check_database),
+    ('sqlite', _check_sqlite),
+    ('replicas', _check_replicas),
+    ('migrations', _check_migrations),
+    ('secret key', _check_secret_key),
+    ('shared state', _check_shared_state),
+    ('redis', _check_redis),
+    ('password hashing', _check_password_hasher),
+)
+
+
+def run_checks(app):
+    """Run every startup check; returns (name, status, detail) tuples"""
+    results = []
+    with app.app_context():
+        for name, check in CHECKS:
+            try:
+                status, detail = check(app)
+            except Exception as e:
+                status, detail = FAIL, f'{e.__class__.__name__}: {e}'
+            results.append((name, status, detail))
+    return results
+
+
+def require_healthy(app):
+    """Log the checks and refuse to start if any failed (used by the WSGI entry point)"""
+    results = run_checks(app)
+    for name, status, detail in results:
+        log = logger.error if status == FAIL else logger.warning if status == WARN else logger.info
+        log('startup check %s: %s (%s)', name, status, detail)
+    failed = [name for name, status, _ in results if status == FAIL]
+    if failed:
+        raise RuntimeError(f"Startup self-check failed: {', '.join(failed)}")
+
+
+@click.command('selfcheck')
+def selfcheck_command():
+    """Check the database, migrations, configuration and backing services."""
+    from flask import current_app
+
+    results = run_checks(current_app._get_current_object())
+    for name, status, detail in results:
+        click.echo(f'{status:<4}  {name:<16} {detail}')
+    if any(status == FAIL for _, status, _ in results):
+        raise click.ClickException('Self-check failed')
+
+
+def init_app(app):
+    app.cli.add_command(selfcheck_command)
@@ -0,0 +1,240 @@
+from collections import defaultdict
+import click
+from flask.cli import AppGroup
+from sqlalchemy import event, func, inspect
+from sqlalchemy.orm.base import NO_VALUE
+from models import db, User, Project, Task, UserStats
+from serializers import task_serializer
+from changes import flush_owners, mark_changed, task_owner_id
+from replicas import use_primary
+
+PROJECT_STATUSES = ('active', 'completed', 'archived')
+TASK_STATUSES = ('todo', 'in_progress', 'completed')
+
+RECENT_TASKS_LIMIT = 5
+
+stats_cli = AppGroup('stats', help='Maintain the materialized dashboard counters.')
+
+
+def project_counts(user_id):
+    """Count a user's projects grouped by status in a single query"""
+    rows = db.session.query(Project.status, func.count(Project.id)) \
+        .filter(Project.user_id == user_id) \
+        .group_by(Project.status) \
+        .all()
+    counts = {status: 0 for status in PROJECT_STATUSES}
+    counts.update(rows)
+    return counts
+
+
+def task_counts(user_id):
+    """Count a user's tasks (across all projects) grouped by status in a single query"""
+    rows = db.session.query(Task.status, func.count(Task.id)) \
+        .join(Project, Task.project_id == Project.id) \
+        .filter(Project.user_id == user_id) \
+        .group_by(Task.status) \
+        .all()
+    counts = {status: 0 for status in TASK_STATUSES}
+    counts.update(rows)
+    return counts
+
+
+def recent_tasks_query(user_id, limit=RECENT_TASKS_LIMIT):
+    """Most recently created tasks, served by the tasks.created_at index"""
+    return Task.query \
+        .join(Project, Task.project_id == Project.id) \
+        .filter(Project.user_id == user_id) \
+        .order_by(Task.created_at.desc()) \
+        .limit(limit)
+
+
+def recent_tasks(user_id, limit=RECENT_TASKS_LIMIT):
+    return recent_tasks_query(user_id, limit).all()
+
+
+# ============== MATERIALIZED COUNTERS ==============
+
+def _project_column(status):
+    return f'projects_{status}' if status in PROJECT_STATUSES else None
+
+
+def _task_column(status):
+    return f'tasks_{status}' if status in TASK_STATUSES else None
+
+
+def _counter_columns():
+    return [_project_column(status) for status in PROJECT_STATUSES] + \
+        [_task_column(status) for status in TASK_STATUSES]
+
+
+def _counter_values(user_id):
+    """Recompute one user's counters from the source tables"""
+    values = {_project_column(status): count
+              for status, count in project_counts(user_id).items() if status in PROJECT_STATUSES}
+    values.update({_task_column(status): count
+                   for status, count in task_counts(user_id).items() if status in TASK_STATUSES})
+    return values
+
+
+def _status_change(obj):
+    history = inspect(obj).attrs.status.history
+    if history.deleted and history.added and history.deleted[0] != history.added[0]:
+        return history.deleted[0], history.added[0]
+    return None
+
+
+def _collect_deltas(session):
+    """Translate the pending inserts, status changes and deletes into counter deltas"""
+    deltas = defaultdict(lambda: defaultdict(int))
+
+    def bump(user_id, column, amount):
+        if user_id is not None and column:
+            deltas[user_id][column] += amount
+
+    for obj in session.new:
+        if isinstance(obj, Project):
+            bump(obj.user_id, _project_column(obj.status), 1)
+        elif isinstance(obj, Task):
+            bump(task_owner_id(session, obj), _task_column(obj.status), 1)
+
+    for obj in session.dirty:
+        if isinstance(obj, Project):
+            change = _status_change(obj)
+            if change:
+                bump(obj.user_id, _project_column(change[0]), -1)
+                bump(obj.user_id, _project_column(change[1]), 1)
+        elif isinstance(obj, Task):
+            change = _status_change(obj)
+            if change:
+                owner = task_owner_id(session, obj)
+                bump(owner, _task_column(change[0]), -1)
+                bump(owner, _task_column(change[1]), 1)
+
+    for obj in session.deleted:
+        if isinstance(obj, Project):
+            bump(obj.user_id, _project_column(obj.status), -1)
+        elif isinstance(obj, Task):
+            bump(task_owner_id(session, obj), _task_column(obj.status), -1)
+
+    return deltas
+
+
+@event.listens_for(db.session, 'after_flush')
+def _apply_counter_deltas(session, flush_context):
+    # new/dirty/deleted still describe the flushed changes at this point, and
+    # generated keys have been assigned
+    connection = session.connection()
+    table = UserStats.__table__
+
+    # Give new users an empty counters row up front so later writes are a single UPDATE
+    for obj in session.new:
+        if isinstance(obj, User) and inspect(obj).attrs.stats.loaded_value in (NO_VALUE, None):
+            connection.execute(table.insert().values(user_id=obj.id, **{
+                column: 0 for column in _counter_columns()
+            }))
+
+    deltas = _collect_deltas(session)
+
+    # Every write to a user's data bumps their version, which ETags are derived from.
+    # The counters row of a deleted user goes away with it via the cascade.
+    deleted_users = {obj.id for obj in session.deleted if isinstance(obj, User)}
+    for user_id in (set(deltas) | flush_owners(session)) - deleted_users:
+        _bump_counters(connection, user_id, deltas.get(user_id, {}))
+
+
+def _bump_counters(connection, user_id, deltas):
+    """Apply counter deltas and bump the version in a single UPDATE of the user's row"""
+    if user_id is None:
+        # The seeding INSERT below would create a row with a NULL key (a fresh rowid on SQLite)
+        raise ValueError('Counters need the owning user id')
+    table = UserStats.__table__
+    values = {column: table.c[column] + amount for column, amount in deltas.items() if amount}
+    values['version'] = table.c.version + 1
+
+    result = connection.execute(
+        table.update()
+        .where(table.c.user_id == user_id)
+        .values(values)
+    )
+
+    # No counters row yet: seed it from the tables, which already include these changes
+    if result.rowcount == 0:
+        connection.execute(table.insert().values(user_id=user_id, **_counter_values(user_id)))
+
+
+def record_task_inserts(session, user_id, status_counts):
+    """Counter bookkeeping for tasks written with a bulk INSERT, which the flush listener never sees.
+
+    Call it in the same transaction, after the INSERT, with the id of the user owning the tasks' project.
+    """
+    deltas = {_task_column(status): count for status, count in status_counts.items()}
+    _bump_counters(session.connection(), user_id, deltas)
+    mark_changed(session, user_id)
+
+
+def get_user_stats(user_id):
+    """Primary-key read of a user's counters, seeding the row on first use"""
+    stats = db.session.get(UserStats, user_id)
+    if stats is None and use_primary(db.session):
+        # A lagging replica may not have the row yet; only seed it if the primary doesn't either
+        stats = db.session.get(UserStats, user_id)
+    if stats is None:
+        stats = UserStats(user_id=user_id, **_counter_values(user_id))
+        db.session.add(stats)
+        db.session.commit()
+    return stats
+
+
+def rebuild_user_stats(user_id=None):
+    """Recompute counters from the source tables. Returns the ids of users whose row had drifted."""
+    query = db.session.query(User.id)
+    if user_id is not None:
+        query = query.filter(User.id == user_id)
+
+    drifted = []
+    for (uid,) in query.all():
+        values = _counter_values(uid)
+        stats = db.session.get(UserStats, uid)
+        if stats is None:
+            db.session.add(UserStats(user_id=uid, **values))
+            drifted.append(uid)
+            continue
+        if any(getattr(stats, column) != count for column, count in values.items()):
+            for column, count in values.items():
+                setattr(stats, column, count)
+            drifted.append(uid)
+
+    db.session.commit()
+    return drifted
+
+
+@stats_cli.command('rebuild')
+@click.option('--user-id', type=int, default=None, help='Only rebuild this user.')
+def rebuild_command(user_id):
+    """Reconcile the dashboard counters with the projects and tasks tables."""
+    drifted = rebuild_user_stats(user_id)
+    click.echo(f'Rebuilt dashboard counters ({len(drifted)} row(s) corrected)')
+    for uid in drifted:
+        click.echo(f'  user {uid}')
+
+
+def dashboard_stats(user_id):
+    """Build the dashboard payload from the counters row plus the recent tasks query"""
+    stats = get_user_stats(user_id)
+    projects = {status: getattr(stats, _project_column(status)) for status in PROJECT_STATUSES}
+    tasks = {status: getattr(stats, _task_column(status)) for status in TASK_STATUSES}
+
+    return {
+        'projects': {
+            'total': sum(projects.values()),
+            'active': projects['active'],
+            'completed': projects['completed']
+        },
+        'tasks': {
+            'total': sum(tasks.values()),
+            'todo': tasks['todo'],
+            'in_progress': tasks['in_progress'],
+            'completed': tasks['completed']
+        },
+        'recent_tasks': task_serializer.dump_many(recent_tasks(user_id))
+    }
@@ -0,0 +1,129 @@
+from datetime import datetime
+from sqlalchemy import select, tuple_
+from feed import changes_after, head, is_stale
+from models import Project, Task
+from pagination import decode_token, encode_token, keyset_query
+from queries import project_list_query
+
+
+class SyncPage:
+    def __init__(self, projects, tasks, deleted_projects, deleted_tasks, token, has_more, reset):
+        self.projects = projects
+        self.tasks = tasks
+        self.deleted_projects = deleted_projects
+        self.deleted_tasks = deleted_tasks
+        self.token = token
+        self.has_more = has_more
+        self.reset = reset
+
+    def meta(self):
+        return {
+            'deleted': {'projects': self.deleted_projects, 'tasks': self.deleted_tasks},
+            'next_token': self.token,
+            'has_more': self.has_more,
+            'reset': self.reset
+        }
+
+
+# Tokens are opaque to clients: [seq] once in sync, or ['snapshot', seq, stage, position]
+# while copying everything, where the position is the last project's (updated_at, id)
+# or the last task's (project_id, created_at, id), null at the start of a stage
+
+def _parse(token):
+    """(seq, None) or (seq, (stage, position)) from a sync token"""
+    try:
+        values = decode_token(token)
+        if len(values) == 1:
+            return int(values[0]), None
+        kind, seq, stage, position = values
+        if kind != 'snapshot' or stage not in ('projects', 'tasks'):
+            raise ValueError
+        if position is None:
+            pass
+        elif stage == 'projects':
+            position = (datetime.fromisoformat(position[0]), int(position[1]))
+        else:
+            position = (int(position[0]), datetime.fromisoformat(position[1]), int(position[2]))
+        return int(seq), (stage, position)
+    except (ValueError, TypeError, IndexError):
+        raise ValueError('Invalid sync token')
+
+
+def snapshot_tasks_query(user_id, after=None):
+    """The user's tasks by (project_id, created_at, id): one ix_tasks_project_id_created_at range per project"""
+    owned = select(Project.id).where(Project.user_id == user_id)
+    query = Task.query.filter(Task.project_id.in_(owned))
+    if after is not None:
+        query = query.filter(Task.project_id >= after[0],
+                             tuple_(Task.project_id, Task.created_at, Task.id) > tuple_(*after))
+    return query.order_by(Task.project_id, Task.created_at, Task.id)
+
+
+def _snapshot(user_id, seq, stage, position, limit):
+    """One page of a full copy: projects, then tasks, then a token for the changes since it began"""
+    projects, tasks = [], []
+    if stage == 'projects':
+        projects = keyset_query(project_list_query(user_id), Project.updated_at, Project.id,
+                                position, limit + 1, descending=False).all()
+        if len(projects) > limit:
+            projects = projects[:limit]
+            last = projects[-1]
+            return projects, tasks, ['snapshot', seq, 'projects', [last.updated_at.isoformat(), last.id]]
+        stage, position, limit = 'tasks', None, limit - len(projects)
+        if not limit:
+            return projects, tasks, ['snapshot', seq, 'tasks', None]
+
+    tasks = snapshot_tasks_query(user_id, position).limit(limit + 1).all()
+    if len(tasks) > limit:
+        tasks = tasks[:limit]
+        last = tasks[-1]
+        return projects, tasks, ['snapshot', seq, 'tasks', [last.project_id, last.created_at.isoformat(), last.id]]
+    return projects, tasks, [seq]
+
+
+def _changes(user_id, seq, limit):
+    """The current state of every project/task changed after `seq`; ids that no longer exist are tombstones"""
+    changes = changes_after(user_id, seq, limit + 1)
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+
+    changed = {'project': set(), 'task': set()}
+    for change in changes:
+        changed[change.entity].add(change.entity_id)
+
+    projects = Project.query.filter(Project.id.in_(changed['project']), Project.user_id == user_id).all() \
+        if changed['project'] else []
+    tasks = Task.query.join(Project, Task.project_id == Project.id) \
+        .filter(Task.id.in_(changed['task']), Project.user_id == user_id).all() if changed['task'] else []
+
+    deleted_projects = sorted(changed['project'] - {project.id for project in projects})
+    deleted_tasks = sorted(changed['task'] - {task.id for task in tasks})
+    last = changes[-1].id if changes else seq
+    return SyncPage(projects, tasks, deleted_projects, deleted_tasks, encode_token([last]), has_more, False)
+
+
+def sync(user_id, token, limit):
+    """One page of GET /api/sync: what changed for the user since `token`.
+
+    Without a token, or with one older than the retained change log, the pages
+    first copy every project and task (`reset` is set on the first of them: drop
+    local data), then continue from the changes made since the copy began.
+    After that, each page lists the current state of the projects and tasks
+    changed since the token and the ids of those deleted since. Tokens resume after
+    a change id, so this is gap-free only because ids commit in order (SQLite's single
+    writer, the advisory lock on PostgreSQL). Every page is a few index range scans:
+    ix_changes_user_id_id, then primary key lookups.
+    """
+    if token:
+        seq, snapshot = _parse(token)
+        if snapshot is not None:
+            projects, tasks, next_token = _snapshot(user_id, seq, *snapshot, limit)
+            return SyncPage(projects, tasks, [], [], encode_token(next_token), len(next_token) > 1, False)
+        if not is_stale(seq):
+            return _changes(user_id, seq, limit)
+
+    # Read before copying, so nothing committed during the copy is missed (at worst it's sent twice).
+    # Also relies on change ids becoming visible in order: see feed.lock_change_log()
+    seq = head()
+    projects, tasks, next_token = _snapshot(user_id, seq, 'projects', None, limit)
+    return SyncPage(projects, tasks, [], [], encode_token(next_token), len(next_token) > 1, True)
@@ -0,0 +1,54 @@
+from datetime import datetime
+from models import Task
+
+
+def parse_due_date(value):
+    if not value:
+        return None
+    if not isinstance(value, str):
+        raise ValueError('Due date must be an ISO 8601 string')
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+def build_task(data, project_id):
+    """New Task from request data; the model's @validates rules raise ValueError"""
+    task = Task(
+        title=data.get('title'),
+        description=data.get('description', ''),
+        status=data.get('status', 'todo'),
+        priority=data.get('priority', 'medium'),
+        project_id=project_id
+    )
+    
+    if data.get('due_date'):
+        task.due_date = parse_due_date(data['due_date'])
+    
+    return task
+
+
+def insert_values(task):
+    """A validated (unsaved) task's columns, for a bulk INSERT ... RETURNING"""
+    return {
+        'title': task.title,
+        'description': task.description,
+        'status': task.status,
+        'priority': task.priority,
+        'due_date': task.due_date,
+        'project_id': task.project_id
+    }
+
+
+def apply_task_changes(task, data):
+    """Apply a PATCH payload to a task; the model's @validates rules raise ValueError"""
+    if 'title' in data:
+        task.title = data['title']
+    if 'description' in data:
+        task.description = data['description']
+    if 'status' in data:
+        task.status = data['status']
+    if 'priority' in data:
+        task.priority = data['priority']
+    if 'due_date' in data:
+        task.due_date = parse_due_date(data['due_date'])
+    
+    task.updated_at = datetime.utcnow()
@@ -12,6 +12,8 @@ def print_result(test_name, response):
     print(f"\n{'='*60}")
     print(f"TEST: {test_name}")
     print(f"Status Code: {response.status_code}")
+    if 'X-Query-Count' in response.headers:
+        print(f"SQL Statements: {response.headers['X-Query-Count']}")
     try:
         print(f"Response: {json.dumps(response.json(), indent=2)}")
     except:
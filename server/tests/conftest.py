@@ -0,0 +1,70 @@
+import os
+
+# Before the app module is imported: its module-level app must not create tricab.db or a hashing pool
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+os.environ.setdefault('PASSWORD_HASH_WORKERS', '0')
+
+import pytest
+from app import create_app
+from config import Config
+from models import db
+
+PASSWORD = 'Passw0rd!'
+
+
+@pytest.fixture
+def make_app(tmp_path):
+    """make_app(**config) -> a new app on this test's SQLite file (a file, so the writer queue and WAL are exercised)"""
+    class TestConfig(Config):
+        TESTING = True
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'test.db'}"
+        BCRYPT_LOG_ROUNDS = 4
+        PASSWORD_HASH_WORKERS = 0
+        CACHE_BACKEND = 'lru'
+        METRICS_ENABLED = False
+        SLOW_QUERY_LOG = False
+
+    apps = []
+
+    def make_app(**config):
+        app = create_app(type('TestConfig', (TestConfig,), config))
+        with app.app_context():
+            db.create_all()
+        apps.append(app)
+        return app
+
+    yield make_app
+    for app in apps:
+        with app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app()
+
+
+@pytest.fixture
+def login(app):
+    """login(username) -> a test client signed up and logged in as that user"""
+    def login(username='alice'):
+        client = app.test_client()
+        response = client.post('/api/signup', json={
+            'username': username, 'email': f'{username}@example.com', 'password': PASSWORD
+        })
+        assert response.status_code == 201, response.get_json()
+        return client
+    return login
+
+
+@pytest.fixture
+def client(login):
+    return login('alice')
+
+
+@pytest.fixture
+def project(client):
+    response = client.post('/api/projects', json={'name': 'Launch'})
+    assert response.status_code == 201
+    return response.get_json()
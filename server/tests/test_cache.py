@@ -0,0 +1,106 @@
+def test_repeat_get_is_served_from_the_cache(client, project):
+    first = client.get('/api/projects')
+    second = client.get('/api/projects')
+
+    assert first.headers['X-Cache'] == 'MISS'
+    assert second.headers['X-Cache'] == 'HIT'
+    assert second.get_json() == first.get_json()
+
+
+def test_matching_etag_gets_304(client, project):
+    etag = client.get('/api/projects').headers['ETag']
+
+    response = client.get('/api/projects', headers={'If-None-Match': etag})
+
+    assert response.status_code == 304
+    assert response.headers['ETag'] == etag
+    assert not response.data
+
+
+def test_etag_depends_on_the_query_string(client, project):
+    assert client.get('/api/projects').headers['ETag'] != client.get('/api/projects?status=active').headers['ETag']
+
+
+def test_creating_a_project_invalidates_the_list(client, project):
+    before = client.get('/api/projects')
+    client.post('/api/projects', json={'name': 'Second'})
+
+    after = client.get('/api/projects', headers={'If-None-Match': before.headers['ETag']})
+
+    assert after.status_code == 200
+    assert after.headers['X-Cache'] == 'MISS'
+    assert after.headers['ETag'] != before.headers['ETag']
+    assert {p['name'] for p in after.get_json()['projects']} == {'Launch', 'Second'}
+
+
+def test_task_update_invalidates_the_dashboard(client, project):
+    task = client.post(f"/api/projects/{project['id']}/tasks", json={'title': 'Write docs'}).get_json()
+    before = client.get('/api/dashboard')
+    assert before.get_json()['tasks']['completed'] == 0
+
+    client.patch(f"/api/tasks/{task['id']}", json={'status': 'completed'})
+    after = client.get('/api/dashboard', headers={'If-None-Match': before.headers['ETag']})
+
+    assert after.status_code == 200
+    assert after.headers['X-Cache'] == 'MISS'
+    assert after.get_json()['tasks']['completed'] == 1
+
+
+def test_task_delete_invalidates_the_task_list(client, project):
+    url = f"/api/projects/{project['id']}/tasks"
+    task = client.post(url, json={'title': 'Write docs'}).get_json()
+    assert len(client.get(url).get_json()['tasks']) == 1
+
+    client.delete(f"/api/tasks/{task['id']}")
+
+    assert client.get(url).get_json()['tasks'] == []
+
+
+def test_bulk_writes_invalidate(client, project):
+    url = f"/api/projects/{project['id']}/tasks"
+    client.get(url)
+
+    client.post(f'{url}/bulk', json={'tasks': [{'title': 'One'}, {'title': 'Two'}]})
+
+    response = client.get(url)
+    assert response.headers['X-Cache'] == 'MISS'
+    assert len(response.get_json()['tasks']) == 2
+
+
+def test_other_users_writes_leave_the_cache_alone(client, project, login):
+    client.get('/api/projects')
+
+    bob = login('bob')
+    bob.post('/api/projects', json={'name': 'Bobs'})
+
+    assert client.get('/api/projects').headers['X-Cache'] == 'HIT'
+
+
+def test_failed_write_does_not_invalidate(client, project):
+    client.get('/api/projects')
+
+    assert client.post('/api/projects', json={'name': ''}).status_code == 400
+
+    assert client.get('/api/projects').headers['X-Cache'] == 'HIT'
+
+
+def test_commit_listeners_belong_to_their_app(app, make_app):
+    listeners = list(app.extensions['owner_commit_listeners'])
+    other = make_app()
+
+    # Another app's cache and feed don't hear this app's commits, and vice versa
+    assert app.extensions['owner_commit_listeners'] == listeners
+    assert set(other.extensions['owner_commit_listeners']).isdisjoint(listeners)
+
+
+def test_deleted_ids_are_not_reused(client, login, project):
+    # The ownership cache may still hold a deleted row's owner; a new row must not inherit it
+    url = f"/api/projects/{project['id']}"
+    assert client.get(url).status_code == 200
+    client.delete(url)
+
+    bob = login('bob')
+    new = bob.post('/api/projects', json={'name': 'Bobs'}).get_json()
+
+    assert new['id'] != project['id']
+    assert client.get(f"/api/projects/{new['id']}").status_code == 403
@@ -0,0 +1,36 @@
+from fake_completions import serve_in_thread
+from models import User
+from passwords import hash_rounds
+
+
+def test_each_app_hashes_with_its_own_cost(make_app):
+    first = make_app(BCRYPT_LOG_ROUNDS=4)
+    make_app(BCRYPT_LOG_ROUNDS=5)
+
+    first.test_client().post('/api/signup', json={
+        'username': 'alice', 'email': 'alice@example.com', 'password': 'Passw0rd!'
+    })
+
+    with first.app_context():
+        assert hash_rounds(User.query.filter_by(username='alice').one()._password_hash) == 4
+
+
+def test_each_app_uses_its_own_ai_settings(make_app):
+    fake, base_url = serve_in_thread(latency=0, token_delay=0)
+    try:
+        configured = make_app(OPENAI_API_KEY='fake', OPENAI_BASE_URL=base_url)
+        unconfigured = make_app(OPENAI_API_KEY=None)
+
+        responses = []
+        # Both apps use this test's database, so each signs up its own user
+        for username, app in (('alice', configured), ('bob', unconfigured)):
+            client = app.test_client()
+            client.post('/api/signup', json={
+                'username': username, 'email': f'{username}@example.com', 'password': 'Passw0rd!'
+            })
+            responses.append(client.post('/api/ai/generate-task-description', json={'title': 'Write the docs'}))
+    finally:
+        fake.shutdown()
+
+    assert responses[0].status_code == 200 and responses[0].get_json()['description']
+    assert responses[1].status_code == 503
@@ -0,0 +1,170 @@
+import io
+import json
+from collections import Counter
+import pytest
+import importer
+from importer import detect_format, import_tasks
+from models import db, Task, User, UserStats
+from stats import record_task_inserts
+
+CSV = 'title,status,priority,due_date\n' + ''.join(f'Task {n},todo,high,2026-05-0{n % 9 + 1}\n' for n in range(7))
+
+
+@pytest.fixture
+def owner_id(app, project):
+    with app.app_context():
+        return User.query.filter_by(username='alice').one().id
+
+
+def assert_counters_match(app, client):
+    """The dashboard and the user_stats rows agree with the tasks actually in the table"""
+    with app.app_context():
+        statuses = Counter(status for (status,) in db.session.query(Task.status))
+        users = {id for (id,) in db.session.query(User.id)}
+        assert {stats.user_id for stats in UserStats.query} == users
+    tasks = client.get('/api/dashboard').get_json()['tasks']
+    assert tasks == {'total': sum(statuses.values()), 'todo': statuses['todo'],
+                     'in_progress': statuses['in_progress'], 'completed': statuses['completed']}
+
+
+@pytest.fixture
+def chunks(monkeypatch):
+    """Sizes of the chunks import_tasks saves, in order"""
+    sizes = []
+    save = importer._save_chunk
+
+    def recording_save(chunk, user_id, report):
+        sizes.append(len(chunk))
+        save(chunk, user_id, report)
+
+    monkeypatch.setattr(importer, '_save_chunk', recording_save)
+    return sizes
+
+
+def test_rows_are_saved_in_chunks(app, client, project, owner_id, chunks):
+    with app.app_context():
+        report = import_tasks(io.BytesIO(CSV.encode()), project['id'], owner_id, 'csv', chunk_size=3)
+
+        assert chunks == [3, 3, 1]
+        assert report.to_dict()['imported'] == 7
+        assert Task.query.filter_by(project_id=project['id']).count() == 7
+    assert_counters_match(app, client)
+
+
+def test_invalid_rows_are_reported_and_skipped(app, client, project, owner_id, chunks):
+    body = '\n'.join([
+        json.dumps({'title': 'Fine'}),
+        'not json',
+        json.dumps(['not', 'an', 'object']),
+        '',
+        json.dumps({'title': 'Bad status', 'status': 'someday'}),
+        json.dumps({'title': 'Also fine', 'priority': 'low', 'ignored': True}),
+    ])
+    with app.app_context():
+        report = import_tasks(io.BytesIO(body.encode()), project['id'], owner_id, 'ndjson', chunk_size=10).to_dict()
+
+    assert chunks == [2]
+    assert report['imported'] == 2 and report['failed'] == 3
+    assert [error['row'] for error in report['errors']] == [2, 3, 5]
+    assert_counters_match(app, client)
+
+
+def test_error_list_is_capped(app, client, project, owner_id):
+    body = 'not json\n' * 5
+    with app.app_context():
+        report = import_tasks(io.BytesIO(body.encode()), project['id'], owner_id, 'ndjson', max_errors=2).to_dict()
+
+    assert report['failed'] == 5
+    assert len(report['errors']) == 2 and report['errors_truncated']
+    assert_counters_match(app, client)
+
+
+def test_unreadable_file_keeps_what_was_saved(app, client, project, owner_id, chunks):
+    # Decoding runs a read buffer ahead of the rows, so the bad bytes go well past the first one
+    rows = ''.join(f'Task {n}\n' for n in range(5000))
+    body = f'title\n{rows}'.encode() + b'\xff\xfe broken\n'
+    with app.app_context():
+        report = import_tasks(io.BytesIO(body), project['id'], owner_id, 'csv', chunk_size=500).to_dict()
+        saved = Task.query.filter_by(project_id=project['id']).count()
+
+    assert 0 < report['imported'] == sum(chunks) == saved < 5000
+    assert report['errors'][-1]['row'] is None
+    assert report['errors'][-1]['error'].startswith('Stopped reading the file')
+    assert_counters_match(app, client)
+
+
+@pytest.mark.parametrize('args, expected', [
+    (('ndjson', 'tasks.csv', 'text/csv'), 'ndjson'),
+    ((None, 'tasks.CSV', None), 'csv'),
+    ((None, 'tasks.jsonl', None), 'ndjson'),
+    ((None, None, 'application/x-ndjson'), 'ndjson'),
+])
+def test_detect_format(args, expected):
+    assert detect_format(*args) == expected
+
+
+def test_detect_format_rejects_unknown():
+    with pytest.raises(ValueError):
+        detect_format('xlsx')
+    with pytest.raises(ValueError):
+        detect_format(filename='tasks.txt')
+
+
+def test_multipart_upload(app, client, project, chunks):
+    app.config['IMPORT_CHUNK_SIZE'] = 4
+    response = client.post(f"/api/projects/{project['id']}/tasks/import",
+                           data={'file': (io.BytesIO(CSV.encode()), 'tasks.csv')})
+
+    assert response.status_code == 200
+    assert response.get_json()['imported'] == 7
+    assert chunks == [4, 3]
+    assert_counters_match(app, client)
+
+
+def test_import_updates_the_dashboard_and_the_sync_feed(app, client, project):
+    token = client.get('/api/sync').get_json()['next_token']
+    body = '\n'.join(json.dumps({'title': f'Task {n}', 'status': 'completed' if n % 2 else 'todo'}) for n in range(4))
+
+    response = client.post(f"/api/projects/{project['id']}/tasks/import?format=ndjson", data=body,
+                           content_type='application/x-ndjson')
+    assert response.get_json()['imported'] == 4
+
+    dashboard = client.get('/api/dashboard').get_json()
+    assert (dashboard['tasks']['todo'], dashboard['tasks']['completed']) == (2, 2)
+    assert len(client.get('/api/sync', query_string={'since': token}).get_json()['tasks']) == 4
+    assert_counters_match(app, client)
+
+
+def test_raw_body_needs_a_format(client, project):
+    response = client.post(f"/api/projects/{project['id']}/tasks/import", data='title\nx\n',
+                           content_type='application/octet-stream')
+
+    assert response.status_code == 400
+
+
+def test_cannot_import_into_someone_elses_project(login, project):
+    bob = login('bob')
+
+    response = bob.post(f"/api/projects/{project['id']}/tasks/import?format=csv", data=CSV)
+
+    assert response.status_code == 403
+
+
+def test_import_for_a_user_who_does_not_own_the_project_is_refused(app, login, project):
+    bob = login('bob')
+    with app.app_context():
+        bob_id = User.query.filter_by(username='bob').one().id
+        with pytest.raises(ValueError):
+            import_tasks(io.BytesIO(CSV.encode()), project['id'], bob_id, 'csv')
+        with pytest.raises(ValueError):
+            import_tasks(io.BytesIO(CSV.encode()), project['id'] + 100, None, 'csv')
+        assert Task.query.count() == 0
+        assert UserStats.query.filter(UserStats.user_id.is_(None)).count() == 0
+
+    assert bob.get('/api/dashboard').get_json()['tasks']['total'] == 0
+
+
+def test_counters_need_an_owner(app):
+    with app.app_context():
+        with pytest.raises(ValueError):
+            record_task_inserts(db.session, None, Counter(todo=1))
@@ -0,0 +1,27 @@
+from explain import explain, listing_query_shapes, merged_query_shapes, plan_problems
+from models import db
+
+
+def problems_by_query(app, shapes, allow_sort=False):
+    with app.app_context():
+        connection = db.session.connection()
+        found = {label: plan_problems(explain(query, connection), allow_sort) for label, query in shapes()}
+        db.session.rollback()
+    assert found, 'no query shapes to check'
+    return {label: problems for label, problems in found.items() if problems}
+
+
+def test_listing_queries_use_an_index(app):
+    assert problems_by_query(app, listing_query_shapes) == {}
+
+
+def test_cross_project_queries_read_index_ranges(app):
+    # They may sort (one range per project, merged) but never scan a table
+    assert problems_by_query(app, merged_query_shapes, allow_sort=True) == {}
+
+
+def test_indexes_check_command_passes(app):
+    result = app.test_cli_runner().invoke(args=['indexes', 'check'])
+
+    assert result.exit_code == 0, result.output
+    assert 'All listing queries use an index' in result.output
@@ -0,0 +1,153 @@
+import json
+from feed import change_events
+from models import db, Change, User
+from pagination import encode_token
+
+
+def sync_all(client, token=None, limit=100):
+    """Follow next_token until has_more is false; returns (pages, last token)"""
+    pages = []
+    while True:
+        query = {'limit': limit, **({'since': token} if token else {})}
+        page = client.get('/api/sync', query_string=query).get_json()
+        pages.append(page)
+        token = page['next_token']
+        if not page['has_more']:
+            return pages, token
+
+
+def ids(pages, key):
+    return [item['id'] for page in pages for item in page[key]]
+
+
+def test_first_sync_copies_everything_and_resets(client, project):
+    client.post(f"/api/projects/{project['id']}/tasks/bulk", json={'tasks': [{'title': f'Task {n}'} for n in range(5)]})
+    client.post('/api/projects', json={'name': 'Second'})
+
+    pages, _ = sync_all(client, limit=2)
+
+    assert pages[0]['reset'] is True
+    assert not any(page['reset'] for page in pages[1:])
+    assert len(ids(pages, 'projects')) == 2
+    assert len(set(ids(pages, 'tasks'))) == len(ids(pages, 'tasks')) == 5
+
+
+def test_token_returns_only_later_changes_and_tombstones(client, project):
+    url = f"/api/projects/{project['id']}/tasks"
+    keep = client.post(url, json={'title': 'Keep'}).get_json()
+    doomed = client.post(url, json={'title': 'Doomed'}).get_json()
+    _, token = sync_all(client)
+
+    client.patch(f"/api/tasks/{keep['id']}", json={'status': 'completed'})
+    client.delete(f"/api/tasks/{doomed['id']}")
+    pages, token = sync_all(client, token)
+
+    assert [page['reset'] for page in pages] == [False]
+    assert [(t['id'], t['status']) for t in pages[0]['tasks']] == [(keep['id'], 'completed')]
+    assert pages[0]['deleted'] == {'projects': [], 'tasks': [doomed['id']]}
+
+    # Nothing new: an empty page and the same position
+    page = client.get('/api/sync', query_string={'since': token}).get_json()
+    assert (page['tasks'], page['next_token'], page['reset']) == ([], token, False)
+
+
+def test_changes_made_during_a_copy_are_not_missed(client, project):
+    url = f"/api/projects/{project['id']}/tasks"
+    client.post(f'{url}/bulk', json={'tasks': [{'title': f'Task {n}'} for n in range(4)]})
+    first = client.get('/api/sync?limit=2').get_json()
+    assert first['has_more']
+
+    late = client.post(url, json={'title': 'Late'}).get_json()
+    pages, _ = sync_all(client, first['next_token'], limit=2)
+
+    assert late['id'] in ids(pages, 'tasks')
+
+
+def test_other_users_changes_are_not_synced(client, project, login):
+    _, token = sync_all(client)
+
+    bob = login('bob')
+    bob.post('/api/projects', json={'name': 'Bobs'})
+
+    page = client.get('/api/sync', query_string={'since': token}).get_json()
+    assert page['projects'] == [] and page['next_token'] == token
+
+
+def test_pruned_token_starts_over(app, client, project):
+    url = f"/api/projects/{project['id']}/tasks"
+    client.post(url, json={'title': 'First'})
+    _, token = sync_all(client)
+    client.post(url, json={'title': 'Second'})
+    client.post(url, json={'title': 'Third'})
+
+    result = app.test_cli_runner().invoke(args=['changes', 'prune', '--days', '0'])
+    assert 'Deleted 3 change(s)' in result.output
+
+    pages, _ = sync_all(client, token)
+    assert pages[0]['reset'] is True
+    assert len(ids(pages, 'tasks')) == 3
+
+
+def test_token_from_another_database_starts_over(client, project):
+    page = client.get('/api/sync', query_string={'since': encode_token([10 ** 6])}).get_json()
+
+    assert page['reset'] is True
+    assert [p['id'] for p in page['projects']] == [project['id']]
+
+
+def test_invalid_token_is_a_400(client):
+    for token in ('garbage', encode_token(['snapshot', 1, 'comments', None])):
+        response = client.get('/api/sync', query_string={'since': token})
+        assert response.status_code == 400
+        assert response.get_json()['error'] == 'Invalid sync token'
+
+
+def events(stream, count):
+    """The first `count` SSE events of a change_events() stream as (event, data, id)"""
+    parsed = []
+    for chunk in stream:
+        fields = dict(line.split(': ', 1) for line in chunk.strip().split('\n') if ': ' in line)
+        if 'event' in fields:
+            parsed.append((fields['event'], json.loads(fields['data']), fields.get('id')))
+        if len(parsed) == count:
+            return parsed
+
+
+def test_feed_resumes_after_since(app, client, project):
+    client.post(f"/api/projects/{project['id']}/tasks", json={'title': 'First'})
+    with app.app_context():
+        user_id = User.query.filter_by(username='alice').one().id
+        since = db.session.query(db.func.max(Change.id)).scalar()
+    second = client.post(f"/api/projects/{project['id']}/tasks", json={'title': 'Second'}).get_json()
+
+    with app.app_context():
+        (ready, _, _), (change, data, id) = events(change_events(user_id, since), 2)
+
+    assert (ready, change) == ('ready', 'change')
+    assert (data['entity'], data['id'], data['op']) == ('task', second['id'], 'create')
+    assert int(id) == data['seq'] > since
+
+
+def test_feed_sends_reset_for_a_pruned_position(app, client, project):
+    for title in ('First', 'Second', 'Third'):
+        client.post(f"/api/projects/{project['id']}/tasks", json={'title': title})
+    app.test_cli_runner().invoke(args=['changes', 'prune', '--days', '0'])
+
+    with app.app_context():
+        user_id = User.query.filter_by(username='alice').one().id
+        newest = db.session.query(db.func.max(Change.id)).scalar()
+        (reset, data, id), (ready, ready_data, _) = events(change_events(user_id, 1), 2)
+
+    assert reset == 'reset' and data == {'seq': newest} and int(id) == newest
+    assert ready == 'ready' and ready_data == {'seq': newest}
+
+
+def test_stream_refused_past_the_limit(app, client):
+    slots = app.extensions['change_stream_slots']
+    while slots.acquire(blocking=False):
+        pass
+
+    response = client.get('/api/changes/stream')
+
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '30'
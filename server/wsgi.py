@@ -0,0 +1,15 @@
+"""
+Production entry point. Set APP_ENV=production and start with:
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+With STARTUP_CHECK on (the production default) each worker runs the self-check
+before serving and refuses to boot if the database, migrations or backing
+services are not usable. `flask selfcheck` runs the same checks by hand.
+"""
+
+from app import app
+import startup
+
+if app.config['STARTUP_CHECK']:
+    startup.require_healthy(app)
@@ -38,8 +38,6 @@ pip install -r requirements.txt
 REM Initialize database
 echo Initializing database...
 set FLASK_APP=app.py
-flask db init 2>nul
-flask db migrate -m "Initial migration" 2>nul
 flask db upgrade
 
 REM Seed database
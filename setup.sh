@@ -37,8 +37,6 @@ pip install -r requirements.txt
 # Initialize database
 echo "Initializing database..."
 export FLASK_APP=app.py
-flask db init 2>/dev/null || echo "Database already initialized"
-flask db migrate -m "Initial migration" 2>/dev/null || echo "Migration already exists"
 flask db upgrade
 
 # Seed database